@@ -0,0 +1,89 @@
+"""
+Regression benchmark for the result merge in ImagePipeline.run.
+
+Times run() on synthetic corpora where loading, validation, processing and export are
+replaced by trivial stand-ins, so the measured time is dominated by the pipeline's own
+bookkeeping (splitting valid/invalid records and merging results). Processing results are
+returned in reverse order, the worst case for a linear search.
+
+The time per entry should stay roughly constant as the corpus grows. The script exits with
+status 1 if the per-entry time at the largest size exceeds `--max-ratio` times the per-entry
+time at the smallest size, which is what a quadratic merge produces.
+
+Run with: 'python -m bench.bench_merge --sizes 10000 100000'
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from src.pipeline import ImagePipeline
+from src.processor import ImageProcessor
+
+
+class _FakeProcessor(ImageProcessor):
+    """
+    ImageProcessor without steps that returns a result per image without touching the disk.
+    """
+
+    def run_parallel(self, image_paths, infos=None, **kwargs):
+        return [{"source": str(p), "processed_width": 1, "processed_height": 1} for p in reversed(image_paths)]
+
+
+class _FakeExporter:
+    """
+    Stand-in for CSVExporter that only consumes the rows.
+    """
+
+    def write(self, rows, fieldnames=None):
+        self.count = len(list(rows))
+        return "<memory>"
+
+
+def time_run(n: int, output_folder: str) -> float:
+    """
+    Time ImagePipeline.run on n synthetic entries (one in ten invalid).
+
+    Args:
+        n (int): Number of synthetic images.
+        output_folder (str): Scratch folder for the pipeline.
+
+    Returns:
+        float: Wall time of run() in seconds.
+    """
+    paths = [Path(f"synthetic/img_{i:07d}.jpg") for i in range(n)]
+    pipeline = ImagePipeline(input_folder="synthetic", output_folder=output_folder)
+    pipeline.loader.get_image_paths = lambda: paths
+    pipeline.validator.validate = lambda p: {"path": str(p), "ok": not p.stem.endswith("0"), "width": 8, "height": 8}
+    pipeline.processor = _FakeProcessor(output_folder=output_folder)
+    pipeline.exporter = _FakeExporter()
+
+    start = time.perf_counter()
+    pipeline.run()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the result merge in ImagePipeline.run")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000], help="Corpus sizes to time")
+    parser.add_argument("--max-ratio", type=float, default=3.0,
+                        help="Maximum allowed growth of the per-entry time between the smallest and largest size")
+    args = parser.parse_args()
+
+    per_entry = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sorted(args.sizes):
+            elapsed = time_run(n, tmp)
+            per_entry.append(elapsed / n)
+            print(f"{n:>10} entries: {elapsed:8.3f} s  ({elapsed / n * 1e6:7.2f} us/entry)")
+
+    ratio = per_entry[-1] / per_entry[0]
+    print(f"Per-entry time ratio (largest / smallest): {ratio:.2f}")
+    if ratio > args.max_ratio:
+        print(f"[FAIL] Merge does not scale linearly (ratio > {args.max_ratio})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
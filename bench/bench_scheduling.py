@@ -0,0 +1,129 @@
+"""
+Benchmark of the task ordering policies of ImageProcessor.run_parallel (see src.scheduler).
+
+Builds a mixed-size corpus in which many small images come first and a few huge ones last,
+as in a scan where they happen to sort last, and times run_parallel once per schedule. The
+makespan (wall time of the whole run) shows the tail effect: with "fifo" the huge images
+start last and the run ends with one worker grinding while the others idle.
+
+By default real images are decoded, resized and saved, so the figures depend on the number
+of cores (on a single core every order takes about as long). With --simulate, each image
+instead sleeps for a time proportional to its pixel count, which shows the effect of the
+schedule alone, on any host. The script then exits with status 1 if "lpt" takes more than
+`--max-lpt-ratio` times the lower bound on the makespan.
+
+Run with: 'python -m bench.bench_scheduling --workers 4'
+          'python -m bench.bench_scheduling --simulate --small 200 --large 6'
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from src.bench import generate_corpus
+from src.processor import ImageProcessor, make_resize_and_save_step
+from src.scheduler import SCHEDULES
+from src.validator import ImageValidator
+
+
+class _SimulatedWork:
+    """
+    Step sleeping for a time proportional to the pixel count of the image.
+    """
+
+    uses_info = True
+
+    def __init__(self, seconds_per_megapixel: float):
+        self.seconds_per_megapixel = seconds_per_megapixel
+
+    def __call__(self, path, info=None):
+        time.sleep(info["width"] * info["height"] / 1e6 * self.seconds_per_megapixel)
+        return {"simulated": True}
+
+
+def build_tasks(folder: Path, small: int, large: int, small_size: tuple, large_size: tuple, simulate: bool):
+    """
+    Create the corpus (synthetic records only with simulate) and validate it.
+
+    Returns:
+        Tuple[List[Path], List[dict]]: Paths, small images first, and their validation records.
+    """
+    if simulate:
+        paths = [folder / f"img_{i:06d}.jpg" for i in range(small + large)]
+        sizes = [small_size] * small + [large_size] * large
+        return paths, [{"path": str(p), "ok": True, "width": w, "height": h, "mode": "RGB"}
+                       for p, (w, h) in zip(paths, sizes)]
+    generate_corpus(folder / "small", small, [small_size])
+    generate_corpus(folder / "large", large, [large_size])
+    paths = sorted((folder / "small").iterdir()) + sorted((folder / "large").iterdir())
+    validator = ImageValidator(verify_mode="header")
+    return paths, [validator.validate(p) for p in paths]
+
+
+def time_schedule(processor: ImageProcessor, paths, infos, schedule: str, workers: int, executor: str) -> float:
+    """
+    Time one run_parallel call with the given schedule.
+
+    Returns:
+        float: Makespan in seconds.
+    """
+    start = time.perf_counter()
+    results = processor.run_parallel(paths, max_workers=workers, infos=infos, executor=executor, schedule=schedule)
+    elapsed = time.perf_counter() - start
+    assert len(results) == len(paths)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the task ordering policies of run_parallel")
+    parser.add_argument("--workers", type=int, default=4, help="Number of workers")
+    parser.add_argument("--executor", choices=["threads", "processes"], default="threads", help="Execution backend")
+    parser.add_argument("--small", type=int, default=200, help="Number of small images (processed first by fifo)")
+    parser.add_argument("--large", type=int, default=6, help="Number of large images (processed last by fifo)")
+    parser.add_argument("--small-size", type=int, nargs=2, default=[640, 480], metavar=("W", "H"))
+    parser.add_argument("--large-size", type=int, nargs=2, default=[4000, 3000], metavar=("W", "H"))
+    parser.add_argument("--simulate", action="store_true",
+                        help="Sleep in proportion to the pixel count instead of processing real images")
+    parser.add_argument("--seconds-per-megapixel", type=float, default=0.05,
+                        help="Simulated processing time with --simulate")
+    parser.add_argument("--max-lpt-ratio", type=float, default=1.25,
+                        help="With --simulate, maximum allowed ratio of the lpt makespan to the lower bound")
+    parser.add_argument("--schedules", nargs="+", choices=list(SCHEDULES), default=list(SCHEDULES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        paths, infos = build_tasks(folder / "corpus", args.small, args.large, tuple(args.small_size),
+                                   tuple(args.large_size), args.simulate)
+        processor = ImageProcessor(output_folder=str(folder / "out"))
+        if args.simulate:
+            processor.add_step(_SimulatedWork(args.seconds_per_megapixel))
+        else:
+            processor.add_step(make_resize_and_save_step(output_folder=str(folder / "out"), scale=0.25))
+        total = sum(v["width"] * v["height"] for v in infos) / 1e6
+        print(f"{args.small} x {args.small_size[0]}x{args.small_size[1]} then "
+              f"{args.large} x {args.large_size[0]}x{args.large_size[1]} ({total:.0f} MP), "
+              f"{args.workers} {args.executor} workers{' (simulated)' if args.simulate else ''}")
+
+        makespans = {}
+        for schedule in args.schedules:
+            makespans[schedule] = time_schedule(processor, paths, infos, schedule, args.workers, args.executor)
+
+    baseline = makespans.get("fifo")
+    print(f"\n{'schedule':<10} {'makespan (s)':>13} {'vs fifo':>9}")
+    for schedule, elapsed in makespans.items():
+        change = f"{(elapsed / baseline - 1) * 100:+8.1f}%" if baseline else ""
+        print(f"{schedule:<10} {elapsed:>13.3f} {change:>9}")
+    if args.simulate:
+        # No schedule can beat the total work spread evenly, nor the largest single image
+        bound = max(total / args.workers, max(v["width"] * v["height"] for v in infos) / 1e6)
+        bound *= args.seconds_per_megapixel
+        print(f"{'bound':<10} {bound:>13.3f}")
+        if "lpt" in makespans and makespans["lpt"] > args.max_lpt_ratio * bound:
+            print(f"[FAIL] lpt is more than {args.max_lpt_ratio} times the lower bound")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
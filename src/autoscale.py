@@ -0,0 +1,212 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Value of max_workers (and of --workers) selecting adaptive concurrency
+AUTO = "auto"
+
+
+def cpu_count() -> int:
+    """
+    Number of CPUs this process may run on.
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS and Windows
+        return os.cpu_count() or 1
+
+
+def resolve_workers(max_workers) -> int:
+    """
+    Turn max_workers into a fixed number, for pools that are not autoscaled (AUTO becomes the CPU count).
+    """
+    return cpu_count() if max_workers == AUTO else max_workers
+
+
+class CPUSampler:
+    """
+    Measures the fraction of the machine's CPU time that was busy between two samples.
+
+    On Linux the counters of /proc/stat cover every process, including the workers of the
+    process backend; elsewhere the CPU time of this process and of its finished children is
+    used instead.
+    """
+
+    def __init__(self):
+        self._last = self._read()
+
+    @staticmethod
+    def _read() -> Tuple[float, float]:
+        """
+        Total and busy CPU time so far, in arbitrary but consistent units.
+        """
+        try:
+            with open("/proc/stat") as f:
+                values = [int(v) for v in f.readline().split()[1:]]
+            idle = values[3] + (values[4] if len(values) > 4 else 0)  # idle + iowait
+            return float(sum(values)), float(sum(values) - idle)
+        except (OSError, ValueError, IndexError):
+            t = os.times()
+            return time.monotonic() * cpu_count(), t.user + t.system + t.children_user + t.children_system
+
+    def sample(self) -> float:
+        """
+        Busy fraction (0 to 1) since the previous sample.
+        """
+        total, busy = self._read()
+        last_total, last_busy = self._last
+        self._last = (total, busy)
+        if total <= last_total:
+            return 0.0
+        return min(1.0, max(0.0, (busy - last_busy) / (total - last_total)))
+
+
+class ConcurrencyController:
+    """
+    Adapts the number of images processed at once to what the host and the storage sustain.
+
+    The executor is created with `max_workers` workers and the controller sets how many tasks
+    are in flight (`limit`), so the pool grows and shrinks without being recreated. Every
+    `interval` seconds (and at least `limit` completed tasks) it compares the throughput of
+    the last window with the previous one and decides, by hill climbing:
+
+        - input-bound (tasks waited for input more than `max_idle` of the window, e.g. a slow
+          validation stage or scan): shrink, as more workers cannot help;
+        - the previous step grew the pool but throughput rose by less than `tolerance`:
+          go back to the previous size and stay there for `probe_every` windows;
+        - CPU busier than `cpu_high`: hold, as more workers would only queue for the CPU;
+        - otherwise: grow by a quarter, probing whether more images in flight hide I/O
+          latency (network storage typically settles far above the CPU count, local disks near it).
+
+    After holding for `probe_every` windows the controller probes again, so it follows
+    changes in the workload. Each change is logged (logger "src.autoscale") and kept in
+    `decisions`. The controller belongs to the thread submitting tasks; only record() may
+    be called from other threads.
+
+    Attributes:
+        min_workers (int): Lower bound of the limit.
+        max_workers (int): Upper bound of the limit, and size of the executor.
+        limit (int): Tasks currently allowed in flight.
+        decisions (List[tuple]): (time, old limit, new limit, reason) of every change.
+    """
+
+    def __init__(self, min_workers: int = 1, max_workers: Optional[int] = None, initial: Optional[int] = None,
+                 interval: float = 1.0, cpu_high: float = 0.9, max_idle: float = 0.2, tolerance: float = 0.05,
+                 probe_every: int = 10, cpu_sampler: Optional[Callable[[], float]] = None):
+        """
+        Initialize the controller.
+
+        Args:
+            min_workers (int): Lower bound. Defaults to 1.
+            max_workers (int, optional): Upper bound. Defaults to four per CPU, at most 64.
+            initial (int, optional): Starting limit. Defaults to the CPU count, within the bounds.
+            interval (float): Minimum seconds between decisions. Defaults to 1.
+            cpu_high (float): CPU utilisation above which the pool does not grow. Defaults to 0.9.
+            max_idle (float): Fraction of a window spent waiting for input above which the pool
+                shrinks. Defaults to 0.2.
+            tolerance (float): Relative throughput gain a growth step must bring to be kept. Defaults to 0.05.
+            probe_every (int): Windows to hold after a step back before probing again. Defaults to 10.
+            cpu_sampler (Callable[[], float], optional): Returns the CPU utilisation since its
+                last call. Defaults to a CPUSampler.
+
+        Raises:
+            ValueError: If the bounds are invalid.
+        """
+        max_workers = max_workers or min(64, cpu_count() * 4)
+        if not 1 <= min_workers <= max_workers:
+            raise ValueError(f"Invalid worker bounds {min_workers}..{max_workers}")
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.limit = max(min_workers, min(max_workers, initial or cpu_count()))
+        self.interval = interval
+        self.cpu_high = cpu_high
+        self.max_idle = max_idle
+        self.tolerance = tolerance
+        self.probe_every = probe_every
+        self.cpu_sampler = cpu_sampler or CPUSampler().sample
+        self.decisions: List[tuple] = []
+        self._lock = threading.Lock()
+        self._previous = None  # (limit, throughput) before the last growth step
+        self._hold = 0
+        self._reset(time.perf_counter())
+
+    @classmethod
+    def for_executor(cls, executor: str) -> "ConcurrencyController":
+        """
+        Controller with bounds suited to an execution backend: processes never exceed the CPU
+        count (each one is CPU-bound), serial runs stay at one.
+        """
+        if executor == "serial":
+            return cls(max_workers=1)
+        if executor == "processes":
+            return cls(max_workers=cpu_count())
+        return cls()
+
+    def _reset(self, now: float):
+        self._start = now
+        self._completed = 0
+        self._latency = 0.0
+        self._idle = 0.0
+
+    def record(self, latency: float, count: int = 1):
+        """
+        Count a completed task of `count` images that took `latency` seconds from submission.
+        """
+        with self._lock:
+            self._completed += count
+            self._latency += latency
+
+    def idle(self, seconds: float):
+        """
+        Count time spent waiting for the next input while a worker slot was free.
+        """
+        self._idle += seconds
+
+    def update(self, now: Optional[float] = None) -> int:
+        """
+        Close the current window if it is long enough and adjust the limit.
+
+        Args:
+            now (float, optional): Current time.perf_counter() value.
+
+        Returns:
+            int: The (possibly new) limit.
+        """
+        now = time.perf_counter() if now is None else now
+        elapsed = now - self._start
+        with self._lock:
+            if elapsed < self.interval or self._completed < self.limit:
+                return self.limit
+            throughput = self._completed / elapsed
+            latency = self._latency / self._completed
+            idle = self._idle / elapsed
+            self._reset(now)
+        cpu = self.cpu_sampler()
+        old, previous, self._previous = self.limit, self._previous, None
+        stats = f"{throughput:.1f} img/s, {latency * 1000:.0f} ms/img, CPU {cpu:.0%}"
+        if idle > self.max_idle:
+            new = max(self.min_workers, old - max(1, old // 4))
+            reason = f"input-bound: waited for images {idle:.0%} of the time ({stats})"
+        elif previous is not None and throughput < previous[1] * (1 + self.tolerance):
+            new = previous[0]
+            reason = f"no gain from {new} to {old} workers ({stats})"
+            self._hold = self.probe_every
+        elif cpu >= self.cpu_high:
+            new, reason = old, None
+        elif self._hold > 0:
+            self._hold -= 1
+            new, reason = old, None
+        else:
+            new = min(self.max_workers, old + max(1, old // 4))
+            reason = f"CPU has headroom, probing ({stats})"
+            if new > old:
+                self._previous = (old, throughput)
+        if new != old:
+            self.limit = new
+            self.decisions.append((time.time(), old, new, reason))
+            logger.info("Workers %d -> %d: %s", old, new, reason)
+        return self.limit
@@ -0,0 +1,348 @@
+import io
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from PIL import Image
+from .metrics import timed
+from .processor import (JPEG_QUALITY, OUTPUT_FORMATS, SAVE_MODES, check_format, output_path, save_image,
+                        step_name, write_atomic)
+from .source import SourcePool, open_image
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, only needed for batch steps
+    np = None
+
+
+def require_numpy():
+    """
+    Raise a clear error if NumPy, needed for batch steps, is not installed.
+    """
+    if np is None:
+        raise ImportError("Batch steps need NumPy: pip install numpy")
+
+
+class Reduce:
+    """
+    Shrink by an integer factor, averaging each factor x factor block (like Image.reduce).
+
+    Blocks at the right and bottom edges that are cut off by the image border are averaged
+    over the pixels they contain.
+    """
+
+    def __init__(self, factor: int):
+        if factor < 1:
+            raise ValueError(f"Reduce factor must be at least 1. Received: {factor}")
+        self.factor = factor
+
+    def config(self):
+        return {"op": "reduce", "factor": self.factor}
+
+    def __call__(self, batch):
+        f = self.factor
+        if f == 1:
+            return batch
+        n, h, w, c = batch.shape
+        oh, ow = -(-h // f), -(-w // f)
+        if (h, w) != (oh * f, ow * f):
+            padded = np.zeros((n, oh * f, ow * f, c), dtype=batch.dtype)
+            padded[:, :h, :w] = batch
+            batch = padded
+        # Adding the f x f strided views is much faster than a reshape and sum over two axes
+        sums = np.zeros((n, oh, ow, c), dtype=np.uint16 if f <= 16 else np.uint32)
+        for dy in range(f):
+            for dx in range(f):
+                sums += batch[:, dy::f, dx::f]
+        counts = np.outer(np.minimum(f, h - np.arange(0, h, f)), np.minimum(f, w - np.arange(0, w, f)))
+        counts = counts[None, :, :, None].astype(sums.dtype)
+        return ((sums + counts // 2) // counts).astype(np.uint8)
+
+
+class Enlarge:
+    """
+    Grow by an integer factor, repeating each pixel (nearest neighbour).
+    """
+
+    def __init__(self, factor: int):
+        if factor < 1:
+            raise ValueError(f"Enlarge factor must be at least 1. Received: {factor}")
+        self.factor = factor
+
+    def config(self):
+        return {"op": "enlarge", "factor": self.factor}
+
+    def __call__(self, batch):
+        return batch.repeat(self.factor, axis=1).repeat(self.factor, axis=2)
+
+
+class ConvertMode:
+    """
+    Convert between "L", "RGB" and "RGBA", with the same luma weights as Pillow.
+    """
+
+    CHANNELS = {"L": 1, "RGB": 3, "RGBA": 4}
+
+    def __init__(self, mode: str):
+        if mode not in self.CHANNELS:
+            raise ValueError(f"Unsupported mode '{mode}', expected one of {tuple(self.CHANNELS)}")
+        self.mode = mode
+
+    def config(self):
+        return {"op": "mode", "mode": self.mode}
+
+    def __call__(self, batch):
+        channels = batch.shape[3]
+        target = self.CHANNELS[self.mode]
+        if channels == target:
+            return batch
+        if target == 1:
+            # ITU-R 601-2 luma in 16-bit fixed point, as in Pillow's convert("L")
+            r, g, b = (batch[..., i].astype(np.uint32) for i in range(3))
+            luma = (r * 19595 + g * 38470 + b * 7471 + 0x8000) >> 16
+            return luma.astype(np.uint8)[..., None]
+        rgb = batch.repeat(3, axis=3) if channels == 1 else batch[..., :3]
+        if target == 3:
+            return rgb
+        alpha = np.full(rgb.shape[:3] + (1,), 255, dtype=rgb.dtype)
+        return np.concatenate([rgb, alpha], axis=3)
+
+
+class BrightnessContrast:
+    """
+    Adjust brightness and contrast like ImageEnhance.Brightness and ImageEnhance.Contrast.
+
+    Brightness scales towards black, contrast towards the mean grey level of each image;
+    1.0 leaves the image unchanged.
+    """
+
+    def __init__(self, brightness: float = 1.0, contrast: float = 1.0):
+        self.brightness = brightness
+        self.contrast = contrast
+
+    def config(self):
+        return {"op": "brightness_contrast", "brightness": self.brightness, "contrast": self.contrast}
+
+    def __call__(self, batch):
+        if self.brightness != 1.0:
+            # A 256-entry lookup table replaces the per-pixel arithmetic
+            lut = np.clip(np.arange(256) * self.brightness + 0.5, 0, 255).astype(np.uint8)
+            batch = lut[batch]
+        if self.contrast != 1.0:
+            mean = ConvertMode("L")(batch).mean(axis=(1, 2, 3), keepdims=True)
+            mean = np.floor(mean + 0.5).astype(np.int32)
+            # Integer arithmetic in 8-bit fixed point
+            factor = round(self.contrast * 256)
+            out = mean + (((batch.astype(np.int32) - mean) * factor + 128) >> 8)
+            batch = np.clip(out, 0, 255).astype(np.uint8)
+        return batch
+
+
+class Normalize:
+    """
+    Scale pixels to floats in [0, 1], then subtract `mean` and divide by `std` (per channel
+    if tuples). The result is saved as a .npy array rather than an image.
+    """
+
+    def __init__(self, mean=0.0, std=1.0):
+        self.mean = mean
+        self.std = std
+
+    def config(self):
+        return {"op": "normalize", "mean": self.mean, "std": self.std}
+
+    def __call__(self, batch):
+        mean = np.asarray(self.mean, dtype=np.float32)
+        std = np.asarray(self.std, dtype=np.float32)
+        return (batch.astype(np.float32) / 255.0 - mean) / std
+
+
+class Watermark:
+    """
+    Composite an image (with its alpha channel) onto a corner of every image of the batch.
+
+    The watermark is loaded on first use, so the operation stays cheap to pickle.
+    """
+
+    POSITIONS = ("top-left", "top-right", "bottom-left", "bottom-right")
+
+    def __init__(self, path: str, opacity: float = 0.5, position: str = "bottom-right", margin: int = 8):
+        if position not in self.POSITIONS:
+            raise ValueError(f"Unknown watermark position '{position}', expected one of {self.POSITIONS}")
+        self.path = str(path)
+        self.opacity = opacity
+        self.position = position
+        self.margin = margin
+        self._mark = None
+
+    def config(self):
+        return {"op": "watermark", "path": self.path, "opacity": self.opacity,
+                "position": self.position, "margin": self.margin}
+
+    def __getstate__(self):
+        return dict(self.__dict__, _mark=None)
+
+    def __call__(self, batch):
+        if self._mark is None:
+            with Image.open(self.path) as img:
+                self._mark = np.asarray(img.convert("RGBA"), dtype=np.float32)
+        _, h, w, channels = batch.shape
+        mark = self._mark[:max(0, h - self.margin), :max(0, w - self.margin)]
+        mh, mw = mark.shape[:2]
+        top = self.margin if self.position.startswith("top") else h - mh - self.margin
+        left = self.margin if self.position.endswith("left") else w - mw - self.margin
+        top, left = max(0, top), max(0, left)
+        colour = ConvertMode("L")(mark[None, ..., :3].astype(np.uint8))[0] if channels == 1 else mark[..., :3]
+        alpha = mark[..., 3:] / 255.0 * self.opacity
+        out = batch.copy()
+        region = out[:, top:top + mh, left:left + mw, :min(channels, 3)].astype(np.float32)
+        out[:, top:top + mh, left:left + mw, :min(channels, 3)] = np.clip(
+            region * (1 - alpha) + colour * alpha + 0.5, 0, 255).astype(batch.dtype)
+        return out
+
+
+# Operation names accepted by parse_op (and by the --batch CLI argument)
+BATCH_OPS = {
+    "reduce": lambda factor: Reduce(int(factor)),
+    "enlarge": lambda factor: Enlarge(int(factor)),
+    "mode": lambda mode: ConvertMode(mode.upper()),
+    "brightness": lambda factor: BrightnessContrast(brightness=float(factor)),
+    "contrast": lambda factor: BrightnessContrast(contrast=float(factor)),
+    "normalize": lambda mean="0", std="1": Normalize(float(mean), float(std)),
+    "watermark": lambda path, opacity="0.5": Watermark(path, float(opacity)),
+}
+
+
+def parse_op(text: str):
+    """
+    Parse a batch operation of the form NAME[:ARG[:ARG]], e.g. "reduce:2" or "watermark:logo.png:0.3".
+
+    Args:
+        text (str): Operation specification (e.g. from the command line).
+
+    Returns:
+        Callable: The operation.
+
+    Raises:
+        ValueError: If the name is unknown or the arguments are invalid.
+    """
+    name, *args = text.split(":")
+    if name.lower() not in BATCH_OPS:
+        raise ValueError(f"Unknown batch operation '{name}', expected one of {tuple(BATCH_OPS)}")
+    try:
+        return BATCH_OPS[name.lower()](*args)
+    except TypeError:
+        raise ValueError(f"Invalid arguments for batch operation '{text}'") from None
+
+
+class BatchStep:
+    """
+    Batch step that runs vectorized operations on many same-sized images at once.
+
+    The images of a batch are decoded and stacked into one (N, height, width, channels)
+    NumPy array per size and mode, every operation is applied to the whole array, and each
+    image is then saved on its own. For many small images (icons, sprites) this replaces
+    thousands of per-image Pillow calls with a few array operations.
+
+    Attributes:
+        out_folder (Path): Folder to save processed images.
+        ops (List[Callable]): Operations applied in order, each taking and returning an array.
+        format (str): Output format, one of OUTPUT_FORMATS. Float results are saved as .npy.
+        quality (int): Encoder quality for lossy formats.
+        input_root (Optional[Path]): Input folder; outputs mirror the subdirectories below it.
+        sources (Optional[SourcePool]): Pool of memory-mapped inputs the sources are read from.
+    """
+
+    fields = ("processed_path", "processed_width", "processed_height", "error")
+
+    def __init__(self, output_folder: str, ops: List, format: str = "PNG", quality: int = JPEG_QUALITY,
+                 input_root: Optional[str] = None, sources: Optional[SourcePool] = None):
+        """
+        Initialize the step and create the output folder.
+
+        Args:
+            output_folder (str): Folder to save processed images.
+            ops (List[Callable]): Operations such as Reduce, ConvertMode or Watermark.
+            format (str): Output format ("JPEG", "PNG" or "WEBP"). Defaults to "PNG".
+            quality (int): Encoder quality for JPEG and WebP. Defaults to 85.
+            input_root (str, optional): Input folder whose subdirectories are mirrored in the output folder.
+            sources (SourcePool, optional): Read the sources through this pool of mappings. Defaults to None.
+
+        Raises:
+            ImportError: If NumPy is not installed.
+        """
+        require_numpy()
+        self.out_folder = Path(output_folder)
+        self.out_folder.mkdir(parents=True, exist_ok=True)
+        self.ops = list(ops)
+        self.format = check_format(format)
+        self.quality = quality
+        self.input_root = Path(input_root) if input_root is not None else None
+        self.sources = sources
+
+    def config(self) -> Dict[str, Any]:
+        """
+        Parameters that determine the output of this step.
+        """
+        return {"step": type(self).__name__, "output_folder": str(self.out_folder),
+                "ops": [op.config() for op in self.ops], "format": self.format, "quality": self.quality,
+                "input_root": str(self.input_root) if self.input_root is not None else None}
+
+    def __call__(self, tasks: List[tuple]) -> List[Dict[str, Any]]:
+        """
+        Process a batch of images.
+
+        Args:
+            tasks (List[tuple]): (path, info) pairs.
+
+        Returns:
+            List[dict]: Info about each processed image or an error message, in the order of tasks.
+        """
+        results: List[Dict[str, Any]] = [{} for _ in tasks]
+        groups: Dict[tuple, List[tuple]] = {}
+        with timed("decode"):
+            for i, (path, _) in enumerate(tasks):
+                try:
+                    with open_image(path, self.sources) as img:
+                        if img.mode not in ConvertMode.CHANNELS:
+                            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+                        arr = np.asarray(img)
+                except Exception as e:
+                    results[i] = {"error": str(e)}
+                    continue
+                if arr.ndim == 2:
+                    arr = arr[..., None]
+                groups.setdefault(arr.shape, []).append((i, arr))
+        for members in groups.values():
+            try:
+                batch = np.stack([arr for _, arr in members])
+                for op in self.ops:
+                    with timed(step_name(op)):
+                        batch = op(batch)
+            except Exception as e:
+                for i, _ in members:
+                    results[i] = {"error": str(e)}
+                continue
+            for (i, _), arr in zip(members, batch):
+                try:
+                    results[i] = self._save(arr, Path(tasks[i][0]))
+                except Exception as e:
+                    results[i] = {"error": str(e)}
+        return results
+
+    def _save(self, arr, path: Path) -> Dict[str, Any]:
+        """
+        Save one processed image, or its array if the operations produced floats.
+        """
+        if arr.dtype != np.uint8:
+            out_path = output_path(self.out_folder, path, "_processed.npy", self.input_root)
+            buf = io.BytesIO()
+            np.save(buf, arr)
+            with timed("write"):
+                write_atomic(out_path, buf.getbuffer())
+        else:
+            out_path = output_path(self.out_folder, path, f"_processed{OUTPUT_FORMATS[self.format]}",
+                                   self.input_root)
+            img = Image.fromarray(arr[..., 0] if arr.shape[2] == 1 else arr)
+            if img.mode not in SAVE_MODES[self.format]:
+                img = img.convert("RGB")
+            save_image(img, out_path, self.format, self.quality)
+        return {"processed_path": str(out_path), "processed_width": arr.shape[1], "processed_height": arr.shape[0]}
@@ -0,0 +1,225 @@
+"""
+Benchmark suite for the Parallel Image Processing Pipeline.
+
+Generates a synthetic corpus and runs ImagePipeline once per executor/worker combination,
+each in a fresh interpreter so that peak memory is measured per configuration. For every run
+it reports throughput (images/s, input MB/s), per-image processing latency (p50/p95/p99),
+the validation rate and peak RSS, and can write everything as JSON so results from
+different commits can be compared.
+
+Run with: 'python -m src.bench --count 200 --sizes 1920x1080 4000x3000 --workers 1 4 8'
+Compare:  'python -m src.bench --json new.json --compare old.json'
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+
+from PIL import Image
+
+from src.executor import EXECUTORS
+from src.pipeline import ImagePipeline
+
+
+def generate_corpus(folder: Path, count: int, sizes: List[tuple], fmt: str = "jpeg") -> int:
+    """
+    Write a synthetic corpus of images that compress like photographs (gradients plus noise).
+
+    Sizes are used round-robin, so a corpus can mix small and large images.
+
+    Args:
+        folder (Path): Destination folder (created if needed).
+        count (int): Number of images.
+        sizes (List[tuple]): (width, height) pairs.
+        fmt (str): "jpeg", "png" or "tiff".
+
+    Returns:
+        int: Total size of the corpus in bytes.
+    """
+    folder.mkdir(parents=True, exist_ok=True)
+    ext = {"jpeg": ".jpg", "png": ".png", "tiff": ".tiff"}[fmt]
+    templates = {}
+    for size in sizes:
+        gradient = Image.linear_gradient("L").resize(size)
+        radial = Image.radial_gradient("L").resize(size)
+        noise = Image.effect_noise(size, 48)
+        templates[size] = Image.merge("RGB", (gradient, radial, noise))
+    total = 0
+    for i in range(count):
+        size = sizes[i % len(sizes)]
+        # Rotate the template so the images are not byte-identical
+        img = templates[size].rotate(i % 360)
+        path = folder / f"synthetic_{i:06d}{ext}"
+        img.save(path, format=fmt.upper())
+        total += path.stat().st_size
+    return total
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Nearest-rank percentile of a list of values (0 for an empty list).
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[k]
+
+
+def run_config(corpus: str, output: str, executor: str, workers: int, scale: float,
+               corpus_bytes: int) -> Dict[str, Any]:
+    """
+    Run the pipeline once and measure it. Called in a fresh worker interpreter.
+
+    Args:
+        corpus (str): Input folder.
+        output (str): Output folder (emptied first).
+        executor (str): Executor backend.
+        workers (int): Number of workers.
+        scale (float): Resize factor.
+        corpus_bytes (int): Total input size, for the MB/s figure.
+
+    Returns:
+        Dict[str, Any]: Measurements of the run.
+    """
+    shutil.rmtree(output, ignore_errors=True)
+    pipeline = ImagePipeline(input_folder=corpus, output_folder=output, max_workers=workers,
+                             scale=scale, executor=executor)
+    pipeline.processor.record_timing = True
+
+    # Validation on its own, to catch regressions in ImageValidator
+    paths = pipeline.loader.get_image_paths()
+    start = time.perf_counter()
+    for p in paths:
+        pipeline.validator.validate(p)
+    validate_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    summary = pipeline.run()
+    wall = time.perf_counter() - start
+
+    with open(summary["csv"], newline="", encoding="utf-8") as f:
+        latencies = [float(r["elapsed_ms"]) for r in csv.DictReader(f) if r.get("elapsed_ms")]
+    rss_self = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    return {
+        "executor": executor,
+        "workers": workers,
+        "images": summary["count_processed"],
+        "wall_s": round(wall, 4),
+        "images_per_s": round(summary["count_processed"] / wall, 2) if wall else 0.0,
+        "mb_per_s": round(corpus_bytes / 1e6 / wall, 2) if wall else 0.0,
+        "latency_ms_p50": percentile(latencies, 50),
+        "latency_ms_p95": percentile(latencies, 95),
+        "latency_ms_p99": percentile(latencies, 99),
+        "validate_per_s": round(len(paths) / validate_s, 2) if validate_s else 0.0,
+        "peak_rss_mb": round(max(rss_self, rss_children) * unit / 1e6, 1),
+    }
+
+
+def git_commit() -> str:
+    """
+    Current git commit of the working tree, or "unknown" outside a repository.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str):
+    """
+    Print the throughput change of each configuration against a baseline JSON report.
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["executor"], r["workers"]): r for r in json.load(f)["results"]}
+    print(f"\nComparison with {baseline_path}:")
+    for r in results:
+        old = baseline.get((r["executor"], r["workers"]))
+        if not old or not old["images_per_s"]:
+            continue
+        change = (r["images_per_s"] / old["images_per_s"] - 1) * 100
+        print(f"  {r['executor']:>9} x{r['workers']:<3} {old['images_per_s']:>8.2f} -> "
+              f"{r['images_per_s']:>8.2f} img/s ({change:+.1f}%)")
+
+
+def parse_size(text: str) -> tuple:
+    """
+    Parse a WIDTHxHEIGHT string.
+    """
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def main():
+    """
+    Entry point: generate the corpus, run every configuration, print and optionally save the results.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the image processing pipeline")
+    parser.add_argument("--count", type=int, default=100, help="Number of synthetic images")
+    parser.add_argument("--sizes", type=parse_size, nargs="+", default=[(1920, 1080)],
+                        help="Image sizes (WIDTHxHEIGHT), used round-robin")
+    parser.add_argument("--format", choices=["jpeg", "png", "tiff"], default="jpeg", help="Corpus format")
+    parser.add_argument("--executors", nargs="+", choices=EXECUTORS, default=["threads", "processes"],
+                        help="Executor backends to benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4], help="Worker counts to benchmark")
+    parser.add_argument("--scale", type=float, default=0.5, help="Resize factor")
+    parser.add_argument("--corpus", default=None, help="Reuse (or create) the corpus in this folder")
+    parser.add_argument("--json", default=None, help="Write the results to this JSON file")
+    parser.add_argument("--compare", default=None, help="Baseline JSON file to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = Path(args.corpus) if args.corpus else Path(tmp) / "corpus"
+        if not corpus.exists() or not any(corpus.iterdir()):
+            print(f"[INFO] Generating {args.count} {args.format} images in {corpus}...")
+            generate_corpus(corpus, args.count, args.sizes, args.format)
+        corpus_bytes = sum(p.stat().st_size for p in corpus.iterdir() if p.is_file())
+
+        results = []
+        ctx = multiprocessing.get_context("spawn")
+        for executor in args.executors:
+            for workers in args.workers:
+                # A fresh interpreter per configuration keeps peak RSS figures independent
+                with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as runner:
+                    r = runner.submit(run_config, str(corpus), str(Path(tmp) / "out"), executor,
+                                      workers, args.scale, corpus_bytes).result()
+                results.append(r)
+                print(f"{executor:>9} x{workers:<3} {r['images_per_s']:>8.2f} img/s {r['mb_per_s']:>8.2f} MB/s  "
+                      f"p50 {r['latency_ms_p50']:.1f} / p95 {r['latency_ms_p95']:.1f} / "
+                      f"p99 {r['latency_ms_p99']:.1f} ms  validate {r['validate_per_s']:.0f}/s  "
+                      f"peak {r['peak_rss_mb']:.0f} MB")
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "corpus": {"count": args.count, "sizes": [f"{w}x{h}" for w, h in args.sizes],
+                   "format": args.format, "bytes": corpus_bytes},
+        "scale": args.scale,
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Results written to {args.json}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+from .source import SourcePool
+
+class ProcessingCache:
+    """
+    Persistent manifest of processed images, used to skip unchanged files on re-runs.
+
+    Entries are stored in a SQLite database in the output folder and keyed by the source path.
+    An entry is reused when the file still has the recorded size and modification time and was
+    processed with the same configuration (validator settings and step parameters). With
+    `hash_content`, a file whose size or mtime changed but whose content hash is unchanged
+    (e.g. after a copy or `touch`) is reused as well. An entry is only reused if its processed
+    output still exists.
+
+    Attributes:
+        path (Path): Location of the SQLite database.
+        config_key (str): Serialized processing configuration the entries must match.
+        hash_content (bool): Whether to fall back to a content hash when size/mtime differ.
+        sources (Optional[SourcePool]): Pool of memory-mapped inputs content hashes are computed from.
+    """
+
+    FILENAME = "manifest.sqlite"
+
+    def __init__(self, output_folder: str, config: Dict[str, Any], hash_content: bool = False,
+                 sources: Optional[SourcePool] = None):
+        """
+        Open (or create) the manifest in the output folder.
+
+        Args:
+            output_folder (str): Folder holding the manifest.
+            config (Dict[str, Any]): Processing configuration; entries made with a different one are ignored.
+            hash_content (bool): Compare content hashes when size or mtime changed. Defaults to False.
+            sources (SourcePool, optional): Hash the inputs through this pool of mappings. Defaults to None.
+        """
+        self.path = Path(output_folder) / self.FILENAME
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.config_key = json.dumps(config, sort_keys=True, default=str)
+        self.hash_content = hash_content
+        self.sources = sources
+        # One connection shared by the pipeline threads, serialized by a lock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT, config TEXT, rows TEXT)"
+        )
+        self._db.execute("CREATE TEMP TABLE seen (path TEXT PRIMARY KEY)")
+
+    @staticmethod
+    def file_digest(path: Path, sources: Optional[SourcePool] = None) -> str:
+        """
+        Compute the content hash of a file.
+
+        Args:
+            path (Path): File to hash.
+            sources (SourcePool, optional): Hash the file's shared mapping in place instead of reading it.
+
+        Returns:
+            str: Hex digest (BLAKE2b, 128 bits).
+        """
+        h = hashlib.blake2b(digest_size=16)
+        if sources is not None:
+            with sources.view(path) as data:
+                h.update(data)
+            return h.hexdigest()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    def lookup(self, path: Path) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return the cached report rows of an image if nothing relevant changed since they were stored.
+
+        Also marks the path as seen, so it survives evict_missing().
+
+        Args:
+            path (Path): Source image path.
+
+        Returns:
+            Optional[List[dict]]: Cached rows, or None if the image has to be processed again.
+        """
+        key = str(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            self._db.execute("INSERT OR IGNORE INTO seen VALUES (?)", (key,))
+            entry = self._db.execute(
+                "SELECT size, mtime_ns, digest, config, rows FROM entries WHERE path = ?", (key,)
+            ).fetchone()
+        if entry is None:
+            return None
+        size, mtime_ns, digest, config, rows = entry
+        if config != self.config_key or size != st.st_size:
+            return None
+        if mtime_ns != st.st_mtime_ns:
+            if not (self.hash_content and digest and self.file_digest(path, self.sources) == digest):
+                return None
+            with self._lock:
+                self._db.execute("UPDATE entries SET mtime_ns = ? WHERE path = ?", (st.st_mtime_ns, key))
+        rows = json.loads(rows)
+        # The outputs may have been deleted since the last run
+        for r in rows:
+            if r.get("processed_path") and not os.path.exists(r["processed_path"]):
+                return None
+        return rows
+
+    def store(self, path: Path, rows: Iterable[Dict[str, Any]]):
+        """
+        Record the report rows of an image.
+
+        Rows carrying a processing error are not stored, so the image is retried on the next run.
+
+        Args:
+            path (Path): Source image path.
+            rows (Iterable[dict]): Report rows produced for the image.
+        """
+        rows = list(rows)
+        if any(r.get("ok") and r.get("error") for r in rows):
+            return
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        digest = self.file_digest(path, self.sources) if self.hash_content else None
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (str(path), st.st_size, st.st_mtime_ns, digest, self.config_key, json.dumps(rows, default=str)),
+            )
+            self._db.execute("INSERT OR IGNORE INTO seen VALUES (?)", (str(path),))
+
+    def evict_missing(self) -> int:
+        """
+        Delete the entries of all sources that were not looked up or stored during this run.
+
+        Call once the whole input has been scanned.
+
+        Returns:
+            int: Number of evicted entries.
+        """
+        with self._lock:
+            cur = self._db.execute("DELETE FROM entries WHERE path NOT IN (SELECT path FROM seen)")
+            return cur.rowcount
+
+    def commit(self):
+        """
+        Commit the entries stored so far, e.g. after each batch of a long-running watch.
+        """
+        with self._lock:
+            self._db.commit()
+
+    def close(self):
+        """
+        Commit pending changes and close the database.
+        """
+        with self._lock:
+            self._db.commit()
+            self._db.close()
@@ -0,0 +1,185 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from PIL import Image
+from .cache import ProcessingCache
+from .source import SourcePool, open_image
+
+
+def dhash(path: Path, hash_size: int = 8, sources: Optional[SourcePool] = None) -> int:
+    """
+    Compute the difference hash (dHash) of an image from a downscaled decode.
+
+    The image is reduced to (hash_size + 1) x hash_size grey pixels and each bit records
+    whether a pixel is brighter than its right neighbour. Copies and re-encodes of the same
+    picture (e.g. at another JPEG quality) give hashes at most a few bits apart. JPEGs are
+    decoded at reduced scale (draft mode), so hashing costs a fraction of a full decode.
+
+    Args:
+        path (Path): Image file.
+        hash_size (int): Rows of the hash; the hash has hash_size ** 2 bits. Defaults to 8.
+        sources (SourcePool, optional): Read the image through this pool of mappings. Defaults to None.
+
+    Returns:
+        int: The hash, as an unsigned integer.
+    """
+    with open_image(path, sources) as img:
+        img.draft("L", ((hash_size + 1) * 4, hash_size * 4))
+        small = img.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BOX, reducing_gap=2.0)
+    pixels = small.tobytes()
+    bits = 0
+    for y in range(hash_size):
+        row = pixels[y * (hash_size + 1):(y + 1) * (hash_size + 1)]
+        for x in range(hash_size):
+            bits = (bits << 1) | (row[x] > row[x + 1])
+    return bits
+
+
+def hamming(a: int, b: int) -> int:
+    """
+    Number of differing bits between two hashes.
+    """
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree of hashes under the Hamming distance.
+
+    Each child hangs off its parent under its distance to the parent, so by the triangle
+    inequality a search within `max_distance` of a key only descends into children whose
+    edge lies within max_distance of the key's distance to the node. Lookups visit a small
+    part of the tree instead of comparing against every hash.
+    """
+
+    def __init__(self):
+        self.root = None  # (hash, item, {distance: child})
+        self.size = 0
+
+    def add(self, key: int, item: Any):
+        """
+        Insert a hash and the item it belongs to.
+        """
+        self.size += 1
+        if self.root is None:
+            self.root = (key, item, {})
+            return
+        node = self.root
+        while True:
+            d = hamming(key, node[0])
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = (key, item, {})
+                return
+            node = child
+
+    def find(self, key: int, max_distance: int) -> List[Tuple[int, Any]]:
+        """
+        Find the items whose hash is within max_distance of key.
+
+        Returns:
+            List[Tuple[int, Any]]: (distance, item) pairs, nearest first.
+        """
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node_key, item, children = stack.pop()
+            d = hamming(key, node_key)
+            if d <= max_distance:
+                found.append((d, item))
+            stack.extend(child for edge, child in children.items() if d - max_distance <= edge <= d + max_distance)
+        return sorted(found, key=lambda f: (f[0], str(f[1])))
+
+
+class Deduplicator:
+    """
+    Finds exact and near-duplicate images so that only one copy of each is processed.
+
+    An image is an exact duplicate of an earlier one with the same content hash, and a near
+    duplicate of the closest earlier image whose dHash is at most `max_distance` bits away.
+    Images are matched against the canonical (first seen) images only, so duplicates never
+    chain. match() is not thread-safe; hashes() can run in parallel.
+
+    Attributes:
+        max_distance (int): Largest Hamming distance between dHashes of near duplicates.
+        hash_size (int): dHash size (see dhash).
+        sources (Optional[SourcePool]): Pool of memory-mapped inputs both hashes are computed from.
+    """
+
+    def __init__(self, max_distance: int = 4, hash_size: int = 8, sources: Optional[SourcePool] = None):
+        """
+        Initialize an empty index.
+
+        Args:
+            max_distance (int): Largest dHash distance of near duplicates; 0 only matches
+                images with identical hashes. Defaults to 4 (of 64 bits).
+            hash_size (int): dHash size. Defaults to 8.
+            sources (SourcePool, optional): Read the images through this pool of mappings, so
+                the file is read once for both hashes and again by the processing steps. Defaults to None.
+        """
+        self.max_distance = max_distance
+        self.hash_size = hash_size
+        self.sources = sources
+        self._digests: Dict[str, str] = {}
+        self._tree = BKTree()
+
+    def config(self):
+        return {"max_distance": self.max_distance, "hash_size": self.hash_size}
+
+    def hashes(self, path: Path) -> Tuple[str, Optional[int]]:
+        """
+        Compute the content hash and the dHash of an image.
+
+        Returns:
+            Tuple[str, Optional[int]]: Content digest and dHash (None if the pixels cannot be decoded).
+        """
+        digest = ProcessingCache.file_digest(path, self.sources)
+        try:
+            return digest, dhash(path, self.hash_size, self.sources)
+        except Exception:
+            return digest, None
+
+    def match(self, path: Path, hashes: Tuple[str, Optional[int]]) -> Optional[str]:
+        """
+        Look up the canonical image an image duplicates, or register it as a new canonical image.
+
+        Args:
+            path (Path): Image path.
+            hashes (tuple): Its hashes(), computed beforehand.
+
+        Returns:
+            Optional[str]: Path of the canonical image, or None if the image is not a duplicate.
+        """
+        digest, image_hash = hashes
+        canonical = self._digests.get(digest)
+        if canonical is not None:
+            return canonical
+        if image_hash is not None:
+            near = self._tree.find(image_hash, self.max_distance)
+            if near:
+                return near[0][1]
+        self._digests[digest] = str(path)
+        if image_hash is not None:
+            self._tree.add(image_hash, str(path))
+        return None
+
+
+def duplicate_row(record: Dict[str, Any], canonical: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the result of a duplicate image from its validation record and the merged result
+    of its canonical image: the processing outputs are reused and "duplicate_of" names the
+    canonical image.
+
+    Args:
+        record (dict): Validation record of the duplicate.
+        canonical (dict): Merged validation and processing result of the canonical image.
+
+    Returns:
+        dict: The duplicate's result.
+    """
+    row = dict(record)
+    row.update({k: v for k, v in canonical.items() if k not in record and k != "metrics"})
+    row["source"] = record["path"]
+    if canonical.get("error"):
+        row["error"] = canonical["error"]
+    row["duplicate_of"] = str(canonical["path"])
+    return row
@@ -0,0 +1,50 @@
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Optional
+
+# Names accepted by make_executor (and by the --executor CLI argument)
+EXECUTORS = ("threads", "processes", "serial")
+
+
+class SerialExecutor(Executor):
+    """
+    Executor that runs every submitted task immediately in the calling thread.
+
+    Useful for debugging and profiling, and as a baseline when comparing the parallel backends.
+    """
+
+    def submit(self, fn, /, *args, **kwargs):
+        """
+        Run fn right away and return a completed Future holding its result or exception.
+        """
+        fut = Future()
+        try:
+            fut.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            fut.set_exception(e)
+        return fut
+
+
+def make_executor(kind: str = "threads", max_workers: int = 4,
+                  max_tasks_per_child: Optional[int] = None) -> Executor:
+    """
+    Create the executor backend used by ImageProcessor.run_parallel.
+
+    Args:
+        kind (str): "threads", "processes" or "serial".
+        max_workers (int): Number of worker threads or processes.
+        max_tasks_per_child (int, optional): Process backend only. Number of tasks after which a
+            worker process is replaced by a fresh one, to cap memory growth.
+
+    Returns:
+        Executor: A concurrent.futures executor, to be used as a context manager.
+
+    Raises:
+        ValueError: If kind is not one of EXECUTORS.
+    """
+    if kind == "threads":
+        return ThreadPoolExecutor(max_workers=max_workers)
+    if kind == "processes":
+        return ProcessPoolExecutor(max_workers=max_workers, max_tasks_per_child=max_tasks_per_child)
+    if kind == "serial":
+        return SerialExecutor()
+    raise ValueError(f"Unknown executor '{kind}', expected one of {EXECUTORS}")
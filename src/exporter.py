@@ -1,6 +1,41 @@
-from pathlib import Path
 import csv
-from typing import Iterable, Dict, Any
+import json
+import os
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Dict, Any, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency, only needed for Parquet reports
+    pa = pq = None
+
+
+def require_pyarrow():
+    """
+    Raise a clear error if PyArrow, needed for Parquet reports, is not installed.
+    """
+    if pa is None:
+        raise ImportError("Parquet reports need PyArrow: pip install pyarrow")
+
+
+def infer_fieldnames(rows: List[Dict[str, Any]]) -> List[str]:
+    """
+    Collect the keys of all rows, in order of first occurrence.
+
+    Args:
+        rows (List[Dict[str, Any]]): Row dictionaries.
+
+    Returns:
+        List[str]: Column names.
+    """
+    seen = {}
+    for r in rows:
+        for k in r.keys():
+            seen.setdefault(k, None)
+    return list(seen)
+
 
 class CSVExporter:
     """
@@ -36,31 +71,261 @@ class CSVExporter:
 
         Args:
             rows (Iterable[Dict[str, Any]]): Iterable of dictionaries representing rows.
-            fieldnames (List[str], optional): Column names. If None, inferred from keys.
+            fieldnames (List[str], optional): Column names. If None, inferred from keys, which
+                requires holding all rows in memory; with fieldnames, rows are written as they come.
 
         Returns:
             str: Full path to the written CSV file. Returns path even if rows are empty.
         """
 
-        rows = list(rows)
-        if not rows:
-            return str(self.path)
-
-        # Determine fieldnames from first occurrence of keys in rows if not provided
+        # Only rows without a known schema have to be held in memory to collect their keys
         if fieldnames is None:
-            seen = []
-            for r in rows:
-                for k in r.keys():
-                    if k not in seen:
-                        seen.append(k)
-            fieldnames = seen
+            rows = list(rows)
+            if not rows:
+                return str(self.path)
+            fieldnames = infer_fieldnames(rows)
 
-        # Open CSV file and write rows
-        with open(self.path, "w", newline="", encoding="utf-8") as f:
+        # Write to a temporary file and rename it, so an interrupted write keeps the old report intact
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
             writer = csv.DictWriter(f, fieldnames=fieldnames)
             writer.writeheader()
             for r in rows:
                 # Ensure all fieldnames are present in each row
                 writer.writerow({k: r.get(k, "") for k in fieldnames})
+        os.replace(tmp, self.path)
+
+        return str(self.path)
+
+    def write_stream(self, rows: Iterable[Dict[str, Any]], fieldnames: List[str], flush_every: int = 100) -> str:
+        """
+        Write rows to CSV as they arrive, without holding them in memory.
+
+        The header is written immediately, so the schema must be known upfront. Keys that
+        are not in fieldnames are ignored. The file is flushed every `flush_every` rows, so
+        the report can be followed while a long run is in progress.
+
+        Args:
+            rows (Iterable[Dict[str, Any]]): Iterable (typically a generator) of row dictionaries.
+            fieldnames (List[str]): Column names.
+            flush_every (int): Number of rows between flushes. Defaults to 100.
+
+        Returns:
+            str: Full path to the written CSV file.
+        """
+        with open(self.path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            for i, r in enumerate(rows, 1):
+                writer.writerow({k: r.get(k, "") for k in fieldnames})
+                if i % flush_every == 0:
+                    f.flush()
+
+        return str(self.path)
+
+
+class JSONLExporter(CSVExporter):
+    """
+    Writes the report as JSON Lines: one JSON object per image, so downstream tools can read
+    it record by record without parsing a CSV. Values keep their types (numbers, booleans,
+    null); paths are written as strings.
+    """
+
+    def __init__(self, output_folder: str = "output", filename: str = "report.jsonl"):
+        """
+        Initialize the JSONLExporter with the output folder and filename.
+
+        Args:
+            output_folder (str): Folder where the report will be saved. Defaults to "output".
+            filename (str): Name of the report file. Defaults to "report.jsonl".
+        """
+        super().__init__(output_folder, filename)
+
+    def write(self, rows: Iterable[Dict[str, Any]], fieldnames=None) -> str:
+        """
+        Write rows as JSON Lines, atomically replacing any previous report.
+
+        Args:
+            rows (Iterable[Dict[str, Any]]): Iterable of dictionaries representing rows.
+            fieldnames (List[str], optional): Keys to write, in order, missing ones as null.
+                If None, every row is written with its own keys.
+
+        Returns:
+            str: Full path to the written report.
+        """
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for r in rows:
+                f.write(self._line(r, fieldnames))
+        os.replace(tmp, self.path)
+
+        return str(self.path)
+
+    def write_stream(self, rows: Iterable[Dict[str, Any]], fieldnames: List[str], flush_every: int = 100) -> str:
+        """
+        Write rows as JSON Lines as they arrive, flushing every `flush_every` rows.
+
+        Args:
+            rows (Iterable[Dict[str, Any]]): Iterable (typically a generator) of row dictionaries.
+            fieldnames (List[str]): Keys to write; other keys are ignored.
+            flush_every (int): Number of rows between flushes. Defaults to 100.
+
+        Returns:
+            str: Full path to the written report.
+        """
+        with open(self.path, "w", encoding="utf-8") as f:
+            for i, r in enumerate(rows, 1):
+                f.write(self._line(r, fieldnames))
+                if i % flush_every == 0:
+                    f.flush()
+
+        return str(self.path)
+
+    @staticmethod
+    def _line(row: Dict[str, Any], fieldnames: Optional[List[str]]) -> str:
+        if fieldnames is not None:
+            row = {k: row.get(k) for k in fieldnames}
+        return json.dumps(row, default=str) + "\n"
+
+
+class ParquetExporter(CSVExporter):
+    """
+    Writes the report as a Parquet file for analytics tools, in row groups of a bounded number
+    of rows so that memory stays flat on large runs. Needs PyArrow.
+
+    Column types are inferred from the first row group; columns with no values there are
+    stored as strings. A Parquet file is only readable once its footer is written, so the
+    report is written to a temporary file and renamed when complete.
+    """
+
+    def __init__(self, output_folder: str = "output", filename: str = "report.parquet"):
+        """
+        Initialize the ParquetExporter with the output folder and filename.
+
+        Args:
+            output_folder (str): Folder where the report will be saved. Defaults to "output".
+            filename (str): Name of the report file. Defaults to "report.parquet".
+        """
+        super().__init__(output_folder, filename)
+
+    def write(self, rows: Iterable[Dict[str, Any]], fieldnames=None) -> str:
+        """
+        Write rows to a Parquet file. Determines the columns automatically if not provided.
+
+        Args:
+            rows (Iterable[Dict[str, Any]]): Iterable of dictionaries representing rows.
+            fieldnames (List[str], optional): Column names. If None, inferred from keys, which
+                requires holding all rows in memory.
+
+        Returns:
+            str: Full path to the written report.
+        """
+        if fieldnames is None:
+            rows = list(rows)
+            fieldnames = infer_fieldnames(rows)
+        return self.write_stream(rows, fieldnames)
+
+    def write_stream(self, rows: Iterable[Dict[str, Any]], fieldnames: List[str],
+                     row_group_size: int = 10000) -> str:
+        """
+        Write rows to a Parquet file one row group at a time, holding at most one group in memory.
+
+        Args:
+            rows (Iterable[Dict[str, Any]]): Iterable (typically a generator) of row dictionaries.
+            fieldnames (List[str]): Column names; other keys are ignored.
+            row_group_size (int): Rows per row group. Defaults to 10000.
+
+        Returns:
+            str: Full path to the written report.
+
+        Raises:
+            ImportError: If PyArrow is not installed.
+            ValueError: If a column holds values of a type incompatible with its first row group.
+        """
+        require_pyarrow()
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        rows = iter(rows)
+        writer = None
+        try:
+            while True:
+                group = list(islice(rows, row_group_size))
+                if not group and writer is not None:
+                    break
+                columns = {k: [self._value(r.get(k)) for r in group] for k in fieldnames}
+                if writer is None:
+                    schema = pa.schema([(k, self._column_type(v)) for k, v in columns.items()])
+                    writer = pq.ParquetWriter(tmp, schema)
+                writer.write_table(self._table(columns, schema))
+                if len(group) < row_group_size:
+                    break
+            writer.close()
+        except BaseException:
+            if writer is not None:
+                writer.close()
+            tmp.unlink(missing_ok=True)
+            raise
+        os.replace(tmp, self.path)
 
         return str(self.path)
+
+    @staticmethod
+    def _value(value):
+        """
+        Keep the scalar types Arrow understands and stringify the rest (e.g. paths).
+        """
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        return str(value)
+
+    @staticmethod
+    def _column_type(values):
+        """
+        Infer the Arrow type of a column; empty and mixed columns are stored as strings.
+        """
+        try:
+            t = pa.array(values).type
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            return pa.string()
+        return pa.string() if pa.types.is_null(t) else t
+
+    @staticmethod
+    def _table(columns, schema):
+        arrays = []
+        for field in schema:
+            values = columns[field.name]
+            if pa.types.is_string(field.type):
+                values = [v if v is None else str(v) for v in values]
+            try:
+                arrays.append(pa.array(values, type=field.type))
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                raise ValueError(f"Report column '{field.name}' does not fit type {field.type}: {e}") from None
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+
+# Report formats selectable with --report-format
+EXPORTERS = {"csv": CSVExporter, "jsonl": JSONLExporter, "parquet": ParquetExporter}
+
+
+def make_exporter(report_format: str = "csv", output_folder: str = "output"):
+    """
+    Create the exporter for a report format.
+
+    Args:
+        report_format (str): "csv", "jsonl" or "parquet".
+        output_folder (str): Folder where the report will be saved.
+
+    Returns:
+        CSVExporter: The exporter, writing "report.<format>" in the output folder.
+
+    Raises:
+        ValueError: If the format is unknown.
+        ImportError: If the format needs a library that is not installed.
+    """
+    try:
+        exporter_cls = EXPORTERS[report_format.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown report format '{report_format}', expected one of: "
+                         f"{', '.join(EXPORTERS)}") from None
+    if exporter_cls is ParquetExporter:
+        require_pyarrow()
+    return exporter_cls(output_folder=output_folder)
@@ -0,0 +1,582 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from PIL import Image, ImageDraw, ImageFont
+from .executor import make_executor
+from .metrics import ImageMetrics, collect, current, timed
+from .processor import JPEG_QUALITY, OUTPUT_FORMATS, SAVE_MODES, check_format, output_path, save_image, target_size
+from .scheduler import estimate_footprint
+from .source import SourcePool, open_image
+
+# Modes the JPEG decoder can produce directly (see Image.draft)
+DRAFT_MODES = ("RGB", "L")
+
+
+class Convert:
+    """
+    Convert the image to another pixel mode, e.g. "L" for greyscale.
+    """
+
+    def __init__(self, mode: str):
+        self.mode = mode
+
+    def config(self):
+        return {"op": "convert", "mode": self.mode}
+
+    def __call__(self, img: Image.Image, size: tuple) -> Tuple[Image.Image, tuple]:
+        return (img if img.mode == self.mode else img.convert(self.mode)), size
+
+
+class Resize:
+    """
+    Resize by a scale factor, or fit the longest side into a maximum dimension (never enlarging).
+    """
+
+    def __init__(self, scale: Optional[float] = None, max_size: Optional[int] = None):
+        if (scale is None) == (max_size is None):
+            raise ValueError("Resize needs exactly one of scale or max_size")
+        if (scale is not None and scale <= 0) or (max_size is not None and max_size < 1):
+            raise ValueError("Resize has an invalid size")
+        self.scale = scale
+        self.max_size = max_size
+
+    def config(self):
+        return {"op": "resize", "scale": self.scale, "max_size": self.max_size}
+
+    def target(self, size: tuple) -> tuple:
+        """
+        Output size for an input of the given size.
+        """
+        if self.scale is not None:
+            return target_size(size, self.scale)
+        return target_size(size, min(1.0, self.max_size / max(size)))
+
+
+class Watermark:
+    """
+    Overlay a text (e.g. "© Author") or a logo onto a corner or the centre of the image.
+
+    The mark is sized relative to the image, so every rendition carries a proportionate
+    mark. Only the covered region is composited; the input image is left untouched, as
+    other branches of the graph may share it. The logo and fonts are loaded on first use, so
+    the operation stays cheap to pickle.
+    """
+
+    POSITIONS = ("top-left", "top-right", "bottom-left", "bottom-right", "center")
+
+    def __init__(self, text: Optional[str] = None, logo: Optional[str] = None, opacity: float = 0.5,
+                 position: str = "bottom-right", size: float = 0.05, margin: float = 0.02):
+        """
+        Initialize the watermark.
+
+        Args:
+            text (str, optional): Text to draw, in white with a dark outline.
+            logo (str, optional): Image file to overlay (with its alpha channel). Exactly one of
+                text and logo must be given.
+            opacity (float): Opacity of the mark, in (0, 1]. Defaults to 0.5.
+            position (str): One of POSITIONS. Defaults to "bottom-right".
+            size (float): Height of the mark as a fraction of the image's shorter side. Defaults to 0.05.
+            margin (float): Distance from the edges as a fraction of the shorter side. Defaults to 0.02.
+
+        Raises:
+            ValueError: If the arguments are invalid.
+        """
+        if (text is None) == (logo is None):
+            raise ValueError("Watermark needs exactly one of text or logo")
+        if not 0 < opacity <= 1:
+            raise ValueError(f"Watermark opacity must be in (0, 1], got {opacity}")
+        if position not in self.POSITIONS:
+            raise ValueError(f"Unknown watermark position '{position}', expected one of {self.POSITIONS}")
+        self.text = text
+        self.logo = str(logo) if logo is not None else None
+        self.opacity = opacity
+        self.position = position
+        self.size = size
+        self.margin = margin
+        self._logo = None
+        self._fonts = {}
+
+    def config(self):
+        return {"op": "watermark", "text": self.text, "logo": self.logo, "opacity": self.opacity,
+                "position": self.position, "size": self.size, "margin": self.margin}
+
+    def __getstate__(self):
+        return dict(self.__dict__, _logo=None, _fonts={})
+
+    def _mark(self, height: int) -> Image.Image:
+        """
+        Render the mark at the given height, as RGBA with the opacity applied.
+        """
+        alpha = round(255 * self.opacity)
+        if self.text is not None:
+            font = self._fonts.get(height)
+            if font is None:
+                try:
+                    font = ImageFont.load_default(size=height)
+                except (TypeError, ImportError):  # Pillow without FreeType: fixed-size bitmap font
+                    font = ImageFont.load_default()
+                self._fonts[height] = font
+            stroke = max(1, height // 15)
+            left, top, right, bottom = ImageDraw.Draw(Image.new("L", (1, 1))).textbbox(
+                (0, 0), self.text, font=font, stroke_width=stroke)
+            mark = Image.new("RGBA", (right - left, bottom - top))
+            ImageDraw.Draw(mark).text((-left, -top), self.text, font=font, fill=(255, 255, 255, alpha),
+                                      stroke_width=stroke, stroke_fill=(0, 0, 0, alpha))
+            return mark
+        if self._logo is None:
+            with Image.open(self.logo) as img:
+                self._logo = img.convert("RGBA")
+        w, h = self._logo.size
+        mark = self._logo.resize((max(1, round(w * height / h)), height), Image.LANCZOS)
+        if alpha < 255:
+            mark.putalpha(mark.getchannel("A").point(lambda a: a * alpha // 255))
+        return mark
+
+    def __call__(self, img: Image.Image, size: tuple) -> Tuple[Image.Image, tuple]:
+        with timed("watermark"):
+            w, h = img.size
+            mark = self._mark(max(1, round(min(w, h) * self.size)))
+            # A mark larger than the image is cropped to it
+            mark = mark.crop((0, 0, min(mark.width, w), min(mark.height, h)))
+            margin = round(min(w, h) * self.margin)
+            if self.position == "center":
+                x, y = (w - mark.width) // 2, (h - mark.height) // 2
+            else:
+                x = margin if self.position.endswith("left") else w - mark.width - margin
+                y = margin if self.position.startswith("top") else h - mark.height - margin
+                x, y = max(0, x), max(0, y)
+            box = (x, y, x + mark.width, y + mark.height)
+            region = img.crop(box).convert("RGBA")
+            region.alpha_composite(mark)
+            out = img.copy()
+            out.paste(region.convert(img.mode), box)
+        return out, size
+
+
+class Save:
+    """
+    Encode the image and write it as `<stem>_<node name><extension>` in the output folder.
+    Save nodes are the leaves of a StepGraph.
+    """
+
+    def __init__(self, format: str = "JPEG", quality: int = JPEG_QUALITY):
+        self.format = check_format(format)
+        self.quality = quality
+
+    def config(self):
+        return {"op": "save", "format": self.format, "quality": self.quality}
+
+    def __call__(self, img: Image.Image, out_path: Path) -> Dict[str, Any]:
+        if img.mode not in SAVE_MODES[self.format]:
+            img = img.convert("RGB")
+        save_image(img, out_path, self.format, self.quality)
+        return {"processed_path": str(out_path), "processed_width": img.size[0],
+                "processed_height": img.size[1], "processed_format": self.format}
+
+
+class _ResizeChain:
+    """
+    Adjacent Resize nodes fused into one resampling pass to the size the last one would produce.
+    """
+
+    def __init__(self, resizes: List[Resize], reducing_gap: Optional[float]):
+        self.resizes = resizes
+        self.reducing_gap = reducing_gap
+
+    def target(self, size: tuple) -> tuple:
+        for r in self.resizes:
+            size = r.target(size)
+        return size
+
+    def __call__(self, img: Image.Image, size: tuple) -> Tuple[Image.Image, tuple]:
+        size = self.target(size)
+        if img.size != size:
+            with timed("resize"):
+                img = img.resize(size, Image.LANCZOS, reducing_gap=self.reducing_gap)
+        return img, size
+
+
+class Segment:
+    """
+    Part of a compiled graph: operations run back to back on one in-memory image, followed
+    by the branches that continue from its result (run concurrently) or by a Save.
+
+    Attributes:
+        names (List[str]): Name of each operation, "+"-joined where nodes were fused.
+        ops (List[Callable]): The (fused) operations.
+        branches (List[Segment]): Segments continuing from the result of the last operation.
+    """
+
+    def __init__(self, names: List[str], ops: List[Any], branches: List["Segment"]):
+        self.names = names
+        self.ops = ops
+        self.branches = branches
+
+    def first_targets(self, size: tuple) -> List[Optional[tuple]]:
+        """
+        Size produced by the first resize on every path from this segment (None for a path
+        using the image at its decoded size).
+        """
+        for op in self.ops:
+            if isinstance(op, _ResizeChain):
+                return [op.target(size)]
+            if not isinstance(op, Convert):
+                return [None]
+        return [t for b in self.branches for t in b.first_targets(size)]
+
+
+class Plan:
+    """
+    Compiled StepGraph: how the source is decoded and the segments that run on the result.
+
+    Attributes:
+        decode_mode (str): Mode the source is decoded to (a leading conversion of every
+            branch is done by the decoder).
+        branches (List[Segment]): Segments starting from the decoded source.
+    """
+
+    def __init__(self, decode_mode: str, branches: List[Segment]):
+        self.decode_mode = decode_mode
+        self.branches = branches
+
+    def decode_size(self, size: tuple) -> tuple:
+        """
+        Smallest size the source can be decoded at for a source of the given size: that of
+        the largest first resize, or the full size if some path uses the unresized image.
+        """
+        targets = [t for b in self.branches for t in b.first_targets(size)]
+        if not targets or None in targets:
+            return size
+        return max(targets, key=lambda t: t[0] * t[1])
+
+    def describe(self) -> List[str]:
+        """
+        One line per segment, indented by depth, e.g. "resize+resize > watermark > save:thumb".
+        """
+        lines = [f"decode {self.decode_mode}"]
+
+        def walk(segment, depth):
+            if segment.names:
+                lines.append("  " * depth + " > ".join(segment.names))
+            for b in segment.branches:
+                walk(b, depth + 1)
+        for b in self.branches:
+            walk(b, 1)
+        return lines
+
+
+class StepGraph:
+    """
+    Processing step running a declared graph of image operations on a single decode.
+
+    Each node (Convert, Resize, Watermark, or any callable taking and returning an
+    (image, size) pair) takes the in-memory image produced by its parent, the decoded source
+    for the first nodes; Save nodes encode and write the result. Several nodes may follow
+    the same parent, so one decode feeds e.g. a watermarked full-size output and a plain
+    thumbnail. Adding a node therefore costs only its own computation, not another decode,
+    save and re-open of the file.
+
+    compile() plans the graph once: chains of nodes are fused into segments run back to back
+    on the same image, adjacent resizes become one resampling pass, a conversion that
+    starts every branch is done by the decoder (JPEGs decode straight to greyscale), and with
+    `reducing_gap` the source is decoded at reduced scale, just large enough for the largest
+    first resize. When a node has several children, their branches run concurrently on
+    `branch_workers` threads.
+
+    With one Save node the step reports processed_path/width/height like ResizeAndSaveStep;
+    with several it returns one entry per Save under "renditions", which ImagePipeline
+    turns into one report row each (named in the "rendition" column).
+
+    Attributes:
+        out_folder (Path): Folder to save the outputs.
+        reducing_gap (Optional[float]): Draft/reduce tolerance (see ResizeAndSaveStep).
+        input_root (Optional[Path]): Input folder; outputs mirror the subdirectories below it.
+        sources (Optional[SourcePool]): Pool of memory-mapped inputs the sources are read from.
+        branch_workers (int): Threads running concurrent branches of one image.
+        nodes (Dict[str, Callable]): Operations by node name, in declaration order.
+        parents (Dict[str, str]): Parent of each node (SOURCE for the decoded source).
+    """
+
+    uses_info = True
+    SOURCE = "source"
+
+    def __init__(self, output_folder: str, reducing_gap: Optional[float] = None, input_root: Optional[str] = None,
+                 sources: Optional[SourcePool] = None, branch_workers: int = 2):
+        """
+        Initialize an empty graph and create the output folder.
+
+        Args:
+            output_folder (str): Folder to save the outputs.
+            reducing_gap (float, optional): Draft decoding / reducing resize tolerance. Defaults
+                to None (full decode).
+            input_root (str, optional): Input folder whose subdirectories are mirrored in the output folder.
+            sources (SourcePool, optional): Read the sources through this pool of mappings. Defaults to None.
+            branch_workers (int): Threads running the branches of one image concurrently; 1 runs
+                them one after the other. Defaults to 2.
+        """
+        self.out_folder = Path(output_folder)
+        self.out_folder.mkdir(parents=True, exist_ok=True)
+        self.reducing_gap = reducing_gap
+        self.input_root = Path(input_root) if input_root is not None else None
+        self.sources = sources
+        self.branch_workers = branch_workers
+        self.nodes: Dict[str, Any] = {}
+        self.parents: Dict[str, str] = {}
+        self._plan = None
+
+    def add(self, name: str, op, after: str = SOURCE) -> str:
+        """
+        Declare a node.
+
+        Args:
+            name (str): Unique node name; for a Save node, the output file suffix and rendition name.
+            op (Callable): The operation.
+            after (str): Name of the node whose image this node takes. Defaults to SOURCE.
+
+        Returns:
+            str: The node name, to pass as `after` of the next node.
+
+        Raises:
+            ValueError: If the name is taken or the parent is unknown or a Save node.
+        """
+        if name == self.SOURCE or name in self.nodes:
+            raise ValueError(f"Node name '{name}' is already used")
+        if after != self.SOURCE and after not in self.nodes:
+            raise ValueError(f"Unknown node '{after}'")
+        if isinstance(self.nodes.get(after), Save):
+            raise ValueError(f"Node '{name}' cannot follow the Save node '{after}'")
+        self.nodes[name] = op
+        self.parents[name] = after
+        self._plan = None
+        return name
+
+    @property
+    def sinks(self) -> List[str]:
+        """
+        Names of the Save nodes, in declaration order.
+        """
+        return [name for name, op in self.nodes.items() if isinstance(op, Save)]
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        if len(self.sinks) > 1:
+            return "rendition", "processed_path", "processed_width", "processed_height", "processed_format", "error"
+        return "processed_path", "processed_width", "processed_height", "error"
+
+    def config(self) -> Dict[str, Any]:
+        """
+        Parameters that determine the output of this step.
+        """
+        return {"step": type(self).__name__, "output_folder": str(self.out_folder),
+                "reducing_gap": self.reducing_gap,
+                "input_root": str(self.input_root) if self.input_root is not None else None,
+                "nodes": [dict(op.config() if hasattr(op, "config") else {"op": type(op).__qualname__},
+                               name=name, after=self.parents[name]) for name, op in self.nodes.items()]}
+
+    def __getstate__(self):
+        return dict(self.__dict__, _plan=None)
+
+    def compile(self) -> Plan:
+        """
+        Plan the graph (cached until the next add()).
+
+        Returns:
+            Plan: Segments with fused operations.
+
+        Raises:
+            ValueError: If the graph has no Save node or a branch does not end in one.
+        """
+        if self._plan is not None:
+            return self._plan
+        children: Dict[str, List[str]] = {name: [] for name in [self.SOURCE, *self.nodes]}
+        for name, parent in self.parents.items():
+            children[parent].append(name)
+        if not self.sinks:
+            raise ValueError("The graph has no Save node")
+        for name, kids in children.items():
+            if name != self.SOURCE and not kids and not isinstance(self.nodes[name], Save):
+                raise ValueError(f"Node '{name}' is not followed by a Save node; its result would be discarded")
+
+        def build(name: str) -> Segment:
+            chain = [name]
+            while len(children[chain[-1]]) == 1:
+                chain.append(children[chain[-1]][0])
+            names, ops = [], []
+            for n in chain:
+                op = self.nodes[n]
+                if isinstance(op, Resize) and ops and isinstance(ops[-1], _ResizeChain):
+                    names[-1] += f"+{n}"
+                    ops[-1].resizes.append(op)
+                    continue
+                if isinstance(op, Resize):
+                    op = _ResizeChain([op], self.reducing_gap)
+                names.append(f"save:{n}" if isinstance(op, Save) else n)
+                ops.append(op)
+            return Segment(names, ops, [build(k) for k in children[chain[-1]]])
+
+        branches = [build(k) for k in children[self.SOURCE]]
+        # A conversion starting every branch is done once, by the decoder
+        decode_mode = "RGB"
+        leading = {isinstance(b.ops[0], Convert) and b.ops[0].mode for b in branches}
+        if len(leading) == 1 and next(iter(leading)) in DRAFT_MODES:
+            decode_mode = next(iter(leading))
+            for b in branches:
+                b.names.pop(0)
+                b.ops.pop(0)
+        self._plan = Plan(decode_mode, branches)
+        return self._plan
+
+    def footprint(self, info: Dict[str, Any]) -> int:
+        """
+        Estimated peak memory for an image with the given validation record.
+        """
+        size = (info.get("width") or 0, info.get("height") or 0)
+        if not all(size):
+            return estimate_footprint(info)
+        return estimate_footprint(info, self.compile().decode_size(size))
+
+    def __call__(self, path: Path, info: Optional[Dict[str, Any]] = None):
+        """
+        Run the graph on an image.
+
+        Args:
+            path (Path): Input image path.
+            info (dict, optional): Validation record; its decoded "image" is reused if present.
+
+        Returns:
+            dict: Info about the output (or {"renditions": [...]} with several Save nodes), or an error message.
+        """
+        try:
+            plan = self.compile()
+            frame = info.get("image") if info else None
+            if frame is not None:
+                outputs = self._run(plan, frame, path)
+            else:
+                with open_image(path, self.sources) as img:
+                    outputs = self._run(plan, img, path)
+        except Exception as e:
+            return {"error": str(e)}
+        rows = [dict(outputs[name], rendition=name) for name in self.sinks]
+        if len(rows) > 1:
+            return {"renditions": rows}
+        row = rows[0]
+        del row["rendition"], row["processed_format"]
+        return row
+
+    def _run(self, plan: Plan, img: Image.Image, path: Path) -> Dict[str, Dict[str, Any]]:
+        """
+        Decode an opened image and run the segments of the plan on it.
+
+        Returns:
+            Dict[str, dict]: Result of each Save node.
+        """
+        size = img.size
+        with timed("decode"):
+            if self.reducing_gap is not None or plan.decode_mode != "RGB":
+                w, h = plan.decode_size(size) if self.reducing_gap is not None else size
+                gap = self.reducing_gap or 1.0
+                # Let the JPEG decoder skip detail and colour we would throw away anyway (no-op once decoded)
+                img.draft(plan.decode_mode, (int(w * gap), int(h * gap)))
+            img.load()
+            if img.mode != plan.decode_mode:
+                img = img.convert(plan.decode_mode)
+        outputs: Dict[str, Dict[str, Any]] = {}
+        forks = any(len(b.branches) > 1 for b in self._segments(plan.branches)) or len(plan.branches) > 1
+        if forks and self.branch_workers > 1:
+            with make_executor("threads", self.branch_workers) as ex:
+                self._run_branches(plan.branches, img, size, path, outputs, ex)
+        else:
+            self._run_branches(plan.branches, img, size, path, outputs, None)
+        return outputs
+
+    @staticmethod
+    def _segments(branches: List[Segment]):
+        for b in branches:
+            yield b
+            yield from StepGraph._segments(b.branches)
+
+    def _run_segment(self, segment: Segment, img: Image.Image, size: tuple, path: Path,
+                     outputs: Dict[str, Dict[str, Any]], ex):
+        """
+        Run the operations of a segment on an image, then its branches.
+        """
+        for name, op in zip(segment.names, segment.ops):
+            if isinstance(op, Save):
+                name = name[len("save:"):]
+                out_path = output_path(self.out_folder, path, f"_{name}{OUTPUT_FORMATS[op.format]}", self.input_root)
+                outputs[name] = op(img, out_path)
+            else:
+                img, size = op(img, size)
+        self._run_branches(segment.branches, img, size, path, outputs, ex)
+
+    def _run_branches(self, branches: List[Segment], img: Image.Image, size: tuple, path: Path,
+                      outputs: Dict[str, Dict[str, Any]], ex):
+        """
+        Run sibling branches on the same image: the first in this thread, the others on the
+        executor. A branch still queued when this thread gets to it is taken back and run
+        here, so nested forks never wait on a full pool.
+        """
+        if ex is None or len(branches) < 2:
+            for b in branches:
+                self._run_segment(b, img, size, path, outputs, ex)
+            return
+        parent = current()
+        futures = [(b, ex.submit(self._run_isolated, b, img, size, path, ex, parent is not None))
+                   for b in branches[1:]]
+        self._run_segment(branches[0], img, size, path, outputs, ex)
+        for b, fut in futures:
+            if fut.cancel():
+                self._run_segment(b, img, size, path, outputs, ex)
+                continue
+            out, metrics = fut.result()
+            outputs.update(out)
+            if metrics is not None:
+                parent.merge(metrics)
+
+    def _run_isolated(self, segment: Segment, img: Image.Image, size: tuple, path: Path, ex,
+                      with_metrics: bool) -> Tuple[Dict[str, Dict[str, Any]], Optional[ImageMetrics]]:
+        """
+        Run a branch on an executor thread, collecting its outputs (and metrics) separately.
+        """
+        outputs: Dict[str, Dict[str, Any]] = {}
+        if not with_metrics:
+            self._run_segment(segment, img, size, path, outputs, ex)
+            return outputs, None
+        metrics = ImageMetrics()
+        with collect(metrics):
+            self._run_segment(segment, img, size, path, outputs, ex)
+        return outputs, metrics
+
+
+def make_graph_step(output_folder: str, scale: float = 1.0, format: str = "JPEG", renditions=None,
+                    convert: Optional[str] = None, watermark: Optional[Watermark] = None,
+                    reducing_gap: Optional[float] = None, input_root: Optional[str] = None,
+                    sources: Optional[SourcePool] = None) -> StepGraph:
+    """
+    Build the graph of a resize (or of renditions) with an optional conversion before it and
+    an optional watermark after it: convert > resize > watermark > save, fused into one pass.
+
+    Args:
+        output_folder (str): Folder to save the outputs.
+        scale (float): Resize factor, without renditions.
+        format (str): Output format, without renditions. Defaults to "JPEG".
+        renditions (List[RenditionSpec], optional): One branch per rendition, all fed by the same decode.
+        convert (str, optional): Pixel mode to convert the source to, e.g. "L".
+        watermark (Watermark, optional): Watermark applied to every output after resizing.
+        reducing_gap (float, optional): Draft decoding / reducing resize tolerance.
+        input_root (str, optional): Input folder whose subdirectories are mirrored in the output folder.
+        sources (SourcePool, optional): Pool of memory-mapped inputs to read the sources from.
+
+    Returns:
+        StepGraph: The step. Outputs are named like those of ResizeAndSaveStep ("_processed")
+            or RenditionStep ("_<rendition name>").
+    """
+    graph = StepGraph(output_folder, reducing_gap=reducing_gap, input_root=input_root, sources=sources)
+    after = graph.add("convert", Convert(convert)) if convert else StepGraph.SOURCE
+    outputs = [(spec.name, Resize(spec.scale, spec.max_size), Save(spec.format, spec.quality))
+               for spec in renditions] if renditions else [("processed", Resize(scale), Save(format))]
+    for name, resize, save in outputs:
+        node = graph.add(f"resize_{name}", resize, after)
+        if watermark is not None:
+            node = graph.add(f"watermark_{name}", watermark, node)
+        graph.add(name, save, node)
+    return graph
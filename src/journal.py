@@ -0,0 +1,140 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class Journal:
+    """
+    Append-only checkpoint journal of the images completed by a run, used to resume after a crash.
+
+    Each completed image is appended as one JSON line, handed to the OS before append()
+    returns, so a crash of the process loses nothing. The file is fsync'd every `sync_every`
+    records or `sync_interval` seconds, and on close, so a crash of the whole machine loses
+    at most the records since the last fsync; those images, like one whose line was torn,
+    are simply processed again. The first line holds the processing configuration: a
+    journal written with different settings is not replayed.
+
+    Attributes:
+        path (Path): Location of the journal file.
+        config_key (str): Serialized processing configuration.
+        sync_every (int): Records appended between two fsyncs at most.
+        sync_interval (float): Seconds between two fsyncs at most, checked on append.
+    """
+
+    FILENAME = "journal.jsonl"
+
+    def __init__(self, output_folder: str, config: Dict[str, Any], resume: bool = False,
+                 sync_every: int = 256, sync_interval: float = 1.0):
+        """
+        Open the journal in the output folder.
+
+        Args:
+            output_folder (str): Folder holding the journal.
+            config (Dict[str, Any]): Processing configuration (validator and step parameters).
+            resume (bool): Keep the records of a previous, interrupted run (see replay()).
+                Otherwise the journal starts empty.
+            sync_every (int): Fsync after this many records at most. Defaults to 256.
+            sync_interval (float): Fsync after this many seconds at most. Defaults to 1.0.
+        """
+        self.path = Path(output_folder) / self.FILENAME
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.config_key = json.dumps(config, sort_keys=True, default=str)
+        self._records: Dict[str, Dict[str, Any]] = self._load() if resume else {}
+        self._lock = threading.Lock()
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        # Start from the valid records only, dropping a torn last line; the old journal is
+        # replaced atomically so a crash right now still leaves one of the two
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"config": self.config_key}) + "\n")
+            for record in self._records.values():
+                f.write(json.dumps(record, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._f = open(self.path, "a", encoding="utf-8")
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Read the records of a previous run, if it used the same configuration.
+        """
+        records = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = iter(f)
+                header = json.loads(next(lines, "{}"))
+                if header.get("config") != self.config_key:
+                    return {}
+                for line in lines:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # torn write at the moment of the crash
+                    records[str(record["path"])] = record
+        except (OSError, json.JSONDecodeError):
+            return {}
+        return records
+
+    def replay(self, path: Path) -> Optional[Dict[str, Any]]:
+        """
+        Return the journaled record of an image completed by the interrupted run.
+
+        Records whose processed output has disappeared since are not reused.
+
+        Args:
+            path (Path): Source image path.
+
+        Returns:
+            Optional[dict]: The record, or None if the image must be processed.
+        """
+        record = self._records.get(str(path))
+        if record is None:
+            return None
+        outputs = [r.get("processed_path") for r in record.get("renditions") or [record]]
+        if any(o and not os.path.exists(o) for o in outputs):
+            return None
+        return record
+
+    def append(self, record: Dict[str, Any]):
+        """
+        Record a completed image.
+
+        Args:
+            record (dict): Validation record merged with the processing results. Per-image
+                metrics are not journaled.
+        """
+        record = {k: v for k, v in record.items() if k != "metrics"}
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            self._f.write(line)
+            self._f.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every or time.monotonic() - self._synced_at >= self.sync_interval:
+                self._sync()
+
+    def _sync(self):
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def close(self, completed: bool = False):
+        """
+        Close the journal.
+
+        Args:
+            completed (bool): The run finished and its report is written; the journal is
+                deleted since there is nothing left to resume.
+        """
+        with self._lock:
+            if self._unsynced and not completed:
+                self._sync()
+            self._f.close()
+        if completed:
+            self.path.unlink(missing_ok=True)
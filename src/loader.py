@@ -1,43 +1,209 @@
+import os
+import queue
+import threading
+from fnmatch import fnmatch
 from pathlib import Path
-from typing import List
+from typing import Iterator, List, Optional
 
 class ImageLoader:
     """
     ImageLoader is responsible for scanning a folder and collecting paths of all supported image files.
 
+    The scan can be recursive. Subdirectories are then read concurrently by a small thread
+    pool, which hides the per-directory latency of network file systems. File types come from
+    the directory entries themselves (os.scandir), so no extra stat call is made per file.
+
     ```
     Attributes:
         folder_path (Path): Path object pointing to the folder containing images.
+        recursive (bool): Whether subdirectories are scanned too.
+        include (List[str]): Glob patterns a file's relative path must match (any of them).
+        exclude (List[str]): Glob patterns of relative paths (files or directories) to skip.
+        scan_workers (int): Number of threads reading directories in a recursive scan.
     """
 
-    def __init__(self, folder_path: str = "input"):
+    # Define allowed extensions (lowercase for comparison)
+    VALID_EXTS = {".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff"}
+
+    def __init__(self, folder_path: str = "input", recursive: bool = False,
+                 include: Optional[List[str]] = None, exclude: Optional[List[str]] = None,
+                 scan_workers: int = 4):
         """
         Initialize the ImageLoader with the folder to scan.
 
         Args:
             folder_path (str): Path to the folder containing images. Defaults to "input".
+            recursive (bool): Scan subdirectories too. Defaults to False.
+            include (List[str], optional): Only keep files whose path relative to the folder
+                matches one of these glob patterns (e.g. "2024-*/*.jpg").
+            exclude (List[str], optional): Skip files and directories whose relative path
+                matches one of these glob patterns (e.g. "*/thumbs").
+            scan_workers (int): Threads used for a recursive scan. Defaults to 4.
         """
         self.folder_path = Path(folder_path)
+        self.recursive = recursive
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.scan_workers = max(1, scan_workers)
 
 
-    def get_image_paths(self) -> List[Path]:
+    def _wanted(self, rel: str, name: str) -> bool:
         """
-        Retrieve a sorted list of paths to all image files in the folder matching supported extensions.
+        Check whether a file (given by its relative path and name) should be loaded.
+        """
+        # the suffix is lowercased so that .JPG matches .jpg
+        if os.path.splitext(name)[1].lower() not in self.VALID_EXTS:
+            return False
+        if self.include and not any(fnmatch(rel, p) for p in self.include):
+            return False
+        return not any(fnmatch(rel, p) for p in self.exclude)
 
-        Supported extensions include: .png, .jpg, .jpeg, .bmp, .gif, .tiff.
+    def matches(self, path: Path) -> bool:
+        """
+        Check whether a file found outside a scan (e.g. by a watcher) is one a scan would load.
+
+        Args:
+            path (Path): Path of the file, under the folder.
 
         Returns:
-            List[Path]: A sorted list of Path objects pointing to image files.
+            bool: True if the file has a supported extension and passes the folder, depth and
+                include/exclude rules.
+        """
+        try:
+            parts = Path(path).relative_to(self.folder_path).parts
+        except ValueError:
+            return False
+        if not parts or (len(parts) > 1 and not self.recursive):
+            return False
+        # Files under an excluded directory are skipped with it
+        for i in range(1, len(parts)):
+            if any(fnmatch("/".join(parts[:i]), p) for p in self.exclude):
+                return False
+        return self._wanted("/".join(parts), parts[-1])
+
+    def _iter_dir(self, directory: Path, rel: str):
+        """
+        Lazily read one directory.
+
+        Args:
+            directory (Path): Directory to read.
+            rel (str): Its path relative to the scanned folder ("" for the folder itself).
+
+        Yields:
+            tuple: (image path, None) for wanted files, (None, (subdirectory, relative path))
+                for subdirectories to descend into in a recursive scan.
+        """
+        with os.scandir(directory) as it:
+            for entry in it:
+                entry_rel = f"{rel}/{entry.name}" if rel else entry.name
+                if entry.is_file():
+                    if self._wanted(entry_rel, entry.name):
+                        yield directory / entry.name, None
+                elif self.recursive and entry.is_dir(follow_symlinks=False):
+                    if not any(fnmatch(entry_rel, p) for p in self.exclude):
+                        yield None, (directory / entry.name, entry_rel)
+
+    def _iter_recursive(self) -> Iterator[Path]:
         """
-        # Define allowed extensions (lowercase for comparison)
-        valid_exts = {".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tiff"}
-        paths = []
+        Walk the folder tree with a pool of threads, yielding image paths as directories are read.
+        """
+        dirs_q = queue.Queue()
+        found_q = queue.Queue(maxsize=10000)
+        done = object()  # end-of-scan marker
+        stop = threading.Event()
+        state = {"outstanding": 1, "error": None}
+        lock = threading.Lock()
+        dirs_q.put((self.folder_path, ""))
+
+        def worker():
+            while not stop.is_set():
+                item = dirs_q.get()
+                if item is done:
+                    return
+                try:
+                    files, subdirs = [], []
+                    try:
+                        for f, sub in self._iter_dir(*item):
+                            if f is not None:
+                                files.append(f)
+                            else:
+                                subdirs.append(sub)
+                    except OSError as e:
+                        # Unreadable subdirectories are skipped, an unreadable root is an error
+                        files, subdirs = [], []
+                        if item[1] == "":
+                            state["error"] = e
+                    for sub in subdirs:
+                        with lock:
+                            state["outstanding"] += 1
+                        dirs_q.put(sub)
+                    for f in files:
+                        while not stop.is_set():
+                            try:
+                                found_q.put(f, timeout=0.1)
+                                break
+                            except queue.Full:
+                                continue
+                except Exception as e:
+                    # Raised in the consumer once the scan ends; the directory still counts as done
+                    state["error"] = state["error"] or e
+                finally:
+                    with lock:
+                        state["outstanding"] -= 1
+                        finished = state["outstanding"] == 0
+                    if finished:
+                        for _ in range(self.scan_workers):
+                            dirs_q.put(done)
+                        found_q.put(done)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.scan_workers)]
+        for t in threads:
+            t.start()
+        try:
+            while True:
+                f = found_q.get()
+                if f is done:
+                    break
+                yield f
+        finally:
+            # Also reached when the consumer stops early: release the workers
+            stop.set()
+            for _ in range(self.scan_workers):
+                dirs_q.put(done)
+        if state["error"] is not None:
+            raise state["error"]
+
+    def iter_image_paths(self, sort: bool = False) -> Iterator[Path]:
+        """
+        Lazily yield paths to image files in the folder (and its subdirectories if recursive).
 
+        Nothing is buffered: the first path is available as soon as the first directory
+        starts being read. Paths come in directory order unless sorting is requested.
+
+        Args:
+            sort (bool): Collect all paths first and yield them sorted. Defaults to False.
+
+        Yields:
+            Path: Path objects pointing to image files.
+        """
         # Check if the input directory exists before scanning
-        if self.folder_path.exists():
-            for item in self.folder_path.glob("*"):
-                # item.suffix.lower() refactors .JPG to .jpg and then compares them
-                if item.is_file() and item.suffix.lower() in valid_exts:
-                    paths.append(item)
+        if not self.folder_path.exists():
+            return
+        if sort:
+            yield from sorted(self.iter_image_paths())
+        elif self.recursive:
+            yield from self._iter_recursive()
+        else:
+            for f, _ in self._iter_dir(self.folder_path, ""):
+                yield f
 
-        return sorted(paths)
+    def get_image_paths(self) -> List[Path]:
+        """
+        Retrieve a sorted list of paths to all image files in the folder matching supported extensions.
+
+        Supported extensions include: .png, .jpg, .jpeg, .bmp, .gif, .tif, .tiff.
+
+        Returns:
+            List[Path]: A sorted list of Path objects pointing to image files.
+        """
+        return list(self.iter_image_paths(sort=True))
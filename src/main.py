@@ -10,8 +10,21 @@ Date: 2025
 """
 
 from src.pipeline import ImagePipeline
+from src.renditions import RenditionSpec
+from src.graph import Watermark
+from src.metrics import PrometheusTextfileHook
+from src.scheduler import SCHEDULES, parse_memory
+from src.batch import parse_op, require_numpy
+from src.exporter import EXPORTERS, require_pyarrow
+from src.workqueue import SQLiteWorkQueue, run_worker
+from src.autoscale import AUTO
+from src.watch import make_watcher
+from src.validator import VERIFY_MODES
 import argparse
+import logging
+import signal
 import sys
+import threading
 from pathlib import Path
 
 
@@ -21,9 +34,32 @@ def validate_args(args):
     data integrity before processing starts.
 
     Checks:
-    1. If the input directory exists and is a directory.
-    2. If the number of workers is a positive integer.
+    1. If the input directory exists and is a directory (except for queue workers, which get
+       their tasks from the queue).
+    2. If the number of workers is "auto" or a positive integer (converted to int).
     3. If the scale factor is a positive float.
+    4. If the chunk size and recycle count, when given, are positive integers.
+    5. If the streaming queue size is a positive integer.
+    6. If the reducing gap, when given, is at least 1.0.
+    7. If every rendition specification is well-formed (parsed into args.renditions).
+    8. If the number of scan workers is a positive integer.
+    9. If the memory budget, when given, is a valid size (converted to bytes in args.max_memory).
+    10. If the tiling threshold, when given, is positive and the band rows and workers are positive integers.
+    11. If every batch operation is well-formed (parsed into args.batch_ops), NumPy is available
+        for them, and the batch size is a positive integer.
+    12. If PyArrow is available when a Parquet report is requested.
+    13. If the dedup distance is between 0 and 64 and deduplication is not combined with deep verification.
+    14. If a work queue is given for --worker, the visibility timeout and the queue timeout (if any)
+        are positive, the attempts are at least 1, and a coordinated run is neither streamed nor deep-verified.
+    15. If the I/O workers are not negative, the write buffer and pack threshold are valid sizes
+        (converted to bytes), and packing is not combined with options it cannot support.
+    16. If the maximum number of mapped inputs is a positive integer.
+    17. If the watermark is valid (built into args.watermark_op; a logo must exist) and neither it
+        nor --convert is combined with --batch, --io-workers or --pack.
+    18. If the debounce is not negative, the poll interval, when given, is positive, and --watch
+        is not combined with --stream, --queue, --pack or a Parquet report.
+    19. If a schedule other than fifo is not combined with --stream or --queue, and the bucket
+        schedules not with --max-memory.
 
     Args:
         args (Namespace): Parsed command-line arguments.
@@ -33,23 +69,171 @@ def validate_args(args):
     """
     # 1. Validate Input Directory
     input_path = Path(args.input)
-    if not input_path.exists():
+    if not args.worker and not input_path.exists():
         print(f"[ERROR] Input directory '{args.input}' does not exist.")
         sys.exit(1)
-    if not input_path.is_dir():
+    if not args.worker and not input_path.is_dir():
         print(f"[ERROR] The path '{args.input}' is not a directory.")
         sys.exit(1)
 
     # 2. Validate Worker Count
-    if args.workers < 1:
-        print(f"[ERROR] Number of workers must be at least 1. Received: {args.workers}")
-        sys.exit(1)
+    if args.workers != AUTO:
+        try:
+            args.workers = int(args.workers)
+        except ValueError:
+            print(f"[ERROR] Number of workers must be 'auto' or an integer. Received: {args.workers}")
+            sys.exit(1)
+        if args.workers < 1:
+            print(f"[ERROR] Number of workers must be at least 1. Received: {args.workers}")
+            sys.exit(1)
 
     # 3. Validate Scale Factor
     if args.scale <= 0:
         print(f"[ERROR] Scale factor must be greater than 0. Received: {args.scale}")
         sys.exit(1)
 
+    # 4. Validate Executor Tuning
+    if args.chunksize is not None and args.chunksize < 1:
+        print(f"[ERROR] Chunk size must be at least 1. Received: {args.chunksize}")
+        sys.exit(1)
+    if args.recycle_after is not None and args.recycle_after < 1:
+        print(f"[ERROR] Recycle count must be at least 1. Received: {args.recycle_after}")
+        sys.exit(1)
+
+    # 5. Validate Streaming Queue Size
+    if args.queue_size < 1:
+        print(f"[ERROR] Queue size must be at least 1. Received: {args.queue_size}")
+        sys.exit(1)
+
+    # 6. Validate Reducing Gap
+    if args.reducing_gap is not None and args.reducing_gap < 1.0:
+        print(f"[ERROR] Reducing gap must be at least 1.0. Received: {args.reducing_gap}")
+        sys.exit(1)
+
+    # 7. Validate Renditions
+    try:
+        args.renditions = [RenditionSpec.parse(r) for r in args.rendition or []]
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    # 8. Validate Scan Workers
+    if args.scan_workers < 1:
+        print(f"[ERROR] Number of scan workers must be at least 1. Received: {args.scan_workers}")
+        sys.exit(1)
+
+    # 9. Validate Memory Budget
+    try:
+        args.max_memory = parse_memory(args.max_memory) if args.max_memory is not None else None
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    # 10. Validate Tiling
+    if args.tile_above is not None and args.tile_above <= 0:
+        print(f"[ERROR] Tiling threshold must be greater than 0. Received: {args.tile_above}")
+        sys.exit(1)
+    if args.band_rows < 1 or args.band_workers < 1:
+        print(f"[ERROR] Band rows and band workers must be at least 1. Received: {args.band_rows}, {args.band_workers}")
+        sys.exit(1)
+
+    # 11. Validate Batch Operations
+    try:
+        args.batch_ops = [parse_op(op) for op in args.batch or []]
+        if args.batch_ops:
+            require_numpy()
+    except (ValueError, ImportError) as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    if args.batch_size < 1:
+        print(f"[ERROR] Batch size must be at least 1. Received: {args.batch_size}")
+        sys.exit(1)
+
+    # 12. Validate Report Format
+    if args.report_format == "parquet":
+        try:
+            require_pyarrow()
+        except ImportError as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+
+    # 13. Validate Deduplication
+    if not 0 <= args.dedup_distance <= 64:
+        print(f"[ERROR] Dedup distance must be between 0 and 64. Received: {args.dedup_distance}")
+        sys.exit(1)
+    if args.dedup and args.verify == "deep":
+        print("[ERROR] --dedup needs validation before processing; use --verify header, probe or verify.")
+        sys.exit(1)
+
+    # 14. Validate Work Queue
+    if args.worker and not args.queue:
+        print("[ERROR] --worker needs the --queue shared with the coordinator.")
+        sys.exit(1)
+    if args.visibility_timeout <= 0 or args.max_attempts < 1:
+        print(f"[ERROR] Visibility timeout must be positive and attempts at least 1. "
+              f"Received: {args.visibility_timeout}, {args.max_attempts}")
+        sys.exit(1)
+    if args.queue_timeout is not None and args.queue_timeout <= 0:
+        print(f"[ERROR] Queue timeout must be positive. Received: {args.queue_timeout}")
+        sys.exit(1)
+    if args.queue and not args.worker and (args.stream or args.verify == "deep"):
+        print("[ERROR] A coordinated run (--queue) cannot use --stream or --verify deep.")
+        sys.exit(1)
+
+    # 15. Validate Writer Stage
+    if args.io_workers < 0:
+        print(f"[ERROR] Number of I/O workers cannot be negative. Received: {args.io_workers}")
+        sys.exit(1)
+    try:
+        args.write_buffer = parse_memory(args.write_buffer)
+        args.pack_below = parse_memory(args.pack_below) if args.pack_below is not None else None
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    if args.pack and (args.incremental or args.rendition or args.batch or args.queue or args.executor == "processes"):
+        print("[ERROR] --pack cannot be combined with --incremental, --rendition, --batch, --queue "
+              "or --executor processes.")
+        sys.exit(1)
+
+    # 16. Validate Input Mapping
+    if args.max_open_maps < 1:
+        print(f"[ERROR] Maximum number of mapped inputs must be at least 1. Received: {args.max_open_maps}")
+        sys.exit(1)
+
+    # 17. Validate Watermark and Conversion
+    args.watermark_op = None
+    if args.watermark:
+        logo = args.watermark[1:] if args.watermark.startswith("@") else None
+        if logo is not None and not Path(logo).is_file():
+            print(f"[ERROR] Watermark logo not found: {logo}")
+            sys.exit(1)
+        try:
+            args.watermark_op = Watermark(text=None if logo else args.watermark, logo=logo,
+                                          opacity=args.watermark_opacity, position=args.watermark_position)
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+    if (args.watermark or args.convert) and (args.batch or args.io_workers or args.pack):
+        print("[ERROR] --watermark and --convert cannot be combined with --batch, --io-workers or --pack.")
+        sys.exit(1)
+
+    # 18. Validate Watch Mode
+    if args.debounce < 0 or (args.poll_interval is not None and args.poll_interval <= 0):
+        print(f"[ERROR] Debounce cannot be negative and the poll interval must be positive. "
+              f"Received: {args.debounce}, {args.poll_interval}")
+        sys.exit(1)
+    if args.watch and (args.stream or args.queue or args.pack or args.report_format == "parquet"):
+        print("[ERROR] --watch cannot be combined with --stream, --queue, --pack or --report-format parquet.")
+        sys.exit(1)
+
+    # 19. Validate Schedule
+    if args.schedule != "fifo" and (args.stream or args.queue):
+        print("[ERROR] --schedule cannot be combined with --stream or --queue, which process images in arrival order.")
+        sys.exit(1)
+    if args.schedule in ("buckets", "steal") and args.max_memory:
+        print("[ERROR] --schedule buckets and steal cannot be combined with --max-memory.")
+        sys.exit(1)
+
 
 def main():
     """
@@ -60,47 +244,279 @@ def main():
         - Validates the provided arguments to prevent invalid execution states.
         - Instantiates the ImagePipeline with the provided parameters.
         - Executes the pipeline: loading, validating, processing images, and exporting results.
-        - Prints a summary including CSV report path, number of validated images, and number processed.
+        - Prints a summary including the report path, number of validated images, and number processed.
 
     Command-line arguments:
         --input (str): Input folder containing images. Defaults to "input".
         --output (str): Output folder to save processed images and CSV. Defaults to "output".
-        --workers (int): Maximum number of parallel threads for processing. Defaults to 4.
+        --workers (str): Number of parallel workers, or "auto" to grow and shrink the pool at runtime
+            from task latency, input waits and CPU utilisation (decisions are logged). Defaults to "auto".
         --scale (float): Resize scale (0.5 = 50%). Defaults to 1.0 (no resize).
+        --verify (str): Validation depth: "header", "probe", "verify" or "deep". Defaults to "verify".
+        --executor (str): Execution backend: "threads", "processes" or "serial". Defaults to "threads".
+        --chunksize (int): Images handed to a worker at once. Defaults to a backend-specific value.
+        --recycle-after (int): Replace worker processes after this many images. Defaults to never.
+        --max-memory (str): Budget for the decoded images in flight, e.g. "2G". Defaults to unlimited.
+        --schedule (str): Order of the images handed to the workers: "fifo", "lpt" (largest first),
+            "buckets" (size classes with their own workers) or "steal" (buckets with work stealing).
+            Defaults to "fifo".
+        --stream (flag): Overlap loading, validation, processing and report export.
+        --queue-size (int): Capacity of the bounded queues between streaming stages. Defaults to 256.
+        --incremental (flag): Reuse results of images unchanged since the previous run.
+        --hash-content (flag): With --incremental, compare content hashes when size or mtime changed.
+        --journal (flag): Checkpoint each completed image in a journal in the output folder, so
+            an interrupted run can be continued with --resume.
+        --resume (flag): Continue an interrupted run from its checkpoint journal in the output folder.
+        --dedup (flag): Process one image per group of exact or near duplicates; the others reuse
+            its outputs and the report names it in a duplicate_of column.
+        --dedup-distance (int): Largest perceptual hash distance (bits of 64) of near duplicates. Defaults to 4.
+        --queue (str): SQLite work queue on shared storage. Without --worker, coordinate a distributed
+            run: validate, queue the images and merge the workers' results into the report.
+        --worker (flag): Process images from --queue with --workers/--executor until the run ends.
+        --visibility-timeout (float): Seconds before the task of a silent worker is retried. Defaults to 300.
+        --max-attempts (int): Leases of a task before it is reported as failed. Defaults to 3.
+        --queue-timeout (float): Coordinator only: fail the run when no worker returns a result
+            for this many seconds. Defaults to waiting forever.
+        --reducing-gap (float): Speed/quality knob for large downscales (draft JPEG decoding and
+            reducing resize). Defaults to None (full decode).
+        --format (str): Output format of the processed images: "jpeg", "png" or "webp". Defaults to "jpeg".
+        --rendition (str): Rendition NAME:SIZE[:FORMAT[:QUALITY]], repeatable. Replaces --scale/--format
+            and produces every rendition from a single decode.
+        --convert (str): Convert the images to this pixel mode ("L", "RGB" or "RGBA") before resizing.
+        --watermark (str): Text (or "@PATH" of a logo) overlaid on every output after resizing.
+        --watermark-opacity (float): Opacity of the watermark, in (0, 1]. Defaults to 0.5.
+        --watermark-position (str): Corner or "center" where the watermark goes. Defaults to "bottom-right".
+        --tile-above (float): Resize TIFFs of at least this many megapixels band by band into PNGs,
+            with bounded memory. Defaults to None (always decode whole images).
+        --band-rows (int): Source rows decoded per band on the tiled path. Defaults to 256.
+        --band-workers (int): Threads sharing the bands of one tiled image. Defaults to 1.
+        --batch (str): Vectorized operation NAME[:ARG[:ARG]], repeatable (reduce, enlarge, mode,
+            brightness, contrast, normalize, watermark). Processes same-sized images in NumPy batches.
+        --batch-size (int): Images per batch with --batch. Defaults to 64.
+        --io-workers (int): Threads of a writer stage taking encoded outputs off the CPU workers.
+            Defaults to 0 (each worker writes its own outputs).
+        --write-buffer (str): Bound on the encoded outputs waiting for the writer stage. Defaults to "64M".
+        --pack (flag): Pack the resized images into outputs.zip in the output folder instead of separate files.
+        --pack-below (str): With --pack, only pack outputs smaller than this size, e.g. "64K".
+        --mmap (flag): Memory-map each input once and share it between validation, hashing and processing.
+        --max-open-maps (int): With --mmap, maximum number of inputs mapped at once per process. Defaults to 64.
+        --report-format (str): Report file format: "csv", "jsonl" or "parquet" (needs PyArrow).
+            Defaults to "csv".
+        --metrics (flag): Print per-stage timings and byte counts after the run.
+        --metrics-columns (flag): Add per-image timing and byte columns to the report.
+        --prometheus (flag): Write the metrics to pipeline.prom in the output folder (textfile collector).
+        --recursive (flag): Also process subdirectories; outputs mirror the input tree.
+        --include / --exclude (str): Glob patterns of relative paths to process / skip, repeatable.
+        --scan-workers (int): Threads reading directories in a recursive scan. Defaults to 4.
+        --watch (flag): Keep running: process the images present, then the new and changed ones
+            as they land (inotify, or polling), appending their rows to the report. Stop with Ctrl+C.
+        --debounce (float): Seconds a new file must stay unchanged before it is processed. Defaults to 0.5.
+        --poll-interval (float): With --watch, rescan the folder every this many seconds instead of
+            using inotify (e.g. on network file systems). Defaults to None (inotify when available).
     """
     # Parse command-line arguments
     parser = argparse.ArgumentParser(description="Parallel Image Processing Pipeline")
     parser.add_argument("--input", default="input", help="Input folder containing images")
     parser.add_argument("--output", default="output", help="Output folder to save processed images and CSV")
-    parser.add_argument("--workers", type=int, default=4, help="Maximum number of parallel threads for processing")
+    parser.add_argument("--workers", default=AUTO,
+                        help="Number of parallel workers, or 'auto' to adapt it at runtime to the host and storage")
     parser.add_argument("--scale", type=float, default=1.0, help="Resize scale factor (0.5 = 50%)")
+    parser.add_argument("--verify", choices=list(VERIFY_MODES), default="verify",
+                        help="Validation depth: header only, header and end markers without Pillow, structural verify, "
+                             "or full decode reused by the resize step")
+    parser.add_argument("--executor", choices=["threads", "processes", "serial"], default="threads",
+                        help="Execution backend (use 'processes' for CPU-bound work on many cores)")
+    parser.add_argument("--chunksize", type=int, default=None, help="Images handed to a worker at once")
+    parser.add_argument("--recycle-after", type=int, default=None,
+                        help="Replace worker processes after this many images to cap memory growth")
+    parser.add_argument("--max-memory", default=None, metavar="SIZE",
+                        help="Only start images while their estimated decoded size fits in this budget (e.g. 2G)")
+    parser.add_argument("--schedule", choices=list(SCHEDULES), default="fifo",
+                        help="Task order: as scanned, largest first (lpt), size buckets with their own workers, "
+                             "or buckets whose idle workers steal from the others")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream files through all stages and append report rows as they complete")
+    parser.add_argument("--queue-size", type=int, default=256, help="Capacity of the queues between streaming stages")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Skip images unchanged since the previous run (manifest kept in the output folder)")
+    parser.add_argument("--hash-content", action="store_true",
+                        help="With --incremental, treat files with changed mtime but identical content as unchanged")
+    parser.add_argument("--journal", action="store_true",
+                        help="Checkpoint completed images in a journal in the output folder, for --resume")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run: skip images recorded in the journal of the output folder")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Skip exact and near-duplicate images; they reuse the outputs of the first copy")
+    parser.add_argument("--dedup-distance", type=int, default=4,
+                        help="Largest dHash distance (bits of 64) between near duplicates with --dedup")
+    parser.add_argument("--queue", metavar="PATH",
+                        help="SQLite work queue shared with worker nodes; coordinates a distributed run unless --worker")
+    parser.add_argument("--worker", action="store_true",
+                        help="Run as a worker node: process images leased from --queue until the coordinator finishes")
+    parser.add_argument("--visibility-timeout", type=float, default=300.0,
+                        help="Seconds a leased task may run without progress before another worker retries it")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Leases of a task before it is reported as failed")
+    parser.add_argument("--queue-timeout", type=float, default=None,
+                        help="Coordinator: fail the run when no worker returns a result for this many seconds")
+    parser.add_argument("--reducing-gap", type=float, default=None,
+                        help="Faster downscaling: decode JPEGs at reduced DCT scale and pre-shrink others, "
+                             "keeping at least this multiple of the target size (>= 1.0; 2.0 fast, 3.0 near-lossless)")
+    parser.add_argument("--format", choices=["jpeg", "png", "webp"], default="jpeg",
+                        help="Output format of the processed images")
+    parser.add_argument("--rendition", action="append", metavar="NAME:SIZE[:FORMAT[:QUALITY]]",
+                        help="Produce this rendition (SIZE is a scale like 0.5 or a max dimension like 256px); "
+                             "repeat for several renditions from one decode")
+    parser.add_argument("--convert", choices=["L", "RGB", "RGBA"], default=None,
+                        help="Convert the images to this pixel mode before resizing (L = greyscale)")
+    parser.add_argument("--watermark", default=None, metavar="TEXT|@LOGO",
+                        help="Overlay this text, or the logo image at @PATH, on every output after resizing")
+    parser.add_argument("--watermark-opacity", type=float, default=0.5, help="Opacity of the watermark, in (0, 1]")
+    parser.add_argument("--watermark-position", choices=Watermark.POSITIONS, default="bottom-right",
+                        help="Where the watermark goes")
+    parser.add_argument("--tile-above", type=float, default=None, metavar="MEGAPIXELS",
+                        help="Resize TIFFs of at least this many megapixels band by band (PNG output, bounded memory)")
+    parser.add_argument("--band-rows", type=int, default=256, help="Source rows decoded per band on the tiled path")
+    parser.add_argument("--band-workers", type=int, default=1, help="Threads sharing the bands of one tiled image")
+    parser.add_argument("--batch", action="append", metavar="OP[:ARG[:ARG]]",
+                        help="Apply this vectorized operation to same-sized images in batches (repeatable, in order): "
+                             "reduce:N, enlarge:N, mode:L|RGB|RGBA, brightness:F, contrast:F, "
+                             "normalize[:MEAN:STD], watermark:PATH[:OPACITY]. Needs NumPy")
+    parser.add_argument("--batch-size", type=int, default=64, help="Images per batch with --batch")
+    parser.add_argument("--recursive", action="store_true",
+                        help="Scan subdirectories too; outputs keep the relative directory structure")
+    parser.add_argument("--include", action="append", metavar="GLOB",
+                        help="Only process files whose relative path matches this pattern (repeatable)")
+    parser.add_argument("--exclude", action="append", metavar="GLOB",
+                        help="Skip files and directories whose relative path matches this pattern (repeatable)")
+    parser.add_argument("--scan-workers", type=int, default=4, help="Threads reading directories in a recursive scan")
+    parser.add_argument("--io-workers", type=int, default=0,
+                        help="Threads writing encoded outputs, so CPU workers move on to the next image at once")
+    parser.add_argument("--write-buffer", default="64M", metavar="SIZE",
+                        help="Bound on the encoded outputs waiting for the I/O workers, e.g. 64M")
+    parser.add_argument("--pack", action="store_true",
+                        help="Pack resized images into one indexed archive (outputs.zip) instead of separate files")
+    parser.add_argument("--pack-below", default=None, metavar="SIZE",
+                        help="With --pack, only pack outputs smaller than this size (e.g. 64K); larger ones stay files")
+    parser.add_argument("--mmap", action="store_true",
+                        help="Memory-map each input once and share it between validation, hashing and processing")
+    parser.add_argument("--max-open-maps", type=int, default=64,
+                        help="With --mmap, maximum number of inputs mapped at once per process")
+    parser.add_argument("--report-format", choices=list(EXPORTERS), default="csv",
+                        help="Report file format (parquet needs PyArrow); streamed runs append rows as they complete")
+    parser.add_argument("--metrics", action="store_true", help="Print per-stage timings and byte counts")
+    parser.add_argument("--metrics-columns", action="store_true",
+                        help="Add per-image timing (decode/resize/encode/write) and byte columns to the report")
+    parser.add_argument("--prometheus", action="store_true",
+                        help="Write metrics to pipeline.prom in the output folder for the Prometheus textfile collector")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and process new or changed images as they land (stop with Ctrl+C)")
+    parser.add_argument("--debounce", type=float, default=0.5,
+                        help="With --watch, seconds a new file must stay unchanged before it is processed")
+    parser.add_argument("--poll-interval", type=float, default=None, metavar="SECONDS",
+                        help="With --watch, rescan the folder at this interval instead of using inotify "
+                             "(for network file systems)")
     args = parser.parse_args()
 
     # --- VALIDATION STEP ---
     validate_args(args)
     # -----------------------
 
+    # Autoscaling decisions are logged as they happen
+    logging.basicConfig(format="[%(levelname)s] %(message)s")
+    logging.getLogger("src.autoscale").setLevel(logging.INFO)
+
+    if args.worker:
+        print(f"[INFO] Worker waiting for tasks on {args.queue} | Workers: {args.workers} ({args.executor})")
+        count = run_worker(SQLiteWorkQueue(args.queue), max_workers=args.workers, executor=args.executor)
+        print(f"[SUCCESS] Run finished. Images processed by this worker: {count}")
+        return
+
     print("[INFO] Starting image processing pipeline...")
     print(f"[INFO] Input Directory: {args.input}")
-    print(f"[INFO] Threads: {args.workers} | Scale: {args.scale}")
+    print(f"[INFO] Workers: {args.workers} ({args.executor}) | Scale: {args.scale}")
 
     # Initialize the image processing pipeline with provided arguments
     pipeline = ImagePipeline(
         input_folder=args.input,
         output_folder=args.output,
         max_workers=args.workers,
-        scale=args.scale
+        scale=args.scale,
+        verify_mode=args.verify,
+        executor=args.executor,
+        chunksize=args.chunksize,
+        recycle_after=args.recycle_after,
+        max_memory=args.max_memory,
+        schedule=args.schedule,
+        streaming=args.stream,
+        queue_size=args.queue_size,
+        incremental=args.incremental,
+        hash_content=args.hash_content,
+        resume=args.resume,
+        journal=args.journal,
+        dedup=args.dedup,
+        dedup_distance=args.dedup_distance,
+        work_queue=SQLiteWorkQueue(args.queue, visibility_timeout=args.visibility_timeout, max_attempts=args.max_attempts,
+                                   idle_timeout=args.queue_timeout) if args.queue else None,
+        reducing_gap=args.reducing_gap,
+        output_format=args.format,
+        renditions=args.renditions,
+        convert_mode=args.convert,
+        watermark=args.watermark_op,
+        tile_above=int(args.tile_above * 1_000_000) if args.tile_above else None,
+        band_rows=args.band_rows,
+        band_workers=args.band_workers,
+        batch_ops=args.batch_ops,
+        batch_size=args.batch_size,
+        io_workers=args.io_workers,
+        write_buffer=args.write_buffer,
+        pack=args.pack,
+        pack_below=args.pack_below,
+        map_inputs=args.mmap,
+        max_open_maps=args.max_open_maps,
+        report_format=args.report_format,
+        metrics=args.metrics,
+        metrics_columns=args.metrics_columns,
+        metrics_hooks=[PrometheusTextfileHook(args.output)] if args.prometheus else None,
+        recursive=args.recursive,
+        include=args.include,
+        exclude=args.exclude,
+        scan_workers=args.scan_workers
     )
 
     # Run the pipeline (load, validate, process, export)
     try:
-        results = pipeline.run()
+        if args.watch:
+            # Ctrl+C or a service manager's SIGTERM ends the watch after the current batch
+            stop = threading.Event()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, lambda *_: stop.set())
+            print(f"[INFO] Watching {args.input} for new images (Ctrl+C to stop)...")
+            results = pipeline.watch(make_watcher(args.input, args.recursive, args.poll_interval),
+                                     debounce=args.debounce, stop=stop,
+                                     on_batch=lambda b: print(f"[INFO] Batch: {b['count_validated']} validated, "
+                                                              f"{b['count_processed']} processed in "
+                                                              f"{b['latency']:.2f} s"))
+        else:
+            results = pipeline.run()
 
         # Print results summary
         print("\n[SUCCESS] Processing complete.")
-        print(f"Report location:  {results['csv']}")
+        print(f"Report location:  {results['report']}")
         print(f"Images validated: {results['count_validated']}")
         print(f"Images processed: {results['count_processed']}")
+        if args.incremental:
+            print(f"Images reused:    {results['count_cached']}")
+        if args.resume:
+            print(f"Images resumed:   {results['count_resumed']}")
+        if args.dedup:
+            print(f"Duplicates:       {results['count_duplicates']}")
+        if "workers" in results:
+            print(f"Workers:          {results['workers']} (auto)")
+        if args.metrics:
+            print("\nStage                    count     wall (s)      cpu (s)     read (MB)  written (MB)")
+            for stage, m in results["metrics"].items():
+                print(f"{stage:<20} {m['count']:>8} {m['wall_s']:>12.3f} {m['cpu_s']:>12.3f} "
+                      f"{m['bytes_read'] / 1e6:>13.2f} {m['bytes_written'] / 1e6:>13.2f}")
 
     except Exception as e:
         print(f"\n[CRITICAL ERROR] An unexpected error occurred: {e}")
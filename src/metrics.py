@@ -0,0 +1,254 @@
+import abc
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+# Phases timed inside the resize/rendition steps, and the per-image report columns
+PHASES = ("decode", "resize", "encode", "write")
+METRIC_FIELDS = ("wall_ms", "cpu_ms", "bytes_read", "bytes_written") + tuple(f"{p}_ms" for p in PHASES)
+
+# Metrics of the image currently processed by this thread (None when metrics are disabled)
+_current = threading.local()
+
+
+class ImageMetrics:
+    """
+    Timings and byte counts collected while one image goes through the processing steps.
+
+    Attributes:
+        stages (Dict[str, list]): Per step or phase name: [wall seconds, cpu seconds].
+        bytes_read (int): Bytes read from the source.
+        bytes_written (int): Bytes written to outputs.
+    """
+
+    def __init__(self):
+        """
+        Start with empty counters.
+        """
+        self.stages: Dict[str, list] = {}
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def add(self, name: str, wall: float, cpu: float):
+        """
+        Add wall and CPU time to a step or phase.
+        """
+        entry = self.stages.setdefault(name, [0.0, 0.0])
+        entry[0] += wall
+        entry[1] += cpu
+
+    def merge(self, other: "ImageMetrics"):
+        """
+        Add the counters collected by another thread working on the same image.
+        """
+        for name, (wall, cpu) in other.stages.items():
+            self.add(name, wall, cpu)
+        self.bytes_read += other.bytes_read
+        self.bytes_written += other.bytes_written
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Plain-dict form, small and picklable, carried in the processing result under "metrics".
+        """
+        return {"stages": self.stages, "bytes_read": self.bytes_read, "bytes_written": self.bytes_written}
+
+
+@contextmanager
+def collect(metrics: ImageMetrics):
+    """
+    Make `metrics` the target of phase() and add_bytes() calls from this thread.
+    """
+    _current.metrics = metrics
+    try:
+        yield metrics
+    finally:
+        _current.metrics = None
+
+
+def current() -> Optional[ImageMetrics]:
+    """
+    Metrics of the image this thread is collecting for, or None when metrics are disabled.
+    """
+    return getattr(_current, "metrics", None)
+
+
+@contextmanager
+def timed(name: str):
+    """
+    Time a block as the step or phase `name` of the current image.
+
+    Does nothing (beyond a thread-local lookup) when metrics are not being collected.
+    """
+    metrics = getattr(_current, "metrics", None)
+    if metrics is None:
+        yield
+        return
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        metrics.add(name, time.perf_counter() - wall, time.thread_time() - cpu)
+
+
+def add_bytes(read: int = 0, written: int = 0):
+    """
+    Count bytes read from a source or written to an output for the current image.
+    """
+    metrics = getattr(_current, "metrics", None)
+    if metrics is not None:
+        metrics.bytes_read += read
+        metrics.bytes_written += written
+
+
+def row_columns(image_metrics: Dict[str, Any], steps: Iterable[str]) -> Dict[str, Any]:
+    """
+    Flatten the metrics of one image into the METRIC_FIELDS report columns.
+
+    Args:
+        image_metrics (Dict[str, Any]): ImageMetrics.to_dict() of the image.
+        steps (Iterable[str]): Names of the processing steps (their times add up to the image total).
+
+    Returns:
+        Dict[str, Any]: Column values.
+    """
+    stages = image_metrics["stages"]
+    row = {
+        "wall_ms": round(sum(stages[s][0] for s in steps if s in stages) * 1000, 3),
+        "cpu_ms": round(sum(stages[s][1] for s in steps if s in stages) * 1000, 3),
+        "bytes_read": image_metrics["bytes_read"],
+        "bytes_written": image_metrics["bytes_written"],
+    }
+    for p in PHASES:
+        row[f"{p}_ms"] = round(stages[p][0] * 1000, 3) if p in stages else ""
+    return row
+
+
+class Metrics:
+    """
+    Thread-safe aggregate of per-stage timings for a whole run.
+
+    Stages are the pipeline stages (scan, validate, process, export), the processing steps
+    and the phases inside them (decode, resize, encode, write).
+    """
+
+    def __init__(self):
+        """
+        Start with no stages.
+        """
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, float]] = {}
+
+    def record(self, stage: str, wall: float = 0.0, cpu: float = 0.0, count: int = 1,
+               bytes_read: int = 0, bytes_written: int = 0):
+        """
+        Add one or more measurements to a stage.
+
+        Args:
+            stage (str): Stage name.
+            wall (float): Wall time in seconds.
+            cpu (float): CPU time in seconds.
+            count (int): Number of items measured. Defaults to 1.
+            bytes_read (int): Bytes read.
+            bytes_written (int): Bytes written.
+        """
+        with self._lock:
+            s = self._stages.setdefault(stage, {"count": 0, "wall_s": 0.0, "cpu_s": 0.0,
+                                                "bytes_read": 0, "bytes_written": 0})
+            s["count"] += count
+            s["wall_s"] += wall
+            s["cpu_s"] += cpu
+            s["bytes_read"] += bytes_read
+            s["bytes_written"] += bytes_written
+
+    def add_image(self, image_metrics: Dict[str, Any]):
+        """
+        Aggregate the metrics of one processed image (ImageMetrics.to_dict()).
+
+        Each step and phase is recorded as its own stage; the image itself and its byte
+        counts are recorded under "process".
+        """
+        for name, (wall, cpu) in image_metrics["stages"].items():
+            self.record(name, wall, cpu)
+        self.record("process", 0.0, 0.0, count=1, bytes_read=image_metrics["bytes_read"],
+                    bytes_written=image_metrics["bytes_written"])
+
+    @contextmanager
+    def stage(self, name: str, count: int = 1):
+        """
+        Time a block of the calling thread as stage `name`.
+        """
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - wall, time.thread_time() - cpu, count=count)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Snapshot of all stages, with times rounded to microseconds.
+        """
+        with self._lock:
+            return {name: {k: round(v, 6) if isinstance(v, float) else v for k, v in s.items()}
+                    for name, s in self._stages.items()}
+
+
+class MetricsHook(abc.ABC):
+    """
+    Receives the metrics summary at the end of a run. Subclass to export metrics elsewhere.
+    """
+
+    @abc.abstractmethod
+    def emit(self, summary: Dict[str, Dict[str, float]]):
+        """
+        Handle the summary produced by Metrics.summary().
+        """
+        raise NotImplementedError
+
+
+class PrometheusTextfileHook(MetricsHook):
+    """
+    Writes the metrics in the Prometheus text exposition format, for node_exporter's textfile collector.
+
+    The file is written to a temporary name and renamed, so the collector never reads a partial file.
+
+    Attributes:
+        path (Path): Destination .prom file.
+    """
+
+    def __init__(self, output_folder: str = "output", filename: str = "pipeline.prom",
+                 labels: Optional[Dict[str, str]] = None):
+        """
+        Initialize the hook.
+
+        Args:
+            output_folder (str): Folder for the metrics file.
+            filename (str): Name of the metrics file. Defaults to "pipeline.prom".
+            labels (Dict[str, str], optional): Extra labels added to every sample.
+        """
+        self.path = Path(output_folder) / filename
+        self.labels = labels or {}
+
+    def emit(self, summary: Dict[str, Dict[str, float]]):
+        """
+        Write one sample per stage and counter.
+        """
+        metrics = (("count", "images_pipeline_stage_items_total", "Items handled by the stage"),
+                   ("wall_s", "images_pipeline_stage_wall_seconds_total", "Wall time spent in the stage"),
+                   ("cpu_s", "images_pipeline_stage_cpu_seconds_total", "CPU time spent in the stage"),
+                   ("bytes_read", "images_pipeline_stage_read_bytes_total", "Bytes read by the stage"),
+                   ("bytes_written", "images_pipeline_stage_written_bytes_total", "Bytes written by the stage"))
+        lines = []
+        for key, name, help_text in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for stage, s in sorted(summary.items()):
+                labels = dict(self.labels, stage=stage)
+                label_text = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+                lines.append(f"{name}{{{label_text}}} {s[key]}")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp, self.path)
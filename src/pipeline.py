@@ -1,66 +1,880 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from contextlib import aclosing, nullcontext
 from pathlib import Path
 from .loader import ImageLoader
-from .validator import ImageValidator
-from .processor import ImageProcessor, make_resize_and_save_step
-from .exporter import CSVExporter
+from .validator import ImageValidator, RECORD_FIELDS
+from .processor import ImageProcessor, make_resize_and_save_step, step_name
+from .metrics import Metrics, METRIC_FIELDS, row_columns
+from .renditions import RenditionStep
+from .graph import make_graph_step
+from .tiling import TiledResizeStep
+from .batch import BatchStep
+from .exporter import ParquetExporter, make_exporter
+from .cache import ProcessingCache
+from .journal import Journal
+from .dedup import Deduplicator, duplicate_row
+from .writer import OutputWriter, PackArchive
+from .source import SourcePool
+from .autoscale import AUTO, ConcurrencyController, resolve_workers
+from .scheduler import SCHEDULES
+from .executor import make_executor
+from .watch import iter_batches, make_watcher
 
 class ImagePipeline:
     """
-    Full image processing pipeline: load, validate, process, export to CSV.
+    Full image processing pipeline: load, validate, process, export the report.
     """
 
     def __init__(self,
                  input_folder: str = "input",
                  output_folder: str = "output",
                  max_workers: int = 4,
-                 scale: float = 1.0):
+                 scale: float = 1.0,
+                 verify_mode: str = "verify",
+                 executor: str = "threads",
+                 chunksize: int = None,
+                 recycle_after: int = None,
+                 max_memory: int = None,
+                 schedule: str = "fifo",
+                 streaming: bool = False,
+                 queue_size: int = 256,
+                 validate_workers: int = 4,
+                 incremental: bool = False,
+                 hash_content: bool = False,
+                 resume: bool = False,
+                 journal: bool = False,
+                 dedup: bool = False,
+                 dedup_distance: int = 4,
+                 work_queue=None,
+                 reducing_gap: float = None,
+                 output_format: str = "JPEG",
+                 renditions=None,
+                 convert_mode: str = None,
+                 watermark=None,
+                 tile_above: int = None,
+                 band_rows: int = 256,
+                 band_workers: int = 1,
+                 batch_ops=None,
+                 batch_size: int = 64,
+                 io_workers: int = 0,
+                 write_buffer: int = 64 * 1024 ** 2,
+                 pack: bool = False,
+                 pack_below: int = None,
+                 map_inputs: bool = False,
+                 max_open_maps: int = 64,
+                 report_format: str = "csv",
+                 metrics: bool = False,
+                 metrics_columns: bool = False,
+                 metrics_hooks=None,
+                 recursive: bool = False,
+                 include=None,
+                 exclude=None,
+                 scan_workers: int = 4):
         """
         Initialize the pipeline.
 
         Args:
             input_folder (str): Folder to load images from.
-            output_folder (str): Folder to save processed images and CSV.
-            max_workers (int): Number of parallel threads.
+            output_folder (str): Folder to save processed images and the report.
+            max_workers (int or str): Number of parallel workers, or "auto" to adapt it during the
+                run to the host and the storage (see ConcurrencyController); what the controller
+                learns carries over to the next runs of the pipeline.
             scale (float): Resize factor for images.
+            verify_mode (str): Validation depth: "header", "probe", "verify" or "deep" (see ImageValidator).
+            executor (str): Execution backend: "threads", "processes" or "serial".
+            chunksize (int, optional): Images handed to a worker at once (see ImageProcessor.run_parallel).
+            recycle_after (int, optional): Replace worker processes after this many images.
+            max_memory (int, optional): Budget in bytes for the estimated decoded size of the images
+                being processed at once (see src.scheduler). None admits images regardless of size.
+            schedule (str): Order in which run() and watch() hand the validated images to the
+                workers: "fifo", "lpt", "buckets" or "steal" (see ImageProcessor.run_parallel).
+                Not available with streaming or a work_queue, and the bucket policies not with max_memory.
+            streaming (bool): Overlap loading, validation, processing and export (see run_streaming).
+            queue_size (int): Capacity of the bounded queues between streaming stages.
+            validate_workers (int): Number of validation threads in streaming mode.
+            incremental (bool): Reuse the results of unchanged images from previous runs (see ProcessingCache).
+            hash_content (bool): With incremental runs, also compare content hashes when size or mtime changed.
+            resume (bool): Continue an interrupted run that kept a journal: images recorded in it
+                are not processed again, and the report comes out as if the run had never
+                stopped. The resumed run keeps the journal too.
+            journal (bool): Checkpoint every completed image in a journal in the output folder
+                (see Journal), so the run can be resumed after a crash. Defaults to False.
+            dedup (bool): Process only one image of each group of exact or near duplicates (see
+                Deduplicator); the others reuse its outputs and name it in a "duplicate_of" column.
+                Not available with verify_mode "deep", which validates inside the workers.
+            dedup_distance (int): Largest dHash distance (in bits, of 64) between near duplicates.
+            work_queue (WorkQueue, optional): Coordinate a distributed run: validated images are
+                put on this queue and processed by workers on other nodes (see src.workqueue),
+                and their results merged into one report. Not available with streaming or
+                verify_mode "deep".
+            reducing_gap (float, optional): Draft decoding / reducing resize tolerance for large
+                downscales (see ResizeAndSaveStep). None decodes at full size.
+            output_format (str): Format of the processed images ("JPEG", "PNG" or "WEBP").
+            renditions (List[RenditionSpec], optional): Produce these renditions from a single
+                decode instead of one resized image; scale and output_format are then ignored.
+            convert_mode (str, optional): Convert the images to this pixel mode (e.g. "L") before resizing.
+            watermark (Watermark, optional): Overlay this src.graph.Watermark on every output after resizing.
+                With convert_mode or watermark, the resize (or renditions) runs as a StepGraph that
+                fuses the operations into one decode and one encode per output. Not available with
+                batch_ops, io_workers or pack.
+            tile_above (int, optional): TIFFs with at least this many pixels are resized band by
+                band and saved as PNG, with memory bounded by the band size (see TiledResizeStep).
+                Also lifts Pillow's decompression-bomb limit so such files pass validation.
+                Not used with renditions.
+            band_rows (int): Source rows decoded per band on the tiled path.
+            band_workers (int): Threads sharing the bands of one image on the tiled path.
+            batch_ops (List[Callable], optional): Vectorized operations from src.batch (e.g. Reduce,
+                Watermark). Images are then processed in stacked batches by a BatchStep instead of
+                one by one; scale, renditions and tiling are ignored. Needs NumPy.
+            batch_size (int): Images per batch with batch_ops.
+            io_workers (int): Threads of a writer stage that takes the encoded outputs of the resize
+                step off the CPU workers (see OutputWriter). 0 writes each output in its worker.
+            write_buffer (int): Bound in bytes of the encoded outputs waiting for the writer stage.
+            pack (bool): Pack the resized images into a single indexed archive, outputs.zip in the
+                output folder, instead of one file each (uses at least one I/O thread). Needs the
+                threads or serial backend of run() and is not available with incremental runs,
+                renditions, batch_ops or a work_queue.
+            pack_below (int, optional): With pack, only pack outputs smaller than this many bytes.
+            map_inputs (bool): Memory-map each input once and share the mapping between validation,
+                hashing and the processing steps instead of reading the file in each of them (see SourcePool).
+            max_open_maps (int): With map_inputs, maximum number of inputs mapped at once per
+                process; further inputs are read normally until a mapping is released.
+            report_format (str): Report file format: "csv", "jsonl" or "parquet" (needs PyArrow).
+            metrics (bool): Record per-stage timings and byte counts and return them under
+                "metrics" in the run() summary.
+            metrics_columns (bool): Also add per-image metric columns to the report (implies metrics).
+            metrics_hooks (List[MetricsHook], optional): Receive the metrics summary after each run,
+                e.g. PrometheusTextfileHook (implies metrics).
+            recursive (bool): Also process images in subdirectories; outputs mirror the input tree.
+            include (List[str], optional): Glob patterns of relative paths to process (see ImageLoader).
+            exclude (List[str], optional): Glob patterns of relative paths to skip.
+            scan_workers (int): Threads reading directories in a recursive scan.
         """
-        self.loader = ImageLoader(input_folder)
-        self.validator = ImageValidator(min_width=2, min_height=2)
+        self.loader = ImageLoader(input_folder, recursive=recursive, include=include, exclude=exclude,
+                                  scan_workers=scan_workers)
+        self.sources = SourcePool(max_open_maps) if map_inputs else None
+        self.validator = ImageValidator(min_width=2, min_height=2, verify_mode=verify_mode, sources=self.sources)
         self.processor = ImageProcessor(output_folder=output_folder)
-        self.processor.add_step(make_resize_and_save_step(output_folder=output_folder, scale=scale))
-        self.exporter = CSVExporter(output_folder=output_folder)
+        if (convert_mode or watermark is not None) and (batch_ops or io_workers or pack):
+            raise ValueError("convert_mode and watermark are not available with batch_ops, io_workers or pack")
+        if batch_ops:
+            self.processor.add_batch_step(BatchStep(output_folder, batch_ops, format=output_format,
+                                                    input_root=input_folder, sources=self.sources),
+                                          batch_size=batch_size)
+        elif convert_mode or watermark is not None:
+            self.processor.add_step(make_graph_step(output_folder, scale=scale, format=output_format,
+                                                    renditions=renditions, convert=convert_mode,
+                                                    watermark=watermark, reducing_gap=reducing_gap,
+                                                    input_root=input_folder, sources=self.sources))
+        elif renditions:
+            self.processor.add_step(RenditionStep(output_folder, renditions, reducing_gap=reducing_gap,
+                                                  input_root=input_folder, sources=self.sources))
+        else:
+            writer = None
+            if io_workers or pack:
+                archive = PackArchive(Path(output_folder) / "outputs.zip") if pack else None
+                writer = OutputWriter(max(io_workers, 1), write_buffer, archive=archive, pack_below=pack_below)
+            step = make_resize_and_save_step(output_folder=output_folder, scale=scale, reducing_gap=reducing_gap,
+                                             format=output_format, input_root=input_folder, writer=writer,
+                                             sources=self.sources)
+            if tile_above:
+                step = TiledResizeStep(output_folder, scale, tile_above, step, band_rows=band_rows,
+                                       band_workers=band_workers, input_root=input_folder)
+                # Huge TIFFs are never decoded whole on the tiled path
+                self.validator.huge_tiffs = True
+            self.processor.add_step(step)
+        self.exporter = make_exporter(report_format, output_folder)
         self.max_workers = max_workers
+        self.autoscale = ConcurrencyController.for_executor(executor) if max_workers == AUTO else None
+        self.executor = executor
+        self.chunksize = chunksize
+        self.recycle_after = recycle_after
+        self.max_memory = max_memory
+        if schedule not in SCHEDULES:
+            raise ValueError(f"Unknown schedule '{schedule}', expected one of {SCHEDULES}")
+        if schedule != "fifo" and (streaming or work_queue is not None):
+            raise ValueError("Streaming and distributed runs process images in arrival order; use schedule 'fifo'")
+        if schedule in ("buckets", "steal") and max_memory:
+            raise ValueError("The bucket schedules are not available with max_memory")
+        self.schedule = schedule
+        self.streaming = streaming
+        self.queue_size = queue_size
+        self.validate_workers = validate_workers
+        self.output_folder = output_folder
+        self.metrics_columns = metrics_columns
+        self.metrics_hooks = list(metrics_hooks or [])
+        # Metrics are aggregated over the lifetime of the pipeline
+        self.metrics = Metrics() if (metrics or metrics_columns or self.metrics_hooks) else None
+        self.processor.collect_metrics = self.metrics is not None
+        self.incremental = incremental
+        self.hash_content = hash_content
+        self.resume = resume
+        self.journal = journal or resume
+        if dedup and verify_mode == "deep":
+            raise ValueError("Deduplication needs validation before processing; use verify_mode 'header', 'probe' or 'verify'")
+        self.dedup = dedup
+        self.dedup_distance = dedup_distance
+        if pack and (incremental or renditions or batch_ops or work_queue is not None or executor == "processes"):
+            raise ValueError("Packing needs a single writing process and outputs rewritten by every run: "
+                             "not available with incremental runs, renditions, batch_ops, a work queue "
+                             "or the process backend")
+        if work_queue is not None and (streaming or verify_mode == "deep"):
+            raise ValueError("A distributed run needs the staged pipeline with validation before processing")
+        self.work_queue = work_queue
+        self.pack = pack
+        self._pool = None  # executor kept alive between the batches of watch()
+
+    def _executor_options(self):
+        """
+        Keyword arguments selecting the execution backend for ImageProcessor.run_parallel.
+        """
+        return {"max_workers": self.max_workers, "autoscale": self.autoscale, "executor": self.executor,
+                "chunksize": self.chunksize, "recycle_after": self.recycle_after,
+                "max_memory": self.max_memory, "pool": self._pool}
 
     def run(self):
         """
         Run the full pipeline.
 
+        Rows are written sorted by image path, so the report does not depend on completion
+        order and a resumed run produces the same report as an uninterrupted one.
+
         Returns:
-            dict: Summary containing CSV path, count_validated, count_processed.
+            dict: Summary containing the report path ("report", also under "csv"), count_validated,
+                count_processed, count_cached (images whose previous results were reused), count_resumed
+                (images completed before an interruption) and count_duplicates (images that reused
+                the outputs of a duplicate).
         """
-        paths = self.loader.get_image_paths()
-        validated = [self.validator.validate(Path(p)) for p in paths]
+        if self.streaming:
+            return self.run_streaming()
 
-        to_process = []
+        cache = self._open_cache()
+        journal = self._open_journal()
+        with self._stage("scan"):
+            paths = self.loader.get_image_paths()
         results = []
+        count_cached = 0
+        if cache is not None:
+            # Unchanged images keep their previous rows and skip validation and processing
+            misses = []
+            for p in paths:
+                rows = cache.lookup(p)
+                if rows is None:
+                    misses.append(p)
+                else:
+                    results.extend(rows)
+                    count_cached += 1
+            paths = misses
+        resumed = []
+        if journal is not None and self.resume:
+            # Images finished before the interruption skip validation and processing
+            remaining = []
+            for p in paths:
+                record = journal.replay(p)
+                if record is None:
+                    remaining.append(p)
+                else:
+                    resumed.append(record)
+            paths = remaining
+
+        new_rows, count_validated, count_processed, count_duplicates = self._process(paths, journal)
+        # Finish the writer stage (pending writes and archive) before reporting
+        self._close_stages()
+        for row in resumed + new_rows:
+            rows = self._report_rows(row)
+            results.extend(rows)
+            if cache is not None:
+                cache.store(Path(row["path"]), rows)
+
+        if cache is not None:
+            cache.evict_missing()
+            cache.close()
+
+        results.sort(key=lambda r: str(r.get("path")))
+        with self._stage("export", count=len(results)):
+            report_path = self.exporter.write(results)
+        if journal is not None:
+            journal.close(completed=True)
+        return self._summary({"report": report_path, "csv": report_path, "count_validated": count_validated,
+                              "count_processed": count_processed, "count_cached": count_cached,
+                              "count_resumed": len(resumed), "count_duplicates": count_duplicates})
+
+    def _process(self, paths, journal=None):
+        """
+        Validate and process a list of images, the staged way: validation (and deduplication)
+        of all of them, then parallel processing of those that passed.
+
+        Args:
+            paths (List[Path]): Images to validate and process.
+            journal (Journal, optional): Checkpoint every completed image in this journal.
+
+        Returns:
+            Tuple[List[dict], int, int, int]: Merged rows (processed images, duplicates and
+                images that failed validation), and the counts of validated, processed and
+                duplicate images.
+        """
+        if self.validator.verify_mode == "deep":
+            # A deep verify decodes the whole frame, so it runs inside the workers and the
+            # frame goes straight to the steps instead of piling up until validation ends
+            with self._stage("process", count=0):
+                new_rows = self.processor.run_parallel(paths, validate=self.validator.validate,
+                                                       on_result=journal.append if journal is not None else None,
+                                                       schedule=self.schedule, **self._executor_options())
+            return new_rows, len(paths), sum(1 for r in new_rows if r.get("ok")), 0
+        with self._stage("validate", count=len(paths)):
+            validated = [self.validator.validate(Path(p)) for p in paths]
+
+        infos = []
+        new_rows = []
         for v in validated:
             if v.get("ok"):
-                to_process.append(Path(v["path"]))
+                infos.append(v)
             else:
-                results.append(v)
+                new_rows.append(v)
+        duplicates = []
+        dedup = self._open_dedup()
+        if dedup is not None and infos:
+            infos, duplicates = self._deduplicate(dedup, infos)
+        to_process = [Path(v["path"]) for v in infos]
 
         if to_process:
-            processed = self.processor.run_parallel(to_process, max_workers=self.max_workers)
-            for p in processed:
-                src = p.get("source")
-                vd = {}
-                for x in validated:
-                    if str(x["path"]) == str(src):
-                        vd = x
+            on_result = None
+            if journal is not None:
+                by_path = {str(v["path"]): v for v in infos}
+
+                def on_result(p):
+                    record = dict(by_path.get(p["source"], {}))
+                    record.update(p)
+                    journal.append(record)
+            with self._stage("process", count=0):
+                if self.work_queue is not None:
+                    processed = self.processor.run_distributed(to_process, self.work_queue, infos=infos,
+                                                               on_result=on_result)
+                else:
+                    processed = self.processor.run_parallel(to_process, infos=infos, on_result=on_result,
+                                                            schedule=self.schedule, **self._executor_options())
+            merged = self._merge(infos, processed)
+            new_rows.extend(merged)
+            by_path = {str(m["path"]): m for m in merged}
+            for record, canonical in duplicates:
+                row = duplicate_row(record, by_path[canonical])
+                if journal is not None:
+                    journal.append(row)
+                new_rows.append(row)
+        return new_rows, len(validated), len(to_process), len(duplicates)
+
+    async def arun(self, executor=None, concurrency: int = None):
+        """
+        Run the pipeline from asyncio code, yielding report rows as images complete.
+
+        The counterpart of run() for event-loop based services: scanning and validation run
+        in worker threads, the processing steps run on `executor`, and nothing blocks the
+        event loop. One executor (e.g. a ProcessPoolExecutor) can be shared by many concurrent
+        calls, each capped at `concurrency` images in flight. No report file is written;
+        pass the rows to an exporter if needed. Cancelling the calling task, or closing the
+        iterator early, cancels the images that have not started yet. Deduplication only
+        applies to run().
+
+        Args:
+            executor (concurrent.futures.Executor, optional): Executor running the processing
+                steps. Defaults to the event loop's default thread pool.
+            concurrency (int, optional): Maximum images in flight for this call. Defaults to max_workers.
+
+        Yields:
+            dict: Report rows (one per image, or one per rendition), in completion order.
+        """
+        import asyncio
+
+        deep = self.validator.verify_mode == "deep"
+        paths = await asyncio.to_thread(self.loader.get_image_paths)
+        rejected = deque()
+        pending = {}  # validation records of images in flight, by path
+
+        async def tasks():
+            for p in paths:
+                if deep:
+                    yield (p, None)
+                    continue
+                v = await asyncio.to_thread(self.validator.validate, p)
+                if v.get("ok"):
+                    pending[str(v["path"])] = v
+                    yield (Path(v["path"]), v)
+                else:
+                    rejected.append(v)
+
+        processed = self.processor.run_async(tasks(), executor=executor,
+                                             validate=self.validator.validate if deep else None,
+                                             concurrency=concurrency or resolve_workers(self.max_workers))
+        async with aclosing(processed):
+            async for p in processed:
+                while rejected:
+                    for row in self._report_rows(rejected.popleft()):
+                        yield row
+                if not deep:
+                    merged = dict(pending.pop(p["source"], {}))
+                    merged.update(p)
+                    p = merged
+                for row in self._report_rows(p):
+                    yield row
+        while rejected:
+            for row in self._report_rows(rejected.popleft()):
+                yield row
+        await asyncio.to_thread(self._close_stages)
+
+    def _open_cache(self):
+        """
+        Open the processing cache if incremental runs are enabled.
+
+        Returns:
+            Optional[ProcessingCache]: The cache, or None if incremental runs are disabled.
+        """
+        if not self.incremental:
+            return None
+        return ProcessingCache(self.output_folder, self._config(), hash_content=self.hash_content,
+                               sources=self.sources)
+
+    def _open_journal(self):
+        """
+        Open the checkpoint journal if journaling is enabled.
+
+        Returns:
+            Optional[Journal]: The journal, or None if journaling is disabled.
+        """
+        if not self.journal:
+            return None
+        return Journal(self.output_folder, self._config(), resume=self.resume)
+
+    def _close_stages(self):
+        """
+        Finish the processing steps (pending writes of the writer stage) and unmap the inputs.
+        """
+        self.processor.close()
+        if self.sources is not None:
+            self.sources.close()
+
+    def _open_dedup(self):
+        """
+        Create an empty duplicate index for a run if deduplication is enabled.
+
+        Returns:
+            Optional[Deduplicator]: The index, or None if deduplication is disabled.
+        """
+        if not self.dedup:
+            return None
+        return Deduplicator(max_distance=self.dedup_distance, sources=self.sources)
+
+    def _deduplicate(self, dedup, records):
+        """
+        Split validated images into canonical images and duplicates of them.
+
+        Hashing decodes every image at reduced scale, so it runs on max_workers threads. Images
+        are then matched in path order, so the canonical image of a group does not depend on
+        scan order.
+
+        Args:
+            dedup (Deduplicator): Index of the run.
+            records (List[dict]): Validation records of the images that passed.
+
+        Returns:
+            Tuple[List[dict], List[tuple]]: Records of the canonical images, and
+                (record, canonical path) pairs of the duplicates.
+        """
+        records = sorted(records, key=lambda v: str(v["path"]))
+        with self._stage("dedup", count=len(records)):
+            with ThreadPoolExecutor(max_workers=resolve_workers(self.max_workers)) as pool:
+                hashes = list(pool.map(dedup.hashes, [Path(v["path"]) for v in records]))
+        canonical, duplicates = [], []
+        for v, h in zip(records, hashes):
+            match = dedup.match(Path(v["path"]), h)
+            if match is None:
+                canonical.append(v)
+            else:
+                duplicates.append((v, match))
+        return canonical, duplicates
+
+    def _config(self):
+        """
+        Settings that determine the results of an image, used to key the cache and the journal.
+        """
+        config = {
+            "validator": {"min_width": self.validator.min_width, "min_height": self.validator.min_height,
+                          "verify_mode": self.validator.verify_mode},
+            "steps": self.processor.config(),
+        }
+        if self.dedup:
+            # Duplicates point at the outputs of another image, so they are only valid with dedup
+            config["dedup"] = {"max_distance": self.dedup_distance}
+        return config
+
+    @staticmethod
+    def _merge(validated, processed):
+        """
+        Merge each processing result with the validation record of its source image.
+
+        Records are indexed by path once, so each lookup is O(1) and the merge is linear
+        in the number of images.
+
+        Args:
+            validated (List[dict]): Validation records.
+            processed (Iterable[dict]): Processing results, each with a "source" key.
+
+        Returns:
+            List[dict]: Merged rows, in the order of the processing results.
+        """
+        by_path = {str(v["path"]): v for v in validated}
+        merged = []
+        for p in processed:
+            row = dict(by_path.get(str(p.get("source")), {}))
+            row.update(p)
+            merged.append(row)
+        return merged
+
+    def _stage(self, name, count=1):
+        """
+        Time a pipeline stage if metrics are enabled (a no-op context otherwise).
+        """
+        return self.metrics.stage(name, count=count) if self.metrics is not None else nullcontext()
+
+    def _report_rows(self, row):
+        """
+        Turn a merged result into its report rows: aggregate its metrics, then expand renditions.
+
+        Args:
+            row (dict): Merged validation and processing result of one image.
+
+        Returns:
+            List[dict]: The report rows of the image.
+        """
+        image_metrics = row.pop("metrics", None)
+        if image_metrics is not None and self.metrics is not None:
+            self.metrics.add_image(image_metrics)
+            if self.metrics_columns:
+                row.update(row_columns(image_metrics, [step_name(s) for s in self.processor.steps]))
+        return self._expand(row)
+
+    def _summary(self, summary):
+        """
+        Add the metrics summary to the run() result and hand it to the metrics hooks.
+
+        Args:
+            summary (dict): Counts and report path of the run.
+
+        Returns:
+            dict: The summary, with "metrics" if metrics are enabled and "workers" (the limit the
+                controller settled at) with adaptive workers.
+        """
+        if self.autoscale is not None:
+            summary["workers"] = self.autoscale.limit
+        if self.metrics is None:
+            return summary
+        summary["metrics"] = self.metrics.summary()
+        for hook in self.metrics_hooks:
+            hook.emit(summary["metrics"])
+        return summary
+
+    @staticmethod
+    def _expand(row):
+        """
+        Split a result holding several renditions (see RenditionStep) into one report row per rendition.
+
+        Args:
+            row (dict): Merged validation and processing result of one image.
+
+        Returns:
+            List[dict]: The report rows of the image.
+        """
+        renditions = row.get("renditions")
+        if not renditions:
+            return [row]
+        base = {k: v for k, v in row.items() if k != "renditions"}
+        return [dict(base, **r) for r in renditions]
+
+    def report_fields(self):
+        """
+        Report columns known upfront: the validation record followed by the processor fields.
+
+        Returns:
+            List[str]: Column names used by the streamed report.
+        """
+        fields = list(RECORD_FIELDS)
+        fields += [k for k in self.processor.fields if k not in fields]
+        if self.dedup:
+            fields.append("duplicate_of")
+        if self.metrics_columns:
+            fields += list(METRIC_FIELDS)
+        return fields
+
+    def run_streaming(self):
+        """
+        Run the pipeline as overlapping stages connected by bounded queues.
+
+        A loader thread scans the input folder lazily, validation threads check files as
+        they are found, processing starts on the first valid image and every result is
+        appended to the report as soon as it completes. The bounded queues provide
+        backpressure, so memory stays flat regardless of how many files the folder holds.
+        Rows are written in completion order; with resume, the rows of images finished
+        before the interruption come first.
+
+        Returns:
+            dict: Summary containing the report path ("report", also under "csv"), count_validated,
+                count_processed, count_cached, count_resumed, count_duplicates.
+        """
+        deep = self.validator.verify_mode == "deep"
+        cache = self._open_cache()
+        journal = self._open_journal()
+        dedup = self._open_dedup()
+        # A deep verify runs inside the processing workers (see run), so no validation threads
+        n_validators = 0 if deep else self.validate_workers
+        paths_q = queue.Queue(maxsize=self.queue_size)
+        records_q = queue.Queue(maxsize=self.queue_size)
+        done = object()  # end-of-stream marker
+        errors = []
+
+        cached = deque()  # rows reused from previous runs
+        resumed = deque()  # records of images finished before an interruption
+        counts = {"validated": 0, "processed": 0, "cached": 0, "resumed": 0, "duplicates": 0}
+        hashes = {}  # dedup hashes computed by the validation threads, by path
+
+        def load():
+            try:
+                for p in self.loader.iter_image_paths():
+                    rows = cache.lookup(p) if cache is not None else None
+                    record = journal.replay(p) if journal is not None and rows is None else None
+                    if rows is not None:
+                        counts["cached"] += 1
+                        cached.extend(rows)
+                    elif record is not None:
+                        counts["resumed"] += 1
+                        resumed.append(record)
+                    else:
+                        paths_q.put(p)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                for _ in range(max(1, n_validators)):
+                    paths_q.put(done)
+
+        def validate():
+            try:
+                while True:
+                    p = paths_q.get()
+                    if p is done:
                         break
-                merged = {}
-                merged.update(vd)
-                merged.update(p)
-                results.append(merged)
+                    with self._stage("validate"):
+                        record = self.validator.validate(p)
+                    if dedup is not None and record.get("ok"):
+                        with self._stage("dedup"):
+                            hashes[str(record["path"])] = dedup.hashes(p)
+                    records_q.put(record)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                records_q.put(done)
+
+        threads = [threading.Thread(target=load, daemon=True)]
+        threads += [threading.Thread(target=validate, daemon=True) for _ in range(n_validators)]
+        for t in threads:
+            t.start()
+
+        rejected = deque()
+        pending = {}  # validation records of images in flight, by path
+        duplicates = deque()  # results of duplicates whose canonical image is done
+        waiting = {}  # records of duplicates of canonical images in flight, by canonical path
+        canonical_rows = {}  # merged results of the canonical images, by path
+
+        def tasks():
+            if deep:
+                while True:
+                    p = paths_q.get()
+                    if p is done:
+                        return
+                    counts["validated"] += 1
+                    yield (p, None)
+            finished = 0
+            while finished < n_validators:
+                v = records_q.get()
+                if v is done:
+                    finished += 1
+                    continue
+                counts["validated"] += 1
+                if v.get("ok"):
+                    key = str(v["path"])
+                    canonical = dedup.match(Path(key), hashes.pop(key)) if dedup is not None else None
+                    if canonical is None:
+                        pending[v["path"]] = v
+                        yield (Path(v["path"]), v)
+                    elif canonical in canonical_rows:
+                        duplicates.append(duplicate_row(v, canonical_rows[canonical]))
+                    else:
+                        waiting.setdefault(canonical, []).append(v)
+                else:
+                    rejected.append(v)
+
+        def new_rows(row):
+            rows = self._report_rows(row)
+            if cache is not None:
+                cache.store(Path(row["path"]), rows)
+            return rows
+
+        def ready():
+            # Rows that needed no processing: cached, resumed and those that failed validation
+            while cached:
+                yield cached.popleft()
+            while resumed:
+                yield from new_rows(resumed.popleft())
+            while rejected:
+                yield from new_rows(rejected.popleft())
+            while duplicates:
+                row = duplicates.popleft()
+                counts["duplicates"] += 1
+                if journal is not None:
+                    journal.append(row)
+                yield from new_rows(row)
+
+        def rows():
+            processed = self.processor.iter_parallel(
+                tasks(), validate=self.validator.validate if deep else None,
+                max_pending=self.queue_size, **self._executor_options())
+            for p in processed:
+                yield from ready()
+                if deep:
+                    if p.get("ok"):
+                        counts["processed"] += 1
+                    merged = p
+                else:
+                    counts["processed"] += 1
+                    merged = dict(pending.pop(p["source"], {}))
+                    merged.update(p)
+                    if dedup is not None:
+                        key = str(merged["path"])
+                        canonical_rows[key] = {k: v for k, v in merged.items() if k != "metrics"}
+                        duplicates.extend(duplicate_row(v, merged) for v in waiting.pop(key, []))
+                if journal is not None:
+                    journal.append(merged)
+                yield from new_rows(merged)
+            yield from ready()
+
+        completed = False
+        try:
+            with self._stage("pipeline", count=0):
+                report_path = self.exporter.write_stream(rows(), self.report_fields())
+            for t in threads:
+                t.join()
+            if errors:
+                raise errors[0]
+            self._close_stages()
+            if cache is not None:
+                cache.evict_missing()
+            completed = True
+        finally:
+            if cache is not None:
+                cache.close()
+            if journal is not None:
+                journal.close(completed=completed)
+        return self._summary({"report": report_path, "csv": report_path, "count_validated": counts["validated"],
+                              "count_processed": counts["processed"], "count_cached": counts["cached"],
+                              "count_resumed": counts["resumed"], "count_duplicates": counts["duplicates"]})
+
+    def watch(self, watcher=None, debounce: float = 0.5, max_batch: int = 256, stop=None, on_batch=None):
+        """
+        Keep processing the images that land in the input folder, as a long-running service.
+
+        Instead of a run started every few minutes, which pays for the interpreter start-up,
+        the imports, a rescan of the whole folder and a new worker pool to find a handful of
+        files, the pipeline and its executor stay alive and a watcher (inotify on Linux,
+        polling elsewhere; see src.watch) reports the new and changed files. The images
+        already present are processed first (with incremental, only those that changed since
+        the previous run). Then each file is processed once it has been quiet for `debounce`
+        seconds, in batches of at most `max_batch` files that go through the same validation,
+        deduplication and processing as run(). The rows of every batch are appended to the
+        report as soon as the batch is done (a file written again gets a new row), and with
+        incremental the manifest is committed after each batch, so a restart resumes cheaply
+        (files still waiting for their debounce when the watch stops are found by its scan).
+
+        Args:
+            watcher (Watcher, optional): Source of file changes. Defaults to make_watcher() on
+                the input folder.
+            debounce (float): Seconds without changes before a file is processed. Defaults to 0.5.
+            max_batch (int): Maximum images per batch. Defaults to 256.
+            stop (threading.Event, optional): Set it (e.g. from a signal handler) to stop
+                watching: the current batch is finished and the report closed.
+            on_batch (Callable[[dict], None], optional): Called after each batch with its counts
+                and "latency", the seconds from the first report of its oldest file to its rows
+                being written.
+
+        Returns:
+            dict: Summary of the whole session, as returned by run(), plus count_batches.
+
+        Raises:
+            ValueError: With a work queue, packing or a Parquet report, which a rolling report
+                and batches processed one after another cannot support.
+        """
+        if self.work_queue is not None or self.pack or isinstance(self.exporter, ParquetExporter):
+            raise ValueError("Watching is not available with a work queue, pack or a Parquet report")
+        stop = stop or threading.Event()
+        # The watcher starts before the first scan, so files landing meanwhile are not missed
+        watcher = watcher or make_watcher(self.loader.folder_path, recursive=self.loader.recursive)
+        cache = self._open_cache()
+        counts = {"validated": 0, "processed": 0, "cached": 0, "duplicates": 0, "batches": 0}
+        workers = self.autoscale.max_workers if self.autoscale is not None else self.max_workers
+        recycle = max(1, self.recycle_after // (self.chunksize or 1)) if self.recycle_after else None
+        self._pool = make_executor(self.executor, workers, recycle if self.executor == "processes" else None)
+
+        def batches():
+            with self._stage("scan"):
+                paths = self.loader.get_image_paths()
+            yield paths, time.perf_counter()
+            yield from iter_batches(watcher, self.loader.matches, debounce, max_batch, stop)
+
+        def rows():
+            for paths, since in batches():
+                results = []
+                if cache is not None:
+                    misses = []
+                    for p in paths:
+                        cached = cache.lookup(p)
+                        if cached is None:
+                            misses.append(p)
+                        else:
+                            results.extend(cached)
+                            counts["cached"] += 1
+                    paths = misses
+                new_rows, validated, processed, duplicates = self._process(paths)
+                # Finish pending writes and drop the mappings: files may be rewritten before the next batch
+                self._close_stages()
+                for row in new_rows:
+                    report_rows = self._report_rows(row)
+                    results.extend(report_rows)
+                    if cache is not None:
+                        cache.store(Path(row["path"]), report_rows)
+                if cache is not None:
+                    if counts["batches"] == 0:
+                        cache.evict_missing()  # the first batch covered the whole folder
+                    cache.commit()
+                results.sort(key=lambda r: str(r.get("path")))
+                yield from results
+                counts["validated"] += validated
+                counts["processed"] += processed
+                counts["duplicates"] += duplicates
+                counts["batches"] += 1
+                if on_batch is not None:
+                    on_batch({"count_validated": validated, "count_processed": processed,
+                              "count_duplicates": duplicates, "latency": time.perf_counter() - since})
 
-        csv_path = self.exporter.write(results)
-        return {"csv": csv_path, "count_validated": len(validated), "count_processed": len(to_process)}
+        try:
+            # Every row is flushed, so the report can be followed while the service runs
+            report_path = self.exporter.write_stream(rows(), self.report_fields(), flush_every=1)
+        finally:
+            self._pool.shutdown()
+            self._pool = None
+            watcher.close()
+            if cache is not None:
+                cache.close()
+        return self._summary({"report": report_path, "csv": report_path, "count_validated": counts["validated"],
+                              "count_processed": counts["processed"], "count_cached": counts["cached"],
+                              "count_resumed": 0, "count_duplicates": counts["duplicates"],
+                              "count_batches": counts["batches"]})
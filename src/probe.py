@@ -0,0 +1,269 @@
+import io
+import struct
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+from PIL import Image
+
+# Bytes at the end of a file searched for an end marker, to allow for padding after it
+TAIL_SIZE = 4096
+
+# JPEG start-of-frame markers (SOF0-SOF15 without DHT, JPG and DAC)
+_JPEG_SOF = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# PNG (colour type, bit depth) -> Pillow mode
+_PNG_MODES = {
+    (0, 1): "1", (0, 2): "L", (0, 4): "L", (0, 8): "L", (0, 16): "I;16",
+    (2, 8): "RGB", (2, 16): "RGB",
+    (3, 1): "P", (3, 2): "P", (3, 4): "P", (3, 8): "P",
+    (4, 8): "LA", (4, 16): "LA",
+    (6, 8): "RGBA", (6, 16): "RGBA",
+}
+
+# TIFF (photometric interpretation, samples per pixel, bits per sample) -> Pillow mode
+_TIFF_MODES = {
+    (0, 1, 8): "L", (1, 1, 1): "1", (1, 1, 8): "L", (1, 2, 8): "LA",
+    (2, 3, 8): "RGB", (2, 4, 8): "RGBA", (3, 1, 8): "P", (5, 4, 8): "CMYK", (6, 3, 8): "RGB",
+}
+
+# TIFF field type -> (struct code, size)
+_TIFF_TYPES = {1: ("B", 1), 3: ("H", 2), 4: ("I", 4), 7: ("B", 1), 16: ("Q", 8)}
+
+# TIFF tags read by the probe
+_WIDTH, _HEIGHT, _BITS, _PHOTOMETRIC, _STRIP_OFFSETS = 256, 257, 258, 262, 273
+_ORIENTATION, _SAMPLES, _STRIP_COUNTS, _TILE_OFFSETS, _TILE_COUNTS, _EXTRA_SAMPLES = 274, 277, 279, 324, 325, 338
+
+
+class ProbeError(ValueError):
+    """
+    Raised when a file has a known signature but a malformed or truncated header.
+    """
+
+
+def _read_at(f: BinaryIO, offset: int, size: int) -> bytes:
+    f.seek(offset)
+    return f.read(size)
+
+
+def _tiff_tags(f: BinaryIO, base: int, tags: set) -> Tuple[Dict[int, tuple], int]:
+    """
+    Read selected tags of the first IFD of a TIFF structure starting at `base`.
+
+    Returns:
+        Tuple[Dict[int, tuple], int]: Values of the tags found, and the byte order prefix of
+            their struct format ("<" or ">").
+
+    Raises:
+        ProbeError: If the structure is not a TIFF header or the IFD lies beyond the end of the data.
+    """
+    head = _read_at(f, base, 8)
+    if head[:4] not in (b"II*\x00", b"MM\x00*"):
+        raise ProbeError("Bad TIFF header")
+    order = "<" if head[:2] == b"II" else ">"
+    ifd = base + struct.unpack(order + "I", head[4:])[0]
+    raw = _read_at(f, ifd, 2)
+    if len(raw) < 2:
+        raise ProbeError("TIFF directory beyond end of file")
+    count = struct.unpack(order + "H", raw)[0]
+    entries = _read_at(f, ifd + 2, count * 12)
+    if len(entries) < count * 12:
+        raise ProbeError("Truncated TIFF directory")
+    values = {}
+    for i in range(0, count * 12, 12):
+        tag, kind, n = struct.unpack(order + "HHI", entries[i:i + 8])
+        if tag not in tags or kind not in _TIFF_TYPES:
+            continue
+        code, size = _TIFF_TYPES[kind]
+        if n * size <= 4:
+            data = entries[i + 8:i + 8 + n * size]
+        else:
+            data = _read_at(f, base + struct.unpack(order + "I", entries[i + 8:i + 12])[0], n * size)
+            if len(data) < n * size:
+                raise ProbeError("TIFF field beyond end of file")
+        values[tag] = struct.unpack(f"{order}{n}{code}", data)
+    return values, order
+
+
+def _exif_orientation(data: bytes) -> Optional[int]:
+    """
+    Orientation tag of an EXIF block (a TIFF structure), or None if it has none or cannot be parsed.
+    """
+    try:
+        return _tiff_tags(io.BytesIO(data), 0, {_ORIENTATION})[0].get(_ORIENTATION, (None,))[0]
+    except (ProbeError, struct.error):
+        return None
+
+
+def _tail_has(f: BinaryIO, size: int, marker: bytes) -> Optional[bool]:
+    """
+    True if the file ends with `marker`, possibly followed by padding; None if it was not found.
+    """
+    tail = _read_at(f, max(0, size - TAIL_SIZE), TAIL_SIZE)
+    return True if marker in tail else None
+
+
+def _probe_jpeg(f: BinaryIO, size: int) -> Optional[Dict[str, Any]]:
+    pos, fmt, orientation = 2, "JPEG", None
+    while True:
+        head = _read_at(f, pos, 4)
+        if len(head) < 4 or head[0] != 0xFF:
+            raise ProbeError("Bad JPEG marker before the frame header")
+        marker = head[1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # markers without a length
+            pos += 2
+            continue
+        length = struct.unpack(">H", head[2:])[0]
+        if marker in _JPEG_SOF:
+            frame = _read_at(f, pos + 4, 6)
+            if len(frame) < 6:
+                raise ProbeError("Truncated JPEG frame header")
+            height, width, components = struct.unpack(">xHHB", frame)
+            break
+        if marker in (0xE1, 0xE2) and length >= 8:
+            segment = _read_at(f, pos + 4, length - 2)
+            if marker == 0xE1 and orientation is None and segment.startswith(b"Exif\x00\x00"):
+                orientation = _exif_orientation(segment[6:])
+            elif marker == 0xE2 and segment.startswith(b"MPF\x00"):
+                fmt = "MPO"  # multi-picture file (e.g. from stereo or multi-lens cameras)
+        pos += 2 + length
+    mode = {1: "L", 3: "RGB", 4: "CMYK"}.get(components)
+    if not height or mode is None:
+        return None  # height set by a DNL marker, or unusual component count
+    if _read_at(f, size - 2, 2) == b"\xff\xd9":
+        complete = True
+    else:
+        complete = _tail_has(f, size, b"\xff\xd9")
+    return {"format": fmt, "width": width, "height": height, "mode": mode,
+            "orientation": orientation, "complete": complete}
+
+
+def _probe_png(f: BinaryIO, size: int) -> Optional[Dict[str, Any]]:
+    head = _read_at(f, 8, 25)
+    if len(head) < 25 or head[4:8] != b"IHDR":
+        raise ProbeError("Missing PNG IHDR chunk")
+    width, height, depth, color = struct.unpack(">IIBB", head[8:18])
+    mode = _PNG_MODES.get((color, depth))
+    if mode is None:
+        raise ProbeError(f"Invalid PNG colour type {color} / bit depth {depth}")
+    # Chunks before the image data: only their headers are read, except for eXIf
+    pos, orientation = 33, None
+    while True:
+        chunk = _read_at(f, pos, 8)
+        if len(chunk) < 8:
+            return {"format": "PNG", "width": width, "height": height, "mode": mode,
+                    "orientation": orientation, "complete": False}
+        length, kind = struct.unpack(">I4s", chunk)
+        if kind == b"IDAT":
+            break
+        if kind == b"eXIf":
+            orientation = _exif_orientation(_read_at(f, pos + 8, length))
+        pos += 12 + length
+    complete = True if _read_at(f, size - 12, 12) == b"\x00\x00\x00\x00IEND\xaeB`\x82" else None
+    return {"format": "PNG", "width": width, "height": height, "mode": mode,
+            "orientation": orientation, "complete": complete}
+
+
+def _probe_gif(f: BinaryIO, size: int) -> Optional[Dict[str, Any]]:
+    width, height, flags = struct.unpack("<HHB", _read_at(f, 6, 5))
+    # Pillow reports "L" when the first frame has no palette, or only a grey ramp (0,0,0), (1,1,1)...,
+    # which a local colour table of the frame may override: only a real global palette gives "P"
+    palette = _read_at(f, 13, 3 << ((flags & 7) + 1)) if flags & 0x80 else b""
+    if all(palette[i] == palette[i + 1] == palette[i + 2] == i // 3 for i in range(0, len(palette) - 2, 3)):
+        return None
+    complete = True if _read_at(f, size - 1, 1) == b";" else None
+    return {"format": "GIF", "width": width, "height": height, "mode": "P",
+            "orientation": None, "complete": complete}
+
+
+def _probe_bmp(f: BinaryIO, size: int) -> Optional[Dict[str, Any]]:
+    head = _read_at(f, 10, 30)
+    if len(head) < 30:
+        raise ProbeError("Truncated BMP header")
+    offset, header_size = struct.unpack("<II", head[:8])
+    if header_size < 40:
+        return None  # OS/2 bitmap
+    width, height, bits, compression, image_size = struct.unpack("<iixxHII", head[8:28])
+    # Palette images may be reported as "1", "L" or "P" depending on the palette; bit fields
+    # and compressed bitmaps depend on masks and run lengths
+    if bits not in (16, 24, 32) or compression != 0:
+        return None
+    height = abs(height)  # negative for top-down bitmaps
+    image_size = image_size or (width * bits + 31) // 32 * 4 * height
+    return {"format": "BMP", "width": width, "height": height, "mode": "RGB",
+            "orientation": None, "complete": offset + image_size <= size}
+
+
+def _probe_tiff(f: BinaryIO, size: int) -> Optional[Dict[str, Any]]:
+    tags, order = _tiff_tags(f, 0, {_WIDTH, _HEIGHT, _BITS, _PHOTOMETRIC, _STRIP_OFFSETS, _ORIENTATION,
+                                     _SAMPLES, _STRIP_COUNTS, _TILE_OFFSETS, _TILE_COUNTS, _EXTRA_SAMPLES})
+    if _WIDTH not in tags or _HEIGHT not in tags:
+        raise ProbeError("TIFF directory without image size")
+    samples = tags.get(_SAMPLES, (1,))[0]
+    key = (tags.get(_PHOTOMETRIC, (None,))[0], samples, tags.get(_BITS, (1,))[0])
+    mode = _TIFF_MODES.get(key)
+    if mode is None and key[1:] == (1, 16) and key[0] in (0, 1):
+        mode = "I;16" if order == "<" else "I;16B"
+    # Extra samples other than unassociated alpha give modes such as "RGBa" or "RGBX"
+    if mode is None or (samples in (2, 4) and mode != "CMYK" and tags.get(_EXTRA_SAMPLES) != (2,)):
+        return None
+    offsets = tags.get(_STRIP_OFFSETS) or tags.get(_TILE_OFFSETS)
+    counts = tags.get(_STRIP_COUNTS) or tags.get(_TILE_COUNTS)
+    if not offsets or not counts or len(offsets) != len(counts):
+        return None
+    width, height = tags[_WIDTH][0], tags[_HEIGHT][0]
+    orientation = tags.get(_ORIENTATION, (None,))[0]
+    if orientation in (5, 6, 7, 8):
+        width, height = height, width  # Pillow reports TIFF sizes after a quarter turn
+    return {"format": "TIFF", "width": width, "height": height, "mode": mode, "orientation": orientation,
+            "complete": max(o + c for o, c in zip(offsets, counts)) <= size}
+
+
+def probe(f: BinaryIO, huge_tiffs: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Read the format, size, mode and orientation of an image from its header, without Pillow.
+
+    Only the header structures (JPEG frame header and EXIF segment, PNG IHDR, GIF logical
+    screen and colour table, BMP info header, TIFF first IFD) and the last bytes of the file
+    are read, a few KB at most, so the cost is the I/O rather than CPU time holding the GIL. The end of the
+    file tells whether it was cut short: JPEG EOI and PNG IEND markers, GIF trailer, or the
+    extent of the pixel data for BMP and TIFF. Modes match those Pillow reports.
+
+    Args:
+        f (BinaryIO): Seekable binary file, positioned anywhere.
+        huge_tiffs (bool): Exempt TIFFs from the decompression bomb limit. Defaults to False.
+
+    Returns:
+        Optional[Dict[str, Any]]: "format", "width", "height", "mode", "orientation" and
+            "complete" (True if the end of the file is intact, False if it is truncated, None
+            if the end marker is missing but data may follow it), or None if the format or
+            variant is not one the probe parses (the caller falls back to Pillow).
+
+    Raises:
+        ProbeError: If the file has a known signature but a malformed or truncated header,
+            or if it exceeds Pillow's decompression bomb limit.
+    """
+    size = f.seek(0, io.SEEK_END)
+    signature = _read_at(f, 0, 8)
+    if signature.startswith(b"\xff\xd8\xff"):
+        parser = _probe_jpeg
+    elif signature == b"\x89PNG\r\n\x1a\n":
+        parser = _probe_png
+    elif signature[:6] in (b"GIF87a", b"GIF89a"):
+        parser = _probe_gif
+    elif signature.startswith(b"BM"):
+        parser = _probe_bmp
+    elif signature[:4] in (b"II*\x00", b"MM\x00*"):
+        parser = _probe_tiff
+    else:
+        return None
+    try:
+        result = parser(f, size)
+    except struct.error:  # a fixed-size structure cut short by the end of the file
+        raise ProbeError("Truncated header")
+    # Same limit as Image.open, which refuses images over twice MAX_IMAGE_PIXELS
+    if (result and Image.MAX_IMAGE_PIXELS and not (huge_tiffs and result["format"] == "TIFF")
+            and result["width"] * result["height"] > 2 * Image.MAX_IMAGE_PIXELS):
+        raise ProbeError(f"Image size ({result['width'] * result['height']} pixels) exceeds limit of "
+                         f"{2 * Image.MAX_IMAGE_PIXELS} pixels, could be decompression bomb DOS attack.")
+    return result
@@ -1,27 +1,70 @@
+import io
+import os
+import threading
+import time
+from concurrent.futures import Executor
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Callable, List, Any
+from typing import Callable, List, Any, Dict, Optional, Iterable, Iterator, AsyncIterator
 from PIL import Image
 from tqdm import tqdm
+from .metrics import ImageMetrics, collect, timed, add_bytes
+from .scheduler import (SCHEDULES, BucketQueue, MemoryBudget, estimate_footprint, image_info, interleave_chunks,
+                        task_cost)
+from .source import SourcePool, open_image
+from .autoscale import AUTO, ConcurrencyController, resolve_workers
+
+# Quality used when saving processed JPEGs
+JPEG_QUALITY = 85
+
+# Supported output formats and their file extensions
+OUTPUT_FORMATS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+
+# Pixel modes each output format can store; other modes are converted to RGB before encoding
+SAVE_MODES = {"JPEG": ("RGB", "L"), "PNG": ("RGB", "RGBA", "L", "LA"), "WEBP": ("RGB", "RGBA")}
+
+# Stand-in for timed() when metrics are disabled
+_no_timer = nullcontext()
+
 
 class ImageProcessor:
     """
     Processes images through a configurable pipeline of steps.
 
+    A step is called with the image path. Steps that set the attribute `uses_info = True`
+    are also handed the validation record of the image (size, format, mode, orientation and,
+    after a deep verify, the decoded frame under "image"), so they don't have to probe the
+    file again. Steps may declare the keys they return in a `fields` attribute; these become
+    the report columns when the report is streamed.
+
+    Batch steps (see add_batch_step) run after the per-image steps on whole chunks of images.
+
     Attributes:
         steps (List[Callable[[Path], Any]]): Functions defining processing steps.
+        batch_steps (List[Callable[[List[tuple]], List[dict]]]): Steps processing many images per call.
+        batch_size (int): Images per chunk when batch steps are configured.
         output_folder (Path): Folder to save processed images.
+        record_timing (bool): Add the wall time spent in the steps ("elapsed_ms") to each result.
+        collect_metrics (bool): Add per-step and per-phase timings and byte counts to each
+            result, under "metrics" (see src.metrics).
     """
 
-    def __init__(self, output_folder: str = "output"):
+    def __init__(self, output_folder: str = "output", record_timing: bool = False, collect_metrics: bool = False):
         """
         Initialize the processor.
 
         Args:
             output_folder (str): Folder where processed images will be stored.
+            record_timing (bool): Record the per-image processing time. Defaults to False.
+            collect_metrics (bool): Record detailed per-image metrics. Defaults to False.
         """
         self.steps: List[Callable[[Path], Any]] = []
+        self.batch_steps: List[Callable[[List[tuple]], List[Dict[str, Any]]]] = []
+        self.batch_size = 64
         self.output_folder = Path(output_folder)
         self.output_folder.mkdir(parents=True, exist_ok=True)
+        self.record_timing = record_timing
+        self.collect_metrics = collect_metrics
 
     def add_step(self, func: Callable[[Path], Any]):
         """
@@ -32,101 +75,954 @@ class ImageProcessor:
         """
         self.steps.append(func)
 
-    def _run_steps(self, path: Path):
+    def add_batch_step(self, func: Callable[[List[tuple]], List[Dict[str, Any]]], batch_size: int = 64):
+        """
+        Add a step that processes many images per call (e.g. src.batch.BatchStep).
+
+        The step is called with the (path, info) pairs of a chunk and returns one dict per image.
+        Chunks then hold `batch_size` images, and run_parallel groups images of equal size and
+        mode into the same chunks when their validation records are known.
+
+        Args:
+            func (Callable[[List[tuple]], List[dict]]): Batch step.
+            batch_size (int): Images per chunk. Defaults to 64.
+        """
+        self.batch_steps.append(func)
+        self.batch_size = batch_size
+
+    @property
+    def fields(self) -> List[str]:
+        """
+        Report columns produced by the processor: "source" followed by the declared fields of each step.
+        """
+        fields = ["source"]
+        for step in self.steps + self.batch_steps:
+            for k in getattr(step, "fields", ()):
+                if k not in fields:
+                    fields.append(k)
+        if self.record_timing:
+            fields.append("elapsed_ms")
+        return fields
+
+    def config(self) -> List[Any]:
+        """
+        Describe the configured steps, so cached results can be invalidated when they change.
+
+        Steps may provide a `config()` method returning their parameters; other steps are
+        identified by name only.
+
+        Returns:
+            List[Any]: One entry per step.
+        """
+        return [step.config() if hasattr(step, "config") else getattr(step, "__qualname__", type(step).__qualname__)
+                for step in self.steps + self.batch_steps]
+
+    def footprint(self, path: Path, info: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Estimate the peak memory needed to process one image (see src.scheduler).
+
+        Steps may provide a `footprint(info)` method; the largest estimate wins. Without a
+        validation record the size is read from the image header.
+
+        Args:
+            path (Path): Path to the image.
+            info (dict, optional): Validation record of the image.
+
+        Returns:
+            int: Estimated bytes.
+        """
+        if not info or not info.get("width"):
+            info = image_info(path)
+        estimates = [step.footprint(info) for step in self.steps if hasattr(step, "footprint")]
+        return max(estimates) if estimates else estimate_footprint(info)
+
+    def _run_steps(self, path: Path, info: Optional[Dict[str, Any]] = None):
         """
         Run all steps on a single image.
 
         Args:
             path (Path): Path to the image.
+            info (Dict[str, Any], optional): Validation record of the image.
 
         Returns:
             dict: Aggregated results including source path and processing info.
         """
+        if self.collect_metrics:
+            metrics = ImageMetrics()
+            with collect(metrics):
+                results = self._call_steps(path, info, timed_steps=True)
+            try:
+                metrics.bytes_read += os.stat(path).st_size
+            except OSError:
+                pass
+            results["metrics"] = metrics.to_dict()
+            return results
+        return self._call_steps(path, info)
+
+    def _call_steps(self, path: Path, info: Optional[Dict[str, Any]], timed_steps: bool = False):
+        """
+        Call every step in order and merge their results.
+
+        Args:
+            path (Path): Path to the image.
+            info (Dict[str, Any], optional): Validation record of the image.
+            timed_steps (bool): Time each step into the metrics of the current image.
+
+        Returns:
+            dict: Aggregated results including source path and processing info.
+        """
+        start = time.perf_counter() if self.record_timing else None
         results = {"source": str(path)}
         for step in self.steps:
-            r = step(path)
+            with timed(step_name(step)) if timed_steps else _no_timer:
+                if getattr(step, "uses_info", False):
+                    r = step(path, info)
+                else:
+                    r = step(path)
             if isinstance(r, dict):
                 results.update(r)
+        if start is not None:
+            results["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
         return results
 
-    def run_serial(self, image_paths: List[Path]):
+    def _validate_and_run(self, path: Path, validate: Callable[[Path], Dict[str, Any]]):
+        """
+        Validate an image and, if it is valid, run all steps on it.
+
+        Used with a deep verify: the decoded frame is handed straight to the steps and
+        released afterwards, instead of being held until the whole batch is validated.
+
+        Args:
+            path (Path): Path to the image.
+            validate (Callable[[Path], Dict[str, Any]]): Validation function (e.g. ImageValidator.validate).
+
+        Returns:
+            dict: The validation record, merged with the processing results if the image was valid.
+        """
+        info = validate(path)
+        if not info.get("ok"):
+            return info
+        frame = info.pop("image", None)
+        try:
+            processed = self._run_steps(path, dict(info, image=frame))
+        finally:
+            if frame is not None:
+                frame.close()
+        info.update(processed)
+        return info
+
+    def _run_task(self, path: Path, info: Optional[Dict[str, Any]] = None,
+                  validate: Optional[Callable[[Path], Dict[str, Any]]] = None, settle: bool = False):
+        """
+        Process one image, validating it first if a validation function is given.
+
+        Args:
+            path (Path): Path to the image.
+            info (dict, optional): Validation record of the image.
+            validate (Callable, optional): Validation function to run inside the task.
+            settle (bool): Wait for the output to be written before returning (see _settle).
+
+        Returns:
+            dict: Results for the image.
+        """
+        if validate is not None:
+            result = self._validate_and_run(path, validate)
+        else:
+            result = self._run_steps(path, info)
+        if settle:
+            self._settle([result])
+        return result
+
+    def _run_chunk(self, tasks: List[tuple], validate: Optional[Callable[[Path], Dict[str, Any]]] = None,
+                   settle: bool = False):
+        """
+        Process a chunk of images. This is the unit of work submitted to the executor.
+
+        Args:
+            tasks (List[tuple]): (path, info) pairs.
+            validate (Callable, optional): Validation function to run inside each task.
+            settle (bool): Wait for the outputs of the chunk to be written before returning, as
+                needed when the results are sent back from a worker process (see _settle).
+
+        Returns:
+            List[dict]: Results for each image of the chunk.
+        """
+        results = [self._run_task(p, info, validate) for p, info in tasks]
+        if self.batch_steps:
+            self._run_batch_steps(tasks, results)
+        if settle:
+            self._settle(results)
+        return results
+
+    @staticmethod
+    def _settle(results: List[Dict[str, Any]]):
+        """
+        Wait for the outputs that steps handed to a writer stage (see src.writer) to be written.
+
+        Steps using an OutputWriter return the Future of the write under "write", so the
+        worker can move on to the next image. Results are settled by whoever consumes them,
+        before they are reported: the Future is removed, a write error becomes the "error"
+        of the image, and the write time is added to its metrics.
+
+        Args:
+            results (List[dict]): Results, updated in place.
+        """
+        for r in results:
+            fut = r.pop("write", None)
+            if fut is None:
+                continue
+            try:
+                seconds = fut.result()
+            except Exception as e:
+                r["error"] = str(e)
+                continue
+            if "metrics" in r:
+                entry = r["metrics"]["stages"].setdefault("write", [0.0, 0.0])
+                entry[0] += seconds
+
+    def close(self):
+        """
+        Release the resources of the steps, e.g. finish the pending writes and the archive of
+        a writer stage. Call once a run is over; steps reopen what they need on next use.
+        """
+        for step in self.steps + self.batch_steps:
+            if hasattr(step, "close"):
+                step.close()
+
+    def _run_batch_steps(self, tasks: List[tuple], results: List[Dict[str, Any]]):
+        """
+        Run the batch steps on the images of a chunk that passed validation, updating their results.
+
+        Args:
+            tasks (List[tuple]): (path, info) pairs of the chunk.
+            results (List[dict]): Per-image results of the chunk, updated in place.
+        """
+        # After a deep verify the validation record is part of the result
+        batch = [(i, Path(p), info or r) for i, ((p, info), r) in enumerate(zip(tasks, results))
+                 if r.get("ok") is not False and not r.get("error")]
+        if not batch:
+            return
+        for step in self.batch_steps:
+            outs = step([(p, info) for _, p, info in batch])
+            for (i, _, _), out in zip(batch, outs):
+                if isinstance(out, dict):
+                    results[i].update(out)
+
+    def run_serial(self, image_paths: List[Path], infos: Optional[List[Dict[str, Any]]] = None,
+                   validate: Optional[Callable[[Path], Dict[str, Any]]] = None):
         """
         Process images one by one.
 
         Args:
             image_paths (List[Path]): List of image paths.
+            infos (List[dict], optional): Validation records aligned with image_paths.
+            validate (Callable, optional): Validate each image right before processing it.
 
         Returns:
             List[dict]: Results for each image.
         """
-        return [self._run_steps(p) for p in image_paths]
+        infos = infos if infos is not None else [None] * len(image_paths)
+        return self._run_chunk(list(zip(image_paths, infos)), validate, settle=True)
 
-    def run_parallel(self, image_paths: List[Path], max_workers: int = 4):
+    def run_parallel(self, image_paths: List[Path], max_workers: int = 4,
+                     infos: Optional[List[Dict[str, Any]]] = None,
+                     validate: Optional[Callable[[Path], Dict[str, Any]]] = None,
+                     executor: str = "threads",
+                     chunksize: Optional[int] = None,
+                     recycle_after: Optional[int] = None,
+                     max_memory: Optional[int] = None,
+                     on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+                     autoscale: Optional[ConcurrencyController] = None,
+                     pool: Optional[Executor] = None,
+                     schedule: str = "fifo"):
         """
-        Process images concurrently using threads.
+        Process images concurrently using threads or processes.
+
+        With the process backend the processor, its steps and the validate function are pickled
+        and sent to the workers, so they must be picklable (module-level functions or step
+        objects such as ResizeAndSaveStep, not closures).
 
         Args:
             image_paths (List[Path]): List of image paths.
-            max_workers (int): Number of threads.
+            max_workers (int or str): Number of workers, or AUTO to adapt it during the run (see autoscale).
+            infos (List[dict], optional): Validation records aligned with image_paths.
+            validate (Callable, optional): Validate each image inside its worker right before
+                processing it (used for deep verification).
+            executor (str): Backend: "threads", "processes" or "serial". Defaults to "threads".
+            chunksize (int, optional): Images sent to a worker at once. Defaults to 1 for threads
+                and to about four chunks per worker for processes (the controller's maximum
+                with autoscale), to amortise pickling, or to batch_size if batch steps are configured.
+            recycle_after (int, optional): Process backend only. Replace a worker process after
+                it has handled about this many images, to cap memory growth.
+            max_memory (int, optional): Memory budget in bytes for the images in flight. Tasks
+                are then submitted lazily, one image per chunk unless `chunksize` says otherwise,
+                and only while their estimated footprint fits (see iter_parallel).
+            on_result (Callable, optional): Called in the calling thread with each result as
+                soon as it completes (e.g. to checkpoint progress).
+            autoscale (ConcurrencyController, optional): Adapt the number of images in flight with
+                this controller; tasks are then submitted lazily (see iter_parallel). Created for
+                the backend when max_workers is AUTO.
+            pool (Executor, optional): Run on this executor, of the `executor` kind and size,
+                instead of creating one; it is left running (see ImagePipeline.watch).
+            schedule (str): Order of the tasks, from their estimated cost (see task_cost):
+                "fifo" (as given), "lpt" (largest first, so the run does not end with one
+                worker busy on a huge image while the others idle; chunks of several images
+                get their share of the large ones, see interleave_chunks), "buckets" (size classes
+                with their own workers, see BucketQueue) or "steal" (buckets whose idle
+                workers take over the tasks of the others). The bucket policies dispatch
+                one image at a time to a fixed number of workers (the CPU count for AUTO)
+                and are not available with max_memory.
 
         Returns:
             List[dict]: Results for each image.
+
+        Raises:
+            ValueError: If schedule is unknown, or a bucket policy is combined with max_memory.
         """
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        from concurrent.futures import as_completed
+        from .executor import make_executor
+
+        if schedule not in SCHEDULES:
+            raise ValueError(f"Unknown schedule '{schedule}', expected one of {SCHEDULES}")
+        bucketed = schedule in ("buckets", "steal")
+        if bucketed and max_memory:
+            raise ValueError("The bucket schedules are not available with max_memory")
+        infos = infos if infos is not None else [None] * len(image_paths)
+        tasks = list(zip(image_paths, infos))
+        if schedule == "lpt":
+            tasks.sort(key=lambda t: task_cost(*t), reverse=True)
+        if self.batch_steps:
+            # Images of the same size and mode land in the same chunks, and thus in the same arrays
+            # (largest first with lpt: images of the same size have the same cost)
+            tasks.sort(key=lambda t: (-task_cost(*t), batch_key(t[1])) if schedule == "lpt" else batch_key(t[1]))
+            chunksize = chunksize or self.batch_size
+        if max_workers == AUTO and autoscale is None and not bucketed:
+            autoscale = ConcurrencyController.for_executor(executor)
+        if chunksize is None and executor == "processes" and not (max_memory or bucketed):
+            # About four chunks per worker amortise pickling without leaving workers idle at the end
+            workers = autoscale.max_workers if autoscale is not None else max_workers
+            chunksize = max(1, -(-len(tasks) // (workers * 4)))
+        if schedule == "lpt" and chunksize is not None and chunksize > 1 and not self.batch_steps:
+            tasks = interleave_chunks(tasks, chunksize)
+        if max_memory or autoscale is not None or bucketed:
+            if bucketed:
+                results = self.iter_buckets(tasks, resolve_workers(max_workers), validate, executor, recycle_after,
+                                            steal=schedule == "steal", pool=pool)
+                autoscale = None
+            else:
+                results = self.iter_parallel(tasks, max_workers, validate, executor, chunksize,
+                                             recycle_after, max_memory=max_memory, autoscale=autoscale, pool=pool)
+            out = []
+            with tqdm(total=len(tasks), desc="Processing (Parallel)", unit="img") as bar:
+                for r in results:
+                    if on_result is not None:
+                        on_result(r)
+                    out.append(r)
+                    bar.update(1)
+                    if autoscale is not None:
+                        bar.set_postfix(workers=autoscale.limit, refresh=False)
+            return out
+        chunksize = chunksize or 1
+        max_tasks_per_child = None
+        if executor == "processes" and recycle_after:
+            max_tasks_per_child = max(1, recycle_after // chunksize)
 
         out = []
-        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        with nullcontext(pool) if pool is not None else make_executor(executor, max_workers, max_tasks_per_child) as ex:
             futures = {}
-            for p in image_paths:
-                fut = ex.submit(self._run_steps, p)
-                futures[fut] = p  # store the original image path 'p' associated with its running Future 'fut'
+            for start in range(0, len(tasks), chunksize):
+                chunk = tasks[start:start + chunksize]
+                fut = ex.submit(self._run_chunk, chunk, validate, executor == "processes")
+                futures[fut] = chunk  # store the chunk of (path, info) pairs associated with its running Future 'fut'
 
-            for fut in tqdm(as_completed(futures), total=len(futures), desc="Processing (Parallel)", unit="img"):
-                result = fut.result()
-                out.append(result)
+            with tqdm(total=len(tasks), desc="Processing (Parallel)", unit="img") as bar:
+                for fut in as_completed(futures):
+                    results = fut.result()
+                    self._settle(results)
+                    if on_result is not None:
+                        for r in results:
+                            on_result(r)
+                    out.extend(results)
+                    bar.update(len(results))
 
         return out
 
+    def run_distributed(self, image_paths: List[Path], work_queue,
+                        infos: Optional[List[Dict[str, Any]]] = None,
+                        on_result: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Process images on worker nodes through a shared work queue, as the coordinator.
+
+        Publishes this processor and the tasks on the queue, then waits until the workers
+        (see src.workqueue.run_worker) have returned a result for every image. Images whose
+        workers kept dying are returned as results with an "error". The processor is pickled
+        into the queue, so the same constraints as for the process backend apply.
+
+        Args:
+            image_paths (List[Path]): List of image paths.
+            work_queue (WorkQueue): Queue shared with the workers.
+            infos (List[dict], optional): Validation records aligned with image_paths.
+            on_result (Callable, optional): Called with each result as soon as it is collected.
+
+        Returns:
+            List[dict]: Results for each image, in completion order.
+
+        Raises:
+            TimeoutError: If the queue has an `idle_timeout` and no result came in for that long.
+        """
+        infos = infos if infos is not None else [None] * len(image_paths)
+        tasks = list(zip(image_paths, infos))
+        idle_timeout = getattr(work_queue, "idle_timeout", None)
+        if self.batch_steps:
+            # Neighbouring tasks are leased together, so same-sized images still share batches
+            tasks.sort(key=lambda t: batch_key(t[1]))
+        work_queue.start(self)
+        work_queue.put(tasks)
+        out = []
+        last_result = time.monotonic()
+        try:
+            with tqdm(total=len(tasks), desc="Processing (Distributed)", unit="img") as bar:
+                while len(out) < len(tasks):
+                    results = work_queue.collect()
+                    if not results:
+                        if idle_timeout is not None and time.monotonic() - last_result > idle_timeout:
+                            raise TimeoutError(f"No result from the workers in {idle_timeout} s "
+                                               f"({len(out)} of {len(tasks)} images done)")
+                        time.sleep(getattr(work_queue, "poll_interval", 0.5))
+                        continue
+                    last_result = time.monotonic()
+                    for r in results:
+                        if on_result is not None:
+                            on_result(r)
+                    out.extend(results)
+                    bar.update(len(results))
+        finally:
+            work_queue.close()
+        return out
+
+    def iter_parallel(self, tasks: Iterable[tuple], max_workers: int = 4,
+                      validate: Optional[Callable[[Path], Dict[str, Any]]] = None,
+                      executor: str = "threads",
+                      chunksize: Optional[int] = None,
+                      recycle_after: Optional[int] = None,
+                      max_pending: Optional[int] = None,
+                      max_memory: Optional[int] = None,
+                      autoscale: Optional[ConcurrencyController] = None,
+                      pool: Optional[Executor] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Process a stream of images concurrently, yielding results as they complete.
+
+        Tasks are pulled from the iterable lazily: at most `max_pending` chunks are in flight,
+        so a slow consumer or a huge input never builds up an unbounded backlog of futures.
+        With `max_memory`, a chunk is also held back until its estimated footprint (see
+        footprint()) fits in the budget next to the chunks already running.
+
+        With a ConcurrencyController (`autoscale`), the executor has the controller's maximum
+        number of workers and the chunks in flight follow its limit, which it adapts from the
+        latency of the chunks, the time spent waiting for input and the CPU utilisation.
+
+        Args:
+            tasks (Iterable[tuple]): (path, info) pairs, e.g. produced by a validation stage.
+            max_workers (int or str): Number of workers, or AUTO to adapt it (see autoscale).
+            validate (Callable, optional): Validate each image inside its worker right before
+                processing it (used for deep verification).
+            executor (str): Backend: "threads", "processes" or "serial". Defaults to "threads".
+            chunksize (int, optional): Images sent to a worker at once. Defaults to 1, or to
+                batch_size if batch steps are configured.
+            recycle_after (int, optional): Process backend only. Replace a worker process after
+                it has handled about this many images.
+            max_pending (int, optional): Maximum number of chunks in flight. Defaults to twice
+                the number of workers.
+            max_memory (int, optional): Memory budget in bytes for the images in flight.
+                Defaults to None (unlimited).
+            autoscale (ConcurrencyController, optional): Controller setting the chunks in flight
+                (at most max_pending). Created for the backend when max_workers is AUTO; pass
+                one explicitly to keep what it learned across calls.
+            pool (Executor, optional): Run on this executor, of the `executor` kind and size,
+                instead of creating one; it is left running.
+
+        Yields:
+            dict: Results for each image, in completion order.
+        """
+        from concurrent.futures import wait, as_completed, FIRST_COMPLETED
+        from itertools import islice
+        from .executor import make_executor
+
+        chunksize = chunksize or (self.batch_size if self.batch_steps else 1)
+        if max_workers == AUTO and autoscale is None:
+            autoscale = ConcurrencyController.for_executor(executor)
+        if autoscale is not None:
+            max_workers = autoscale.max_workers
+        max_pending = max_pending or max_workers * 2
+
+        def window():
+            return min(max_pending, autoscale.limit) if autoscale is not None else max_pending
+        max_tasks_per_child = None
+        if executor == "processes" and recycle_after:
+            max_tasks_per_child = max(1, recycle_after // chunksize)
+
+        tasks = iter(tasks)
+        budget = MemoryBudget(max_memory)
+        with nullcontext(pool) if pool is not None else make_executor(executor, max_workers, max_tasks_per_child) as ex:
+            pending = {}  # running futures and the estimated footprint of their chunk
+            submitted = {}  # submission time and size of each running chunk, for the controller
+
+            def finish(fut):
+                budget.release(pending.pop(fut))
+                results = fut.result()
+                self._settle(results)
+                if autoscale is not None:
+                    start, size = submitted.pop(fut)
+                    autoscale.record(time.perf_counter() - start, size)
+                    autoscale.update()
+                return results
+
+            while True:
+                start = time.perf_counter()
+                chunk = list(islice(tasks, chunksize))
+                if autoscale is not None and len(pending) < window():
+                    # A worker slot stayed free while the input was not ready
+                    autoscale.idle(time.perf_counter() - start)
+                if not chunk:
+                    break
+                cost = sum(self.footprint(p, info) for p, info in chunk) if max_memory else 0
+                # Block while the window is full or the chunk does not fit in the budget
+                while pending and (len(pending) >= window() or not budget.fits(cost)):
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        yield from finish(fut)
+                budget.admit(cost)
+                fut = ex.submit(self._run_chunk, chunk, validate, executor == "processes")
+                pending[fut] = cost
+                submitted[fut] = (time.perf_counter(), len(chunk))
+                # Hand back whatever has finished
+                for fut in [f for f in pending if f.done()]:
+                    yield from finish(fut)
+            for fut in as_completed(list(pending)):
+                yield from finish(fut)
+
+    def iter_buckets(self, tasks: List[tuple], max_workers: int = 4,
+                     validate: Optional[Callable[[Path], Dict[str, Any]]] = None,
+                     executor: str = "threads",
+                     recycle_after: Optional[int] = None,
+                     buckets: int = 3,
+                     steal: bool = True,
+                     pool: Optional[Executor] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Process images split into size classes, each with its own share of the workers.
+
+        The classes and their workers are managed by a BucketQueue: every worker runs the
+        largest remaining task of its class and, with `steal`, of the busiest other class
+        once its own is empty. Images are dispatched one at a time, as workers free up.
+
+        Args:
+            tasks (List[tuple]): (path, info) pairs.
+            max_workers (int): Number of workers shared by the classes.
+            validate (Callable, optional): Validate each image inside its worker right before processing it.
+            executor (str): Backend: "threads", "processes" or "serial". Defaults to "threads".
+            recycle_after (int, optional): Process backend only. Replace a worker process after
+                this many images.
+            buckets (int): Maximum number of size classes. Defaults to 3.
+            steal (bool): Let idle workers take tasks from other classes. Defaults to True.
+            pool (Executor, optional): Run on this executor instead of creating one; it is left running.
+
+        Yields:
+            dict: Results for each image, in completion order.
+        """
+        from concurrent.futures import wait, FIRST_COMPLETED
+        from .executor import make_executor
 
-def make_resize_and_save_step(output_folder: str = "output", scale: float = 1.0):
+        queue = BucketQueue(tasks, [task_cost(p, info) for p, info in tasks], max_workers, buckets, steal)
+        max_tasks_per_child = recycle_after if executor == "processes" else None
+        with nullcontext(pool) if pool is not None else make_executor(executor, max_workers, max_tasks_per_child) as ex:
+            pending = {}  # running futures and the class of the worker running them
+            while True:
+                item = queue.take()
+                while item is not None:
+                    slot, task = item
+                    pending[ex.submit(self._run_chunk, [task], validate, executor == "processes")] = slot
+                    item = queue.take()
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    queue.release(pending.pop(fut))
+                    results = fut.result()
+                    self._settle(results)
+                    yield from results
+
+    async def run_async(self, tasks, executor=None,
+                        validate: Optional[Callable[[Path], Dict[str, Any]]] = None,
+                        concurrency: int = 4) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a stream of images from asyncio code, yielding results as they complete.
+
+        The steps run on `executor` (the event loop's default thread pool if None), so the
+        event loop is never blocked. Many calls can share one executor, e.g. a process pool
+        owned by a service, while `concurrency` caps how many images of this call are in
+        flight at once. If the consumer stops iterating or the calling task is cancelled,
+        images that have not started yet are cancelled (close the iterator, e.g. with
+        contextlib.aclosing, to release them promptly).
+
+        Args:
+            tasks (Iterable[tuple] or AsyncIterable[tuple]): (path, info) pairs.
+            executor (concurrent.futures.Executor, optional): Executor running the steps.
+            validate (Callable, optional): Validate each image inside its task right before
+                processing it (used for deep verification).
+            concurrency (int): Maximum number of images in flight for this call. Defaults to 4.
+
+        Yields:
+            dict: Results for each image, in completion order.
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(concurrency)
+        pending = set()
+        if not hasattr(tasks, "__aiter__"):
+            tasks = _aiter(tasks)
+        try:
+            async for path, info in tasks:
+                await slots.acquire()
+                # The executor may be a process pool, so each task waits for its own writes
+                fut = loop.run_in_executor(executor, self._run_task, path, info, validate, True)
+                fut.add_done_callback(lambda f: slots.release())
+                pending.add(fut)
+                done = {f for f in pending if f.done()}
+                pending -= done
+                for f in done:
+                    yield f.result()
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for f in done:
+                    yield f.result()
+        finally:
+            for f in pending:
+                f.cancel()
+
+
+async def _aiter(items: Iterable):
     """
-    Create a processing step that resizes images by a given percentage and saves them.
+    Wrap a regular iterable as an async iterator.
+    """
+    for item in items:
+        yield item
 
-    Args:
-        output_folder (str): Folder to save processed images.
-        scale (float): Resize factor (0.5 = 50%).
 
-    Returns:
-        Callable[[Path], dict]: Function that resizes and saves an image.
+class ResizeAndSaveStep:
+    """
+    Processing step that resizes images by a given percentage and saves them (JPEG by default).
+
+    Implemented as a class rather than a closure so it can be pickled and sent to worker processes.
+
+    For large downscales, `reducing_gap` trades a little quality for speed and memory: JPEGs
+    are decoded directly at the smallest DCT scale (1/2, 1/4 or 1/8) that is still at least
+    `reducing_gap` times the target size, and other formats are first shrunk by an integer
+    factor with a cheap box filter before the final LANCZOS pass. The larger the gap, the
+    closer the result is to a plain LANCZOS resize; around 3.0 the difference is invisible.
+
+    Attributes:
+        out_folder (Path): Folder to save processed images.
+        scale (float): Resize factor (0.5 = 50%).
+        reducing_gap (Optional[float]): Draft/reduce tolerance (>= 1.0), or None for a full decode.
+        format (str): Output format, one of OUTPUT_FORMATS.
+        quality (int): Encoder quality for lossy formats.
+        input_root (Optional[Path]): Input folder; outputs mirror the subdirectories below it.
+        writer (Optional[OutputWriter]): Writer stage taking the encoded outputs (see src.writer).
+        sources (Optional[SourcePool]): Pool of memory-mapped inputs the sources are read from (see src.source).
     """
-    out_folder = Path(output_folder)
-    out_folder.mkdir(parents=True, exist_ok=True)
 
-    def step(path: Path):
+    uses_info = True
+    fields = ("processed_path", "processed_width", "processed_height", "error")
+
+    def __init__(self, output_folder: str = "output", scale: float = 1.0, reducing_gap: Optional[float] = None,
+                 format: str = "JPEG", quality: int = JPEG_QUALITY, input_root: Optional[str] = None,
+                 writer=None, sources: Optional[SourcePool] = None):
         """
-        Resize the image by scale and save as JPEG.
+        Initialize the step and create the output folder.
+
+        Args:
+            output_folder (str): Folder to save processed images.
+            scale (float): Resize factor (0.5 = 50%).
+            reducing_gap (float, optional): Enable draft decoding and reducing resize with this
+                tolerance (>= 1.0). Defaults to None (full decode, plain LANCZOS).
+            format (str): Output format ("JPEG", "PNG" or "WEBP"). Defaults to "JPEG".
+            quality (int): Encoder quality for JPEG and WebP. Defaults to 85.
+            input_root (str, optional): Input folder. Images in its subdirectories are saved in the
+                same subdirectories of the output folder, so equal names in different folders
+                don't collide. Defaults to None (all outputs directly in the output folder).
+            writer (OutputWriter, optional): Hand encoded outputs to this writer stage and move on
+                to the next image. With a pack archive, packed images report the archive as
+                processed_path and their member name as archive_member. Defaults to None (each
+                image is written by the worker that encoded it).
+            sources (SourcePool, optional): Read the sources through this pool of mappings,
+                shared with the validator. Defaults to None (plain file reads).
+
+        Raises:
+            ValueError: If the format is not supported.
+        """
+        self.out_folder = Path(output_folder)
+        self.out_folder.mkdir(parents=True, exist_ok=True)
+        self.scale = scale
+        self.reducing_gap = reducing_gap
+        self.format = check_format(format)
+        self.quality = quality
+        self.input_root = Path(input_root) if input_root is not None else None
+        self.writer = writer
+        self.sources = sources
+        if writer is not None and writer.archive is not None:
+            self.fields = type(self).fields + ("archive_member",)
+
+    def config(self) -> Dict[str, Any]:
+        """
+        Parameters that determine the output of this step.
+        """
+        config = {"step": type(self).__name__, "output_folder": str(self.out_folder), "scale": self.scale,
+                  "format": self.format, "quality": self.quality, "reducing_gap": self.reducing_gap,
+                  "input_root": str(self.input_root) if self.input_root is not None else None}
+        if self.writer is not None and self.writer.archive is not None:
+            config["archive"] = {"path": str(self.writer.archive.path), "pack_below": self.writer.pack_below}
+        return config
+
+    def close(self):
+        """
+        Finish the pending writes of the writer stage, if any.
+        """
+        if self.writer is not None:
+            self.writer.close()
+
+    def footprint(self, info: Dict[str, Any]) -> int:
+        """
+        Estimated peak memory for an image with the given validation record.
+        """
+        size = (info.get("width") or 0, info.get("height") or 0)
+        return estimate_footprint(info, target_size(size, self.scale) if all(size) else None)
+
+    def __call__(self, path: Path, info: Optional[Dict[str, Any]] = None):
+        """
+        Resize the image by scale and save it in the configured format.
 
         Args:
             path (Path): Input image path.
+            info (dict, optional): Validation record; its decoded "image" is reused if present.
 
         Returns:
             dict: Info about the processed image or error message.
         """
         try:
-            with Image.open(path) as img:
-                img = img.convert("RGB")
-                w, h = img.size
-                new_w = max(1, int(w * scale))
-                new_h = max(1, int(h * scale))
-                img = img.resize((new_w, new_h), Image.LANCZOS) # using LANCZOS for high-quality image resampling
-                out_path = out_folder / f"{path.stem}_processed.jpg"
-                img.save(out_path, format="JPEG", quality=85)
-                return {
-                    "processed_path": str(out_path),
-                    "processed_width": img.size[0],
-                    "processed_height": img.size[1],
-                }
+            frame = info.get("image") if info else None
+            if frame is not None:
+                return self._resize_and_save(frame, path)
+            with open_image(path, self.sources) as img:
+                return self._resize_and_save(img, path)
         except Exception as e:
             return {"error": str(e)}
 
-    return step
+    def _resize_and_save(self, img: Image.Image, path: Path):
+        """
+        Resize an opened image by scale and save it.
+
+        Args:
+            img (Image.Image): Opened or already decoded image.
+            path (Path): Original image path (used to name the output).
+
+        Returns:
+            dict: Info about the processed image.
+        """
+        # The target is computed from the full size, before draft() shrinks the decoded image
+        size = target_size(img.size, self.scale)
+        img = decode_rgb(img, size, self.reducing_gap)
+        with timed("resize"):
+            img = img.resize(size, Image.LANCZOS, reducing_gap=self.reducing_gap) # using LANCZOS for high-quality image resampling
+        out_path = output_path(self.out_folder, path, f"_processed{OUTPUT_FORMATS[self.format]}", self.input_root)
+        result = {
+            "processed_path": str(out_path),
+            "processed_width": img.size[0],
+            "processed_height": img.size[1],
+        }
+        if self.writer is None:
+            save_image(img, out_path, self.format, self.quality)
+            return result
+        member, result["write"] = save_image(img, out_path, self.format, self.quality, self.writer, self.out_folder)
+        if member is not None:
+            result["processed_path"] = str(self.writer.archive.path)
+            result["archive_member"] = member
+        return result
+
+
+def make_resize_and_save_step(output_folder: str = "output", scale: float = 1.0,
+                              reducing_gap: Optional[float] = None, format: str = "JPEG",
+                              input_root: Optional[str] = None, writer=None,
+                              sources: Optional[SourcePool] = None):
+    """
+    Create a processing step that resizes images by a given percentage and saves them.
+
+    Args:
+        output_folder (str): Folder to save processed images.
+        scale (float): Resize factor (0.5 = 50%).
+        reducing_gap (float, optional): Draft decoding / reducing resize tolerance (see ResizeAndSaveStep).
+        format (str): Output format ("JPEG", "PNG" or "WEBP"). Defaults to "JPEG".
+        input_root (str, optional): Input folder whose subdirectories are mirrored in the output folder.
+        writer (OutputWriter, optional): Writer stage for the encoded outputs (see src.writer).
+        sources (SourcePool, optional): Pool of memory-mapped inputs to read the sources from (see src.source).
+
+    Returns:
+        ResizeAndSaveStep: Picklable callable that resizes and saves an image.
+    """
+    return ResizeAndSaveStep(output_folder=output_folder, scale=scale, reducing_gap=reducing_gap, format=format,
+                             input_root=input_root, writer=writer, sources=sources)
+
+
+def batch_key(info: Optional[Dict[str, Any]]) -> tuple:
+    """
+    Size and mode of an image from its validation record, used to group images for batch steps.
+    """
+    info = info or {}
+    return info.get("width") or 0, info.get("height") or 0, info.get("mode") or ""
+
+
+def step_name(step: Callable) -> str:
+    """
+    Name of a step in metrics: its `name` attribute, function name or class name.
+    """
+    return getattr(step, "name", None) or getattr(step, "__name__", None) or type(step).__name__
+
+
+def output_path(out_folder: Path, path: Path, suffix: str, input_root: Optional[Path] = None) -> Path:
+    """
+    Build the output path of an image: its stem plus suffix, in the output folder.
+
+    If the image lies below input_root, its relative directory is recreated in the output folder.
+
+    Args:
+        out_folder (Path): Output folder.
+        path (Path): Source image path.
+        suffix (str): Appended to the stem, including the extension (e.g. "_processed.jpg").
+        input_root (Path, optional): Input folder to compute the relative directory from.
+
+    Returns:
+        Path: Output file path (its directory exists).
+    """
+    folder = out_folder
+    if input_root is not None:
+        try:
+            rel = path.parent.relative_to(input_root)
+        except ValueError:
+            rel = Path()
+        if rel.parts:
+            folder = out_folder / rel
+            folder.mkdir(parents=True, exist_ok=True)
+    return folder / f"{path.stem}{suffix}"
+
+
+def check_format(fmt: str) -> str:
+    """
+    Normalize an output format name.
+
+    Args:
+        fmt (str): Format name, case-insensitive ("jpg" is accepted for "JPEG").
+
+    Returns:
+        str: Upper-case format name, a key of OUTPUT_FORMATS.
+
+    Raises:
+        ValueError: If the format is not supported.
+    """
+    fmt = fmt.upper()
+    fmt = "JPEG" if fmt == "JPG" else fmt
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format '{fmt}', expected one of {tuple(OUTPUT_FORMATS)}")
+    return fmt
+
+
+def target_size(size: tuple, scale: float) -> tuple:
+    """
+    Compute the size of an image resized by scale (at least 1x1).
+    """
+    w, h = size
+    return max(1, int(w * scale)), max(1, int(h * scale))
+
+
+def decode_rgb(img: Image.Image, size: tuple, reducing_gap: Optional[float] = None) -> Image.Image:
+    """
+    Decode an opened image as RGB, at reduced scale when a reducing gap is given.
+
+    Args:
+        img (Image.Image): Opened or already decoded image.
+        size (tuple): Final size the image will be resized to.
+        reducing_gap (float, optional): Keep at least this multiple of size when drafting.
+
+    Returns:
+        Image.Image: RGB image (the same object if it already was RGB).
+    """
+    with timed("decode"):
+        if reducing_gap is not None:
+            # Let the JPEG decoder skip DCT detail we would throw away anyway (no-op once decoded)
+            img.draft(None, (int(size[0] * reducing_gap), int(size[1] * reducing_gap)))
+        img.load()
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+    return img
+
+
+def save_image(img: Image.Image, out_path: Path, fmt: str, quality: int = JPEG_QUALITY,
+               writer=None, root: Optional[Path] = None):
+    """
+    Save an RGB image in one of OUTPUT_FORMATS.
+
+    Args:
+        img (Image.Image): Image to save.
+        out_path (Path): Destination file.
+        fmt (str): Output format.
+        quality (int): Encoder quality, used by lossy formats only.
+        writer (OutputWriter, optional): Hand the encoded bytes to this writer stage instead
+            of writing them in the calling thread.
+        root (Path, optional): Output folder, naming archive members when the writer packs outputs.
+
+    Returns:
+        Optional[tuple]: With a writer, its submit() result: the archive member name (or None)
+            and the Future of the write.
+    """
+    # Encoding to memory first keeps CPU time (encode) and disk time (write) apart
+    with timed("encode"):
+        buf = io.BytesIO()
+        if fmt == "PNG":
+            img.save(buf, format=fmt)
+        else:
+            img.save(buf, format=fmt, quality=quality)
+    data = buf.getbuffer()
+    add_bytes(written=len(data))
+    if writer is not None:
+        return writer.submit(out_path, data, root)
+    with timed("write"):
+        write_atomic(out_path, data)
+
+
+def temp_path(path: Path) -> Path:
+    """
+    Hidden temporary name next to path, unique per process and thread.
+    """
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def write_atomic(out_path: Path, data):
+    """
+    Write a file through a temporary file and a rename.
+
+    The data is fsync'd before the rename, so after a crash the output is either complete
+    or absent, never a truncated file that looks finished.
+
+    Args:
+        out_path (Path): Destination file.
+        data (bytes-like): File contents.
+    """
+    tmp = temp_path(out_path)
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, out_path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
@@ -0,0 +1,208 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from PIL import Image
+from .metrics import timed
+from .scheduler import estimate_footprint
+from .source import SourcePool, open_image
+from .processor import (JPEG_QUALITY, OUTPUT_FORMATS, check_format, target_size, decode_rgb, save_image,
+                        output_path)
+
+
+class RenditionSpec:
+    """
+    Description of one output rendition: its name, target size, format and quality.
+
+    The size is given either as a scale factor of the source or as a maximum dimension
+    (the longest side is fitted into it, keeping the aspect ratio; smaller images are not enlarged).
+
+    Attributes:
+        name (str): Rendition name, used as the output file suffix and in the report.
+        scale (Optional[float]): Resize factor, if the size is relative.
+        max_size (Optional[int]): Maximum width/height in pixels, if the size is absolute.
+        format (str): Output format, one of OUTPUT_FORMATS.
+        quality (int): Encoder quality for lossy formats.
+    """
+
+    def __init__(self, name: str, scale: Optional[float] = None, max_size: Optional[int] = None,
+                 format: str = "JPEG", quality: int = JPEG_QUALITY):
+        """
+        Initialize the specification.
+
+        Args:
+            name (str): Rendition name.
+            scale (float, optional): Resize factor. Exactly one of scale and max_size must be given.
+            max_size (int, optional): Maximum width/height in pixels.
+            format (str): Output format ("JPEG", "PNG" or "WEBP"). Defaults to "JPEG".
+            quality (int): Encoder quality. Defaults to 85.
+
+        Raises:
+            ValueError: If the size or format is invalid.
+        """
+        if (scale is None) == (max_size is None):
+            raise ValueError(f"Rendition '{name}' needs exactly one of scale or max_size")
+        if (scale is not None and scale <= 0) or (max_size is not None and max_size < 1):
+            raise ValueError(f"Rendition '{name}' has an invalid size")
+        self.name = name
+        self.scale = scale
+        self.max_size = max_size
+        self.format = check_format(format)
+        self.quality = quality
+
+    @classmethod
+    def parse(cls, text: str) -> "RenditionSpec":
+        """
+        Parse a specification of the form NAME:SIZE[:FORMAT[:QUALITY]].
+
+        SIZE is a scale factor ("0.5") or a maximum dimension in pixels ("256px").
+        Example: "thumb:256px:webp:80".
+
+        Args:
+            text (str): Specification string (e.g. from the command line).
+
+        Returns:
+            RenditionSpec: Parsed specification.
+
+        Raises:
+            ValueError: If the string is malformed.
+        """
+        parts = text.split(":")
+        if len(parts) < 2 or len(parts) > 4 or not parts[0]:
+            raise ValueError(f"Invalid rendition '{text}', expected NAME:SIZE[:FORMAT[:QUALITY]]")
+        name, size = parts[0], parts[1].lower()
+        fmt = parts[2] if len(parts) > 2 else "JPEG"
+        quality = int(parts[3]) if len(parts) > 3 else JPEG_QUALITY
+        if size.endswith("px"):
+            return cls(name, max_size=int(size[:-2]), format=fmt, quality=quality)
+        return cls(name, scale=float(size), format=fmt, quality=quality)
+
+    def target_size(self, size: tuple) -> tuple:
+        """
+        Compute the output size for a source of the given size.
+        """
+        if self.scale is not None:
+            return target_size(size, self.scale)
+        return target_size(size, min(1.0, self.max_size / max(size)))
+
+    def config(self) -> Dict[str, Any]:
+        """
+        Parameters that determine the output of this rendition.
+        """
+        return {"name": self.name, "scale": self.scale, "max_size": self.max_size,
+                "format": self.format, "quality": self.quality}
+
+
+class RenditionStep:
+    """
+    Processing step that produces several renditions of each image from a single decode.
+
+    The source is decoded once (at reduced scale if `reducing_gap` allows it), then the
+    renditions are produced from the largest to the smallest, each derived from the previous,
+    larger intermediate instead of from the full-size source. The result holds one entry per
+    rendition under "renditions"; ImagePipeline turns them into one report row each.
+
+    Attributes:
+        out_folder (Path): Folder to save the renditions.
+        specs (List[RenditionSpec]): Renditions to produce.
+        reducing_gap (Optional[float]): Draft/reduce tolerance (see ResizeAndSaveStep).
+        input_root (Optional[Path]): Input folder; outputs mirror the subdirectories below it.
+        sources (Optional[SourcePool]): Pool of memory-mapped inputs the sources are read from.
+    """
+
+    uses_info = True
+    fields = ("rendition", "processed_path", "processed_width", "processed_height", "processed_format", "error")
+
+    def __init__(self, output_folder: str, specs: List[RenditionSpec], reducing_gap: Optional[float] = None,
+                 input_root: Optional[str] = None, sources: Optional[SourcePool] = None):
+        """
+        Initialize the step and create the output folder.
+
+        Args:
+            output_folder (str): Folder to save the renditions.
+            specs (List[RenditionSpec]): Renditions to produce (names must be unique).
+            reducing_gap (float, optional): Draft decoding / reducing resize tolerance.
+            input_root (str, optional): Input folder whose subdirectories are mirrored in the output folder.
+            sources (SourcePool, optional): Read the sources through this pool of mappings. Defaults to None.
+
+        Raises:
+            ValueError: If no renditions are given or names repeat.
+        """
+        names = [s.name for s in specs]
+        if not names or len(set(names)) != len(names):
+            raise ValueError("Renditions must be a non-empty list with unique names")
+        self.out_folder = Path(output_folder)
+        self.out_folder.mkdir(parents=True, exist_ok=True)
+        self.specs = list(specs)
+        self.reducing_gap = reducing_gap
+        self.input_root = Path(input_root) if input_root is not None else None
+        self.sources = sources
+
+    def config(self) -> Dict[str, Any]:
+        """
+        Parameters that determine the output of this step.
+        """
+        return {"step": type(self).__name__, "output_folder": str(self.out_folder),
+                "renditions": [s.config() for s in self.specs], "reducing_gap": self.reducing_gap,
+                "input_root": str(self.input_root) if self.input_root is not None else None}
+
+    def footprint(self, info: Dict[str, Any]) -> int:
+        """
+        Estimated peak memory for an image with the given validation record (the largest
+        rendition dominates, smaller ones are derived after it).
+        """
+        size = (info.get("width") or 0, info.get("height") or 0)
+        if not all(size):
+            return estimate_footprint(info)
+        largest = max((s.target_size(size) for s in self.specs), key=lambda t: t[0] * t[1])
+        return estimate_footprint(info, largest)
+
+    def __call__(self, path: Path, info: Optional[Dict[str, Any]] = None):
+        """
+        Produce all renditions of an image.
+
+        Args:
+            path (Path): Input image path.
+            info (dict, optional): Validation record; its decoded "image" is reused if present.
+
+        Returns:
+            dict: {"renditions": [...]} with one info dict per rendition, or an error message.
+        """
+        try:
+            frame = info.get("image") if info else None
+            if frame is not None:
+                return {"renditions": self._render(frame, path)}
+            with open_image(path, self.sources) as img:
+                return {"renditions": self._render(img, path)}
+        except Exception as e:
+            return {"error": str(e)}
+
+    def _render(self, img: Image.Image, path: Path) -> List[Dict[str, Any]]:
+        """
+        Resize and save every rendition, largest first.
+
+        Args:
+            img (Image.Image): Opened or already decoded source image.
+            path (Path): Original image path (used to name the outputs).
+
+        Returns:
+            List[dict]: Info about each rendition, in the order of the specs.
+        """
+        sized = sorted(((s.target_size(img.size), s) for s in self.specs),
+                       key=lambda t: t[0][0] * t[0][1], reverse=True)
+        # One decode, large enough for the biggest rendition
+        current = decode_rgb(img, sized[0][0], self.reducing_gap)
+        out = {}
+        for size, spec in sized:
+            if current.size != size:
+                with timed("resize"):
+                    current = current.resize(size, Image.LANCZOS, reducing_gap=self.reducing_gap)
+            out_path = output_path(self.out_folder, path, f"_{spec.name}{OUTPUT_FORMATS[spec.format]}",
+                                   self.input_root)
+            save_image(current, out_path, spec.format, spec.quality)
+            out[spec.name] = {
+                "rendition": spec.name,
+                "processed_path": str(out_path),
+                "processed_width": size[0],
+                "processed_height": size[1],
+                "processed_format": spec.format,
+            }
+        return [out[s.name] for s in self.specs]
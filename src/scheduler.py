@@ -0,0 +1,257 @@
+import math
+import os
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from PIL import Image
+
+# Suffixes accepted by parse_memory, as powers of 1024
+MEMORY_UNITS = {"": 0, "K": 1, "M": 2, "G": 3, "T": 4}
+
+# Bytes per pixel of a decoded Pillow image; multi-band modes (RGB included) use 4
+PIXEL_BYTES = {"1": 1, "L": 1, "P": 1, "I;16": 2, "I;16B": 2, "I;16L": 2}
+
+# Task ordering policies of ImageProcessor.run_parallel (see BucketQueue for the last two)
+SCHEDULES = ("fifo", "lpt", "buckets", "steal")
+
+
+def parse_memory(text: str) -> int:
+    """
+    Parse a memory size such as "512M", "2G" or "1.5GB" into bytes.
+
+    Args:
+        text (str): Size with an optional K/M/G/T suffix (binary units, optional trailing "B").
+
+    Returns:
+        int: Number of bytes.
+
+    Raises:
+        ValueError: If the string is malformed or not positive.
+    """
+    s = text.strip().upper()
+    if s.endswith("B"):
+        s = s[:-1]
+    unit = s[-1:] if s[-1:] in MEMORY_UNITS else ""
+    try:
+        value = float(s[:len(s) - len(unit)])
+    except ValueError:
+        raise ValueError(f"Invalid memory size '{text}', expected e.g. 512M or 2G") from None
+    if value <= 0:
+        raise ValueError(f"Memory size must be positive. Received: {text}")
+    return int(value * 1024 ** MEMORY_UNITS[unit])
+
+
+def image_info(path: Path) -> Dict[str, Any]:
+    """
+    Read the size and mode of an image from its header, without decoding the pixels.
+
+    Used to estimate the footprint of tasks that carry no validation record (deep verify).
+
+    Returns:
+        dict: "width", "height" and "mode", or an empty dict if the file cannot be opened.
+    """
+    try:
+        with Image.open(path) as img:
+            return {"width": img.width, "height": img.height, "mode": img.mode}
+    except Exception:
+        return {}
+
+
+def estimate_footprint(info: Dict[str, Any], target: Optional[tuple] = None) -> int:
+    """
+    Estimate the peak memory needed to resize one image, from its validation record.
+
+    Counts the decoded source, the RGB copy made when its mode differs, and the resized
+    RGB result (Pillow stores RGB with 4 bytes per pixel). Draft decoding can make the real figure
+    smaller, so this is an upper bound.
+
+    Args:
+        info (dict): Validation record (or image_info() result) with width, height and mode.
+        target (tuple, optional): Output size (width, height). Defaults to the source size.
+
+    Returns:
+        int: Estimated bytes, or 0 if the size is unknown.
+    """
+    width, height = info.get("width") or 0, info.get("height") or 0
+    mode = info.get("mode") or "RGB"
+    pixels = width * height
+    total = pixels * PIXEL_BYTES.get(mode, 4)
+    if mode != "RGB":
+        total += pixels * 4
+    tw, th = target if target is not None else (width, height)
+    return total + tw * th * 4
+
+
+class MemoryBudget:
+    """
+    Tracks the estimated memory of the images in flight against a limit.
+
+    A task is admitted while the total stays within the limit. A task larger than the whole
+    budget is still admitted once nothing else is running, so it cannot stall the run.
+
+    Attributes:
+        limit (Optional[int]): Budget in bytes; None means unlimited.
+        in_use (int): Estimated bytes of the admitted tasks.
+    """
+
+    def __init__(self, limit: Optional[int] = None):
+        """
+        Initialize the budget.
+
+        Args:
+            limit (int, optional): Budget in bytes. Defaults to None (unlimited).
+        """
+        self.limit = limit
+        self.in_use = 0
+
+    def fits(self, cost: int) -> bool:
+        """
+        Check whether a task of the given cost can be admitted now.
+        """
+        return self.limit is None or self.in_use == 0 or self.in_use + cost <= self.limit
+
+    def admit(self, cost: int):
+        """
+        Account for an admitted task.
+        """
+        self.in_use += cost
+
+    def release(self, cost: int):
+        """
+        Return the cost of a finished task to the budget.
+        """
+        self.in_use -= cost
+
+
+def task_cost(path: Path, info: Optional[Dict[str, Any]] = None) -> int:
+    """
+    Estimate the processing time of an image, in arbitrary units, to order the tasks.
+
+    Decoding and resizing take time proportional to the pixel count, read from the
+    validation record. Without one (deep verification validates inside the workers), the
+    file size stands in for it.
+
+    Returns:
+        int: Pixel count, else file size in bytes, else 0.
+    """
+    if info and info.get("width") and info.get("height"):
+        return info["width"] * info["height"]
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def interleave_chunks(tasks: List[tuple], chunksize: int) -> List[tuple]:
+    """
+    Reorder tasks sorted largest first so that consecutive slices of `chunksize` share the large ones.
+
+    Cutting a sorted list into contiguous chunks would put all the largest tasks in the
+    first chunk, on a single worker. Instead, the tasks are dealt round-robin to the chunks,
+    skipping the last one once it holds the remainder, so every chunk but the last still
+    has `chunksize` tasks. Each chunk stays sorted largest first, the chunks are in order
+    of their largest task, and their costs are about equal.
+
+    Returns:
+        List[tuple]: The tasks, in the order in which to slice them into chunks.
+    """
+    n_chunks = -(-len(tasks) // chunksize)
+    if n_chunks < 2:
+        return list(tasks)
+    capacity = [chunksize] * (n_chunks - 1) + [len(tasks) - (n_chunks - 1) * chunksize]
+    chunks = [[] for _ in range(n_chunks)]
+    i = 0
+    for task in tasks:
+        while len(chunks[i]) == capacity[i]:
+            i = (i + 1) % n_chunks
+        chunks[i].append(task)
+        i = (i + 1) % n_chunks
+    return [task for chunk in chunks for task in chunk]
+
+
+class BucketQueue:
+    """
+    Tasks split into size classes, each served by its own share of the workers.
+
+    Classes are equal-width on a logarithmic scale between the cheapest and the costliest
+    task (e.g. thumbnails, photos, scans), and empty ones are dropped. Each class gets at
+    least one worker; the others go, one at a time, to the class with the highest cost per
+    worker, so the classes would finish together if their tasks were divisible. Within a
+    class, tasks are taken largest first. Small images thus never queue behind huge ones.
+
+    With `steal`, a worker whose class has run out of tasks takes the largest task of the
+    class with the most remaining work instead of staying idle, so no worker idles while
+    tasks remain.
+
+    Attributes:
+        quotas (List[int]): Workers of each class.
+        running (List[int]): Tasks in flight on the workers of each class.
+        steals (int): Tasks taken from another class so far.
+    """
+
+    def __init__(self, tasks: List[tuple], costs: List[int], workers: int, buckets: int = 3, steal: bool = True):
+        """
+        Split the tasks into classes.
+
+        Args:
+            tasks (List[tuple]): Tasks, e.g. (path, info) pairs.
+            costs (List[int]): Estimated cost of each task (see task_cost).
+            workers (int): Workers shared by the classes.
+            buckets (int): Maximum number of classes. Defaults to 3.
+            steal (bool): Let idle workers take tasks from other classes. Defaults to True.
+        """
+        buckets = max(1, min(buckets, workers))
+        positive = [c for c in costs if c > 0]
+        low, high = (math.log(min(positive)), math.log(max(positive))) if positive else (0.0, 0.0)
+        classes = [[] for _ in range(buckets)]
+        for task, cost in zip(tasks, costs):
+            position = (math.log(cost) - low) / (high - low) if cost > 0 and high > low else 0.0
+            classes[min(buckets - 1, int(position * buckets))].append((cost, task))
+        classes = [sorted(c, key=lambda ct: ct[0], reverse=True) for c in classes if c]
+        self.queues = [deque(c) for c in classes]
+        self.remaining = [sum(cost for cost, _ in c) for c in classes]
+        self.quotas = [1] * len(classes)
+        for _ in range(workers - len(classes)):
+            # A class gets no more workers than it has tasks
+            open_classes = [b for b in range(len(classes)) if self.quotas[b] < len(classes[b])]
+            if not open_classes:
+                break
+            b = max(open_classes, key=lambda b: self.remaining[b] / self.quotas[b])
+            self.quotas[b] += 1
+        self.running = [0] * len(classes)
+        self.steal = steal
+        self.steals = 0
+
+    def __len__(self) -> int:
+        return sum(len(q) for q in self.queues)
+
+    def _pop(self, source: int, slot: int) -> Tuple[int, tuple]:
+        cost, task = self.queues[source].popleft()
+        self.remaining[source] -= cost
+        self.running[slot] += 1
+        return slot, task
+
+    def take(self) -> Optional[Tuple[int, tuple]]:
+        """
+        Take the next task for a free worker, if any.
+
+        Returns:
+            Optional[Tuple[int, tuple]]: The class of the worker running it (to pass to
+                release()) and the task, or None if no free worker has a task to run.
+        """
+        free = [b for b in range(len(self.queues)) if self.running[b] < self.quotas[b]]
+        for b in sorted(free, key=lambda b: self.remaining[b], reverse=True):
+            if self.queues[b]:
+                return self._pop(b, b)
+        if self.steal and free:
+            victims = [b for b in range(len(self.queues)) if self.queues[b]]
+            if victims:
+                self.steals += 1
+                return self._pop(max(victims, key=lambda b: self.remaining[b]), free[0])
+        return None
+
+    def release(self, slot: int):
+        """
+        Free the worker of a class once its task has completed.
+        """
+        self.running[slot] -= 1
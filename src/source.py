@@ -0,0 +1,243 @@
+import io
+import mmap
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+from PIL import Image, TiffImagePlugin
+
+
+class MappedReader(io.RawIOBase):
+    """
+    Seekable read-only file object over a memory-mapped source.
+
+    Each reader has its own position over the shared mapping, so several threads can read
+    the same file at once. readinto() copies straight from the mapping into the caller's
+    buffer: no read() system call and no intermediate buffer.
+    """
+
+    def __init__(self, view: memoryview):
+        super().__init__()
+        self._view = view
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = min(len(b), len(self._view) - self._pos)
+        if n <= 0:
+            return 0
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def read(self, size: int = -1) -> bytes:
+        # Faster than the RawIOBase default, which goes through a temporary bytearray
+        end = len(self._view) if size is None or size < 0 else min(self._pos + size, len(self._view))
+        data = self._view[self._pos:end].tobytes()
+        self._pos = max(self._pos, end)
+        return data
+
+    def readall(self) -> bytes:
+        return self.read()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self._pos = offset
+        return offset
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self):
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        super().close()
+
+
+class _Mapping:
+    """
+    One mapped file and the number of readers and views using it.
+    """
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+        self.users = 0
+
+    def close(self):
+        self.view.release()
+        self.map.close()
+
+
+class SourcePool:
+    """
+    Memory-maps input files once and shares the mapping between the validator, the processing
+    steps and hashing, instead of each of them reading the file through its own buffered reads.
+
+    Mappings are kept in least-recently-used order and at most `max_open` are open at a time:
+    unused mappings are unmapped to make room. When all `max_open` are in use, the file is
+    read normally rather than waiting, so the limit never stalls a worker. Empty files and
+    files that cannot be mapped are read normally as well.
+
+    The mappings are per process: a pickled pool (e.g. inside a step sent to a worker
+    process) starts empty.
+
+    Attributes:
+        max_open (int): Maximum number of files mapped at once.
+    """
+
+    def __init__(self, max_open: int = 64):
+        """
+        Initialize an empty pool.
+
+        Args:
+            max_open (int): Maximum number of files mapped at once. Defaults to 64.
+        """
+        self.max_open = max_open
+        self._init_state()
+
+    def _init_state(self):
+        self._lock = threading.Lock()
+        self._maps: "OrderedDict[str, _Mapping]" = OrderedDict()
+
+    def __getstate__(self):
+        return {"max_open": self.max_open}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_state()
+
+    def _acquire(self, path: Path) -> Optional[_Mapping]:
+        """
+        Get the mapping of a file, mapping it if needed. Returns None if it cannot be mapped now.
+        """
+        key = str(path)
+        with self._lock:
+            m = self._maps.get(key)
+            if m is None:
+                self._evict(room=1)
+                if len(self._maps) >= self.max_open:
+                    return None
+                try:
+                    m = _Mapping(path)
+                except (OSError, ValueError):  # empty file, pipe, ...
+                    return None
+                self._maps[key] = m
+            self._maps.move_to_end(key)
+            m.users += 1
+            return m
+
+    def _release(self, m: _Mapping):
+        with self._lock:
+            m.users -= 1
+            self._evict()
+
+    def _evict(self, room: int = 0):
+        """
+        Unmap the least recently used unused mappings until `room` more fit under the limit
+        (called with the lock held).
+        """
+        excess = len(self._maps) + room - self.max_open
+        for key in [k for k, m in self._maps.items() if m.users == 0][:max(0, excess)]:
+            self._maps.pop(key).close()
+
+    @contextmanager
+    def open(self, path: Path) -> Iterator[io.RawIOBase]:
+        """
+        Open a source as a seekable binary file object, backed by its shared mapping.
+
+        Args:
+            path (Path): Source file.
+
+        Yields:
+            A MappedReader, or a regular file if the source is not mapped.
+        """
+        m = self._acquire(path)
+        if m is None:
+            with open(path, "rb") as f:
+                yield f
+            return
+        reader = MappedReader(m.view[:])
+        try:
+            yield reader
+        finally:
+            reader.close()
+            self._release(m)
+
+    @contextmanager
+    def view(self, path: Path) -> Iterator[memoryview]:
+        """
+        Expose the bytes of a source as a read-only memoryview, without copying them.
+
+        The view is only valid inside the with block.
+
+        Args:
+            path (Path): Source file.
+
+        Yields:
+            memoryview: The file contents.
+        """
+        m = self._acquire(path)
+        if m is None:
+            with open(path, "rb") as f:
+                data = memoryview(f.read())
+            yield data
+            return
+        view = m.view[:]
+        try:
+            yield view
+        finally:
+            view.release()
+            self._release(m)
+
+    def close(self):
+        """
+        Unmap all files that are not in use.
+        """
+        with self._lock:
+            for key in [k for k, m in self._maps.items() if m.users == 0]:
+                self._maps.pop(key).close()
+
+
+@contextmanager
+def open_image(path: Path, sources: Optional[SourcePool] = None, huge_tiffs: bool = False) -> Iterator[Image.Image]:
+    """
+    Open an image from its shared mapping if a SourcePool is given, or from its path otherwise.
+
+    Args:
+        path (Path): Image file.
+        sources (SourcePool, optional): Pool of mapped inputs.
+        huge_tiffs (bool): Open TIFFs without Pillow's decompression bomb check, for callers
+            that never decode them whole (see TiledResizeStep). Defaults to False.
+
+    Yields:
+        Image.Image: The opened (lazily decoded) image.
+    """
+    if huge_tiffs:
+        with (sources.open(path) if sources is not None else open(path, "rb")) as fp:
+            is_tiff = fp.read(4) in (b"II*\x00", b"MM\x00*")
+            fp.seek(0)
+            # TiffImageFile, unlike Image.open, does not check the pixel count
+            with (TiffImagePlugin.TiffImageFile(fp) if is_tiff else Image.open(fp)) as img:
+                yield img
+        return
+    if sources is None:
+        with Image.open(path) as img:
+            yield img
+        return
+    with sources.open(path) as fp:
+        with Image.open(fp) as img:
+            yield img
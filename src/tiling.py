@@ -0,0 +1,401 @@
+import io
+import math
+import os
+import struct
+import zlib
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+from PIL import Image, TiffImagePlugin, TiffTags
+from .executor import make_executor
+from .metrics import timed, add_bytes
+from .processor import target_size, output_path, temp_path
+from .scheduler import estimate_footprint
+
+# TIFF tags copied into the small per-band files decoded by TiffReader
+DECODE_TAGS = (256, 258, 259, 262, 266, 277, 284, 317, 320, 322, 323, 338, 339, 347, 529, 530, 532)
+
+# Extensions handled by the tiled path
+TIFF_EXTS = (".tif", ".tiff")
+
+# Support of the LANCZOS filter in source pixels (scaled by the downscale factor)
+LANCZOS_SUPPORT = 3
+
+
+class TiffReader:
+    """
+    Reads horizontal bands of rows from a strip- or tile-organised TIFF without decoding the rest.
+
+    Only the strips (or rows of tiles) covering a band are read from disk. They are copied
+    into a small standalone TIFF in memory, which Pillow decodes with the original compression,
+    predictor and colour settings. Memory is therefore proportional to the band, not the image.
+    Only the first page is read.
+
+    Attributes:
+        path (Path): TIFF file.
+        size (tuple): Image size (width, height).
+        mode (str): Pillow mode of the image.
+        supported (bool): False if the layout can't be read in bands (separate colour planes,
+            old-style JPEG compression) or the image is flipped or rotated by its orientation
+            tag; such files must be decoded whole.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Parse the TIFF header and the strip or tile layout.
+
+        The header is read through TiffImageFile directly, which skips Pillow's
+        decompression-bomb check: no more than a band is ever decoded.
+
+        Args:
+            path (Path): TIFF file.
+        """
+        self.path = Path(path)
+        with TiffImagePlugin.TiffImageFile(str(self.path)) as img:
+            tags = img.tag_v2
+            # Stored size: Pillow swaps img.size for the EXIF orientations that transpose the image
+            self.size = (tags[256], tags[257])
+            self.mode = img.mode
+            self._prefix = tags.prefix
+            self._tags = {t: (tags[t], tags.tagtype.get(t)) for t in DECODE_TAGS if t in tags}
+            self.tiled = 322 in tags
+            width, height = self.size
+            if self.tiled:
+                self.unit = tags[323]
+                self.across = -(-width // tags[322])
+                self._offsets, self._counts = tags.get(324, ()), tags.get(325, ())
+            else:
+                self.unit = min(tags.get(278, height), height)
+                self.across = 1
+                self._offsets, self._counts = tags.get(273, ()), tags.get(279, ())
+            self.supported = (tags.get(284, 1) == 1 and tags.get(259, 1) != 6 and tags.get(274, 1) == 1
+                              and len(self._offsets) > 0 and len(self._offsets) == len(self._counts))
+
+    def read_rows(self, top: int, bottom: int) -> Image.Image:
+        """
+        Decode rows [top, bottom) of the image.
+
+        Args:
+            top (int): First row.
+            bottom (int): Row after the last one.
+
+        Returns:
+            Image.Image: Decoded band, full width, in the mode of the image.
+        """
+        width, height = self.size
+        first, last = top // self.unit, -(-bottom // self.unit)
+        chunks = []
+        with open(self.path, "rb") as f:
+            for i in range(first * self.across, last * self.across):
+                f.seek(self._offsets[i])
+                chunks.append(f.read(self._counts[i]))
+        add_bytes(read=sum(len(c) for c in chunks))
+        rows = min(last * self.unit, height) - first * self.unit
+        with Image.open(io.BytesIO(self._band_file(rows, chunks))) as band:
+            band.load()
+            start = top - first * self.unit
+            return band.crop((0, start, width, start + bottom - top))
+
+    def _band_file(self, rows: int, chunks: list) -> bytes:
+        """
+        Build a standalone TIFF holding the given strips or tiles.
+        """
+        ifh = self._prefix + (b"\x2a\x00" if self._prefix == b"II" else b"\x00\x2a") + b"\x00" * 4
+        ifd = TiffImagePlugin.ImageFileDirectory_v2(ifh=ifh)
+        for tag, (value, tagtype) in self._tags.items():
+            ifd[tag] = value
+            if tagtype is not None:
+                ifd.tagtype[tag] = tagtype
+        ifd[257] = rows
+        offsets_tag, counts_tag = (324, 325) if self.tiled else (273, 279)
+        if not self.tiled:
+            ifd[278] = self.unit
+        ifd[counts_tag] = tuple(len(c) for c in chunks)
+        ifd[offsets_tag] = (0,) * len(chunks)
+        for tag in (offsets_tag, counts_tag, 257, 278):
+            if tag in ifd:
+                ifd.tagtype[tag] = TiffTags.LONG
+        # Pillow writes StripOffsets relative to the end of the directory; TileOffsets are
+        # absolute, so lay the directory out once with placeholders to find where data starts
+        position = 0 if offsets_tag == 273 else 8 + len(ifd.tobytes(8))
+        offsets = []
+        for c in chunks:
+            offsets.append(position)
+            position += len(c)
+        ifd[offsets_tag] = tuple(offsets)
+        endian = "<" if self._prefix == b"II" else ">"
+        return ifh[:4] + struct.pack(endian + "L", 8) + ifd.tobytes(8) + b"".join(chunks)
+
+
+def plan_bands(src_height: int, out_height: int, band_rows: int) -> Iterator[tuple]:
+    """
+    Split the output rows into bands and compute the source rows each band needs.
+
+    Each band reads a margin of source rows beyond its own area so the resampling filter
+    sees the same neighbours at the seams as a resize of the whole image.
+
+    Args:
+        src_height (int): Source image height.
+        out_height (int): Output image height.
+        band_rows (int): Approximate number of source rows per band.
+
+    Yields:
+        tuple: (out_top, out_bottom, src_top, src_bottom) for each band, top to bottom.
+    """
+    ratio = src_height / out_height
+    margin = math.ceil(LANCZOS_SUPPORT * max(1.0, ratio)) + 1
+    step = max(1, int(band_rows / ratio))
+    for out_top in range(0, out_height, step):
+        out_bottom = min(out_height, out_top + step)
+        src_top = max(0, math.floor(out_top * ratio) - margin)
+        src_bottom = min(src_height, math.ceil(out_bottom * ratio) + margin)
+        yield out_top, out_bottom, src_top, src_bottom
+
+
+def resample_band(reader: TiffReader, out_size: tuple, band: tuple) -> bytes:
+    """
+    Decode the source rows of one band and resample them into its output rows.
+
+    Args:
+        reader (TiffReader): Source image.
+        out_size (tuple): Size of the whole output image.
+        band (tuple): Band from plan_bands().
+
+    Returns:
+        bytes: RGB pixels of the output rows of the band.
+    """
+    out_top, out_bottom, src_top, src_bottom = band
+    width, height = reader.size
+    ratio = height / out_size[1]
+    with timed("decode"):
+        img = reader.read_rows(src_top, src_bottom)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+    # The box places the band within the source, so filter weights match the full-image resize
+    box = (0, out_top * ratio - src_top, width, out_bottom * ratio - src_top)
+    with timed("resize"):
+        out = img.resize((out_size[0], out_bottom - out_top), Image.LANCZOS, box=box)
+    return out.tobytes()
+
+
+class PNGWriter:
+    """
+    Writes an RGB PNG progressively, a band of rows at a time.
+
+    Rows go to a temporary file that only takes the final name once close() has written
+    the end of the image, so an interrupted write never leaves a truncated PNG behind.
+
+    Attributes:
+        path (Path): Output file.
+        bytes_written (int): Bytes written so far.
+    """
+
+    def __init__(self, path: Path, width: int, height: int, level: int = 6):
+        """
+        Create the file and write the PNG header.
+
+        Args:
+            path (Path): Output file.
+            width (int): Image width.
+            height (int): Image height.
+            level (int): zlib compression level. Defaults to 6.
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp = temp_path(self.path)
+        self._f = open(self._tmp, "wb")
+        self._z = zlib.compressobj(level)
+        self._row_bytes = width * 3
+        self.bytes_written = 0
+        self._write(b"\x89PNG\r\n\x1a\n")
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def write_rows(self, data: bytes):
+        """
+        Append rows of RGB pixels.
+        """
+        rb = self._row_bytes
+        # Every row starts with its filter type (0: none)
+        rows = b"".join(b"\x00" + data[i:i + rb] for i in range(0, len(data), rb))
+        compressed = self._z.compress(rows)
+        if compressed:
+            self._chunk(b"IDAT", compressed)
+
+    def close(self):
+        """
+        Flush the compressed data, finish the file and move it to its final name.
+        """
+        self._chunk(b"IDAT", self._z.flush())
+        self._chunk(b"IEND", b"")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._f.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self):
+        """
+        Discard an unfinished file.
+        """
+        self._f.close()
+        self._tmp.unlink(missing_ok=True)
+
+    def _chunk(self, kind: bytes, data: bytes):
+        self._write(struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data)))
+
+    def _write(self, data: bytes):
+        self._f.write(data)
+        self.bytes_written += len(data)
+
+
+class TiledResizeStep:
+    """
+    Resize step for huge TIFFs that never holds the whole image in memory.
+
+    Large TIFFs are read band by band (see TiffReader), each band is resampled with a
+    margin around it so the seams match a whole-image LANCZOS resize, and the output is
+    written progressively as a PNG. The bands of one image are spread over `band_workers`
+    threads (decoding and resampling release the GIL) and written in order. Peak memory is
+    about `band_workers` x 2 bands of full-width source rows.
+
+    Smaller images, other formats, TIFF layouts that can't be read in bands, and frames
+    already decoded by a deep verify go through the wrapped `fallback` step.
+
+    Attributes:
+        out_folder (Path): Folder to save processed images.
+        scale (float): Resize factor.
+        min_pixels (int): Images with at least this many pixels take the tiled path.
+        band_rows (int): Approximate number of source rows decoded per band.
+        band_workers (int): Threads processing the bands of one image.
+        fallback (Callable): Step used for all other images (e.g. ResizeAndSaveStep).
+        input_root (Optional[Path]): Input folder; outputs mirror the subdirectories below it.
+    """
+
+    uses_info = True
+
+    def __init__(self, output_folder: str, scale: float, min_pixels: int, fallback, band_rows: int = 256,
+                 band_workers: int = 1, input_root: Optional[str] = None):
+        """
+        Initialize the step and create the output folder.
+
+        Args:
+            output_folder (str): Folder to save processed images.
+            scale (float): Resize factor (0.5 = 50%).
+            min_pixels (int): Pixel count from which TIFFs are processed in bands.
+            fallback (Callable): Step handling every other image.
+            band_rows (int): Approximate number of source rows per band. Defaults to 256.
+            band_workers (int): Threads processing the bands of one image. Defaults to 1.
+            input_root (str, optional): Input folder whose subdirectories are mirrored in the output folder.
+        """
+        self.out_folder = Path(output_folder)
+        self.out_folder.mkdir(parents=True, exist_ok=True)
+        self.scale = scale
+        self.min_pixels = min_pixels
+        self.fallback = fallback
+        self.band_rows = band_rows
+        self.band_workers = band_workers
+        self.input_root = Path(input_root) if input_root is not None else None
+
+    @property
+    def fields(self):
+        """
+        Report columns: those of the fallback step.
+        """
+        return getattr(self.fallback, "fields", ())
+
+    def config(self) -> Dict[str, Any]:
+        """
+        Parameters that determine the output of this step.
+        """
+        fallback = self.fallback.config() if hasattr(self.fallback, "config") else type(self.fallback).__name__
+        return {"step": type(self).__name__, "output_folder": str(self.out_folder), "scale": self.scale,
+                "min_pixels": self.min_pixels, "fallback": fallback,
+                "input_root": str(self.input_root) if self.input_root is not None else None}
+
+    def close(self):
+        """
+        Release the resources of the fallback step.
+        """
+        if hasattr(self.fallback, "close"):
+            self.fallback.close()
+
+    def footprint(self, info: Dict[str, Any]) -> int:
+        """
+        Estimated peak memory for an image with the given validation record.
+        """
+        if not self._tiled(info):
+            return self.fallback.footprint(info) if hasattr(self.fallback, "footprint") else estimate_footprint(info)
+        band = dict(info, height=min(info["height"], self.band_rows + 2 * LANCZOS_SUPPORT))
+        return estimate_footprint(band) * self.band_workers * 2
+
+    def _tiled(self, info: Optional[Dict[str, Any]], path: Optional[Path] = None) -> bool:
+        """
+        Whether an image takes the tiled path, judging from its validation record.
+        """
+        if not info or info.get("image") is not None:
+            return False
+        if path is not None and path.suffix.lower() not in TIFF_EXTS:
+            return False
+        if info.get("format") not in (None, "TIFF"):
+            return False
+        return (info.get("width") or 0) * (info.get("height") or 0) >= self.min_pixels
+
+    def __call__(self, path: Path, info: Optional[Dict[str, Any]] = None):
+        """
+        Resize the image in bands if it is a large TIFF, otherwise with the fallback step.
+
+        Args:
+            path (Path): Input image path.
+            info (dict, optional): Validation record of the image.
+
+        Returns:
+            dict: Info about the processed image or error message.
+        """
+        path = Path(path)
+        if not self._tiled(info, path):
+            return self.fallback(path, info)
+        try:
+            reader = TiffReader(path)
+            if not reader.supported:
+                return self.fallback(path, info)
+            return self._resize_tiled(reader, path)
+        except Exception as e:
+            return {"error": str(e)}
+
+    def _resize_tiled(self, reader: TiffReader, path: Path):
+        """
+        Resample all bands of an image and write them to a PNG in order.
+
+        Args:
+            reader (TiffReader): Source image.
+            path (Path): Original image path (used to name the output).
+
+        Returns:
+            dict: Info about the processed image.
+        """
+        out_size = target_size(reader.size, self.scale)
+        out_path = output_path(self.out_folder, path, "_processed.png", self.input_root)
+        writer = PNGWriter(out_path, *out_size)
+        try:
+            kind = "threads" if self.band_workers > 1 else "serial"
+            with make_executor(kind, self.band_workers) as ex:
+                # Bands are submitted in order and written in order; at most
+                # band_workers of them wait ahead of the writer
+                window = deque()
+                for band in plan_bands(reader.size[1], out_size[1], self.band_rows):
+                    window.append(ex.submit(resample_band, reader, out_size, band))
+                    if len(window) > self.band_workers:
+                        with timed("write"):
+                            writer.write_rows(window.popleft().result())
+                while window:
+                    with timed("write"):
+                        writer.write_rows(window.popleft().result())
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+        add_bytes(written=writer.bytes_written)
+        return {
+            "processed_path": str(out_path),
+            "processed_width": out_size[0],
+            "processed_height": out_size[1],
+        }
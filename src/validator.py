@@ -1,27 +1,83 @@
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from PIL import Image, UnidentifiedImageError
+from .probe import ProbeError, probe
+from .source import SourcePool, open_image
+
+# EXIF tag holding the camera orientation (1-8)
+ORIENTATION_TAG = 0x0112
+
+# Supported validation depths, from cheapest to most thorough
+VERIFY_MODES = ("header", "probe", "verify", "deep")
+
+# Keys of the record returned by ImageValidator.validate (report columns)
+RECORD_FIELDS = ("path", "ok", "error", "width", "height", "format", "mode", "orientation")
+
+
+def read_orientation(img: Image.Image) -> Optional[int]:
+    """
+    Read the EXIF orientation of an opened image without decoding its pixels.
+
+    Args:
+        img (Image.Image): Freshly opened (not yet loaded) image.
+
+    Returns:
+        Optional[int]: Orientation value (1-8), or None if the image carries no EXIF data.
+    """
+    # Only formats that expose EXIF in the header are parsed, so this never triggers a decode
+    if "exif" not in img.info and img.format != "TIFF":
+        return None
+    try:
+        return img.getexif().get(ORIENTATION_TAG)
+    except Exception:
+        return None
+
 
 class ImageValidator:
     """
     ImageValidator is responsible for checking if an image meets the minimum size requirements 
     and whether it is a valid image file.
 
+    Each file is opened exactly once. How much of it is read depends on `verify_mode`:
+        - "header": only the header is parsed (size, format, mode, orientation).
+        - "probe": the header and the end of the file are read without Pillow (see
+          `probe.probe`), which also catches truncated files; Pillow is used only for formats
+          the probe does not parse and for files whose end marker is missing.
+        - "verify": the header is parsed and the file structure is checked with `verify()`.
+        - "deep": the whole frame is decoded and returned under the "image" key so the
+          processing steps can reuse it instead of decoding the file again.
+
     Attributes:
         min_width (int): Minimum allowed width of an image.
         min_height (int): Minimum allowed height of an image.
+        verify_mode (str): One of VERIFY_MODES.
+        sources (Optional[SourcePool]): Pool of memory-mapped inputs shared with the processing steps.
+        huge_tiffs (bool): Accept TIFFs above Pillow's decompression bomb limit, for steps that
+            never decode them whole (see TiledResizeStep).
     """
 
-    def __init__(self, min_width: int = 2, min_height: int = 2):
+    def __init__(self, min_width: int = 2, min_height: int = 2, verify_mode: str = "verify",
+                 sources: Optional[SourcePool] = None, huge_tiffs: bool = False):
         """
         Initialize the ImageValidator with minimum width and height.
 
         Args:
             min_width (int): Minimum width of the image. Defaults to 2.
             min_height (int): Minimum height of the image. Defaults to 2.
+            verify_mode (str): Validation depth ("header", "probe", "verify" or "deep"). Defaults to "verify".
+            sources (SourcePool, optional): Read the files through this pool of mappings. Defaults to None.
+            huge_tiffs (bool): Accept TIFFs above Pillow's decompression bomb limit. Defaults to False.
+
+        Raises:
+            ValueError: If verify_mode is not one of VERIFY_MODES.
         """
+        if verify_mode not in VERIFY_MODES:
+            raise ValueError(f"Unknown verify mode '{verify_mode}', expected one of {VERIFY_MODES}")
         self.min_width = min_width
         self.min_height = min_height
+        self.verify_mode = verify_mode
+        self.sources = sources
+        self.huge_tiffs = huge_tiffs
 
     def validate(self, path: Path) -> Dict[str, Any]:
         """
@@ -40,6 +96,9 @@ class ImageValidator:
                 - "width": Width of the image if valid.
                 - "height": Height of the image if valid.
                 - "format": Image format if valid.
+                - "mode": Pixel mode (e.g. "RGB", "L") if valid.
+                - "orientation": EXIF orientation if valid and present.
+                - "image": Decoded frame, only in "deep" mode for valid images.
         """
         result = {
             "path": str(path),
@@ -48,25 +107,70 @@ class ImageValidator:
             "width": None,
             "height": None,
             "format": None,
+            "mode": None,
+            "orientation": None,
         }
         try:
-            # Open image to verify it is not corrupted
-            with Image.open(path) as img:
-                img.verify()
-            # Open again to get size and format
-            with Image.open(path) as img:
-                width, height = img.size
-                fmt = img.format
+            if self.verify_mode == "probe":
+                info = self._probe(path)
+            else:
+                info = self._read(path, self.verify_mode)
+            width, height = info["width"], info["height"]
             # Check if image meets minimum size
             if width < self.min_width or height < self.min_height:
                 result["error"] = f"Too small ({width}x{height})"
             else:
                 result["ok"] = True
-                result["width"] = width
-                result["height"] = height
-                result["format"] = fmt
+                for key in ("width", "height", "format", "mode", "orientation", "image"):
+                    if key in info:
+                        result[key] = info[key]
         except UnidentifiedImageError:
             result["error"] = "Unidentified image / not an image"
         except Exception as e:
             result["error"] = f"Exception: {e}"
         return result
+
+    def _read(self, path: Path, depth: str) -> Dict[str, Any]:
+        """
+        Open the image with Pillow, once, and check it to the given depth.
+
+        Args:
+            path (Path): Path to the image file.
+            depth (str): "header", "verify" or "deep".
+
+        Returns:
+            Dict[str, Any]: "width", "height", "format", "mode" and "orientation", plus the
+                decoded frame under "image" in "deep" mode.
+        """
+        # Open once: size, format and mode are known as soon as the header is parsed
+        with open_image(path, self.sources, self.huge_tiffs) as img:
+            width, height = img.size
+            info = {"width": width, "height": height, "format": img.format, "mode": img.mode,
+                    "orientation": read_orientation(img)}
+            if depth == "verify":
+                # Check the file is not corrupted (the image is unusable afterwards)
+                img.verify()
+            elif depth == "deep":
+                # Full decode; the pixel data stays valid after the file is closed
+                img.load()
+                info["image"] = img
+        return info
+
+    def _probe(self, path: Path) -> Dict[str, Any]:
+        """
+        Read the image header without Pillow, falling back to Pillow when the probe cannot decide.
+
+        Raises:
+            ProbeError: If the header is malformed or the file is truncated.
+        """
+        with (self.sources.open(path) if self.sources is not None else open(path, "rb", buffering=0)) as f:
+            info = probe(f, self.huge_tiffs)
+        if info is None:
+            return self._read(path, "verify")
+        if info["complete"] is None:
+            # No end marker in the last bytes: only decoding tells trailing data from a cut file
+            info = self._read(path, "deep")
+            del info["image"]
+        elif not info["complete"]:
+            raise ProbeError("Truncated file")
+        return info
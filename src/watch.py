@@ -0,0 +1,266 @@
+import abc
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# inotify event flags (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+# Header of a struct inotify_event: wd, mask, cookie, len (the name follows)
+_EVENT = struct.Struct("iIII")
+
+
+def _walk(folder: Path, recursive: bool) -> Iterator[os.DirEntry]:
+    """
+    Yield the regular files of a folder (and of its subdirectories if recursive).
+    """
+    try:
+        with os.scandir(folder) as it:
+            entries = list(it)
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_file():
+            yield entry
+        elif recursive and entry.is_dir(follow_symlinks=False):
+            yield from _walk(Path(entry.path), recursive)
+
+
+class Watcher(abc.ABC):
+    """
+    Base class of the sources of file-system changes used by ImagePipeline.watch.
+
+    Attributes:
+        folder (Path): Watched folder.
+        recursive (bool): Whether subdirectories are watched too.
+        quiet (float): Seconds a file must go without being reported again before it can be
+            taken as complete, on top of the debounce of iter_batches.
+    """
+
+    quiet = 0.0
+
+    def __init__(self, folder, recursive: bool = False):
+        self.folder = Path(folder)
+        self.recursive = recursive
+
+    @abc.abstractmethod
+    def changes(self, timeout: float) -> List[Path]:
+        """
+        Wait at most `timeout` seconds for files to be created or modified.
+
+        Returns:
+            List[Path]: Files created or modified since the previous call (possibly empty).
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Release the resources of the watcher.
+        """
+
+
+class InotifyWatcher(Watcher):
+    """
+    Watcher receiving the changes from the Linux kernel through inotify (called with ctypes).
+
+    A file is reported when it is closed after writing or moved into the folder, so files
+    still being copied are not picked up. If the kernel queue overflows, the whole folder is
+    reported again. inotify does not see changes made by other hosts on network file systems;
+    use PollingWatcher there.
+    """
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self, folder, recursive: bool = False):
+        """
+        Start watching a folder.
+
+        Raises:
+            OSError: If inotify is not available (not Linux, or the watch limit is reached).
+        """
+        super().__init__(folder, recursive)
+        name = ctypes.util.find_library("c")
+        self._libc = ctypes.CDLL(name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available on this system")
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: Dict[int, Path] = {}  # watch descriptor -> directory
+        try:
+            self._add(self.folder)
+            if recursive:
+                for root, dirs, _ in os.walk(self.folder):
+                    for d in dirs:
+                        self._add(Path(root) / d)
+        except OSError:
+            self.close()
+            raise
+
+    def _add(self, directory: Path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"Cannot watch {directory}: {os.strerror(errno)}")
+        self._dirs[wd] = directory
+
+    def changes(self, timeout: float) -> List[Path]:
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        found = []
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, pos)
+            name = os.fsdecode(data[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b"\0"))
+            pos += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped: report every file (an incremental pipeline reuses the unchanged ones)
+                found.extend(Path(e.path) for e in _walk(self.folder, self.recursive))
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / name
+            if mask & IN_ISDIR:
+                if self.recursive and mask & (IN_CREATE | IN_MOVED_TO):
+                    # Files may land in the new directory before its watch is added
+                    try:
+                        self._add(path)
+                        for root, dirs, _ in os.walk(path):
+                            for d in dirs:
+                                self._add(Path(root) / d)
+                    except OSError:
+                        continue  # removed or renamed before it could be watched
+                    found.extend(Path(e.path) for e in _walk(path, True))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                found.append(path)
+        return found
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher(Watcher):
+    """
+    Watcher rescanning the folder every `interval` seconds and comparing sizes and mtimes.
+
+    Works on any platform and file system. A file is reported every time its size or mtime
+    changed since the previous scan, so a file still being copied keeps being reported until
+    its writer stops (see `quiet`).
+    """
+
+    def __init__(self, folder, recursive: bool = False, interval: float = 1.0):
+        super().__init__(folder, recursive)
+        self.interval = interval
+        self.quiet = interval
+        # Files present when the watch starts are not changes
+        self._snapshot = self._scan()
+        self._next = time.monotonic() + interval
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for entry in _walk(self.folder, self.recursive):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            snapshot[entry.path] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def changes(self, timeout: float) -> List[Path]:
+        delay = self._next - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return []
+        time.sleep(max(0.0, delay))
+        snapshot = self._scan()
+        self._next = time.monotonic() + self.interval
+        found = [Path(p) for p, stat in snapshot.items() if self._snapshot.get(p) != stat]
+        self._snapshot = snapshot
+        return found
+
+
+def make_watcher(folder, recursive: bool = False, poll_interval: Optional[float] = None) -> Watcher:
+    """
+    Create the best watcher available for a folder.
+
+    Args:
+        folder (str or Path): Folder to watch.
+        recursive (bool): Watch subdirectories too. Defaults to False.
+        poll_interval (float, optional): Poll every this many seconds instead of using inotify
+            (e.g. on network file systems). Defaults to None (inotify when available, else
+            polling every second).
+
+    Returns:
+        Watcher: An InotifyWatcher or a PollingWatcher.
+    """
+    if poll_interval is None:
+        try:
+            return InotifyWatcher(folder, recursive)
+        except (OSError, AttributeError):
+            poll_interval = 1.0
+    return PollingWatcher(folder, recursive, poll_interval)
+
+
+def iter_batches(watcher: Watcher, wanted: Callable[[Path], bool], debounce: float = 0.5,
+                 max_batch: int = 256, stop: Optional[threading.Event] = None) -> Iterator[Tuple[List[Path], float]]:
+    """
+    Group the files reported by a watcher into batches, until `stop` is set.
+
+    A file is ready once it has not been reported for `debounce` seconds (plus the watcher's
+    `quiet` time), so a file written in several steps is processed once. Ready files are
+    released when no file at all has been reported for that long, so a burst of arrivals
+    makes one batch; under a steady trickle, a file ready for as long again is released
+    anyway, which bounds its latency. Batches hold at most `max_batch` files, sorted by path.
+
+    Args:
+        watcher (Watcher): Source of the changes.
+        wanted (Callable[[Path], bool]): Filter of the files to process (e.g. ImageLoader.matches).
+        debounce (float): Seconds without changes before a file is ready. Defaults to 0.5.
+        max_batch (int): Maximum files per batch. Defaults to 256.
+        stop (threading.Event, optional): Set to end the iteration.
+
+    Yields:
+        Tuple[List[Path], float]: Files of a batch, and the time.perf_counter() value at which
+            the earliest of them was first reported.
+    """
+    stop = stop or threading.Event()
+    wait = debounce + watcher.quiet
+    seen: Dict[Path, List[float]] = {}  # first and last time each pending file was reported
+    while not stop.is_set():
+        now = time.perf_counter()
+        ready = sorted(p for p, (_, last) in seen.items() if now - last >= wait)
+        if ready and (now - max(last for _, last in seen.values()) >= wait or len(ready) >= max_batch
+                      or any(now - seen[p][1] >= 2 * wait for p in ready)):
+            batch = ready[:max_batch]
+            since = min(seen.pop(p)[0] for p in batch)
+            yield batch, since
+            continue
+        # Wake up when the next file turns ready or overdue, and at least twice a second to check stop
+        deadlines = [t - now for _, last in seen.values() for t in (last + wait, last + 2 * wait) if t > now]
+        for p in watcher.changes(min([0.5] + deadlines)):
+            if wanted(p):
+                now = time.perf_counter()
+                seen.setdefault(p, [now, now])[1] = now
@@ -0,0 +1,316 @@
+import abc
+import json
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from .autoscale import AUTO, ConcurrencyController, resolve_workers
+
+
+class WorkQueue(abc.ABC):
+    """
+    Shared task queue between a coordinating pipeline and processing workers on other nodes.
+    Subclass to use another backend (e.g. a message broker); SQLiteWorkQueue is the built-in one.
+
+    Protocol: the coordinator calls start() with the processor to run and put() with the
+    validated tasks, then polls collect() until every task has a result, and finally close().
+    Workers (see run_worker) load the processor, lease() tasks and complete() them. A leased
+    task that is not completed within the visibility timeout (e.g. because its worker died)
+    is handed to another worker, up to max_attempts times, after which it fails. Every run
+    has an id, so a worker still holding the processor of a previous run leases nothing
+    from the next one.
+    """
+
+    @abc.abstractmethod
+    def start(self, processor):
+        """
+        Begin a run: drop any previous tasks and publish the processor workers must use.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def run_id(self) -> Optional[str]:
+        """
+        Return the id of the current run, or None if no run has started.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def put(self, tasks: List[Tuple[str, Optional[Dict[str, Any]]]]):
+        """
+        Enqueue (path, validation record) tasks.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def processor(self):
+        """
+        Return the processor published by start(), or None if no run has started.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def lease(self, worker: str, limit: int,
+              run: Optional[str] = None) -> List[Tuple[int, str, Optional[Dict[str, Any]]]]:
+        """
+        Lease up to `limit` queued (or expired) tasks, as (task id, path, record) triples.
+        With `run`, lease nothing unless it is still the current run.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def complete(self, task_id: int, worker: str, result: Dict[str, Any]):
+        """
+        Store the result of a leased task and renew the worker's other leases.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def collect(self) -> List[Dict[str, Any]]:
+        """
+        Return the results (including failures) not collected yet.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def close(self):
+        """
+        End the run; workers exit once they see it.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def closed(self) -> bool:
+        """
+        Whether the current run has ended.
+        """
+        raise NotImplementedError
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    Work queue stored in a SQLite database, e.g. on storage shared by all nodes.
+
+    Leases are taken in an immediate transaction, so two workers never lease the same task
+    at once. SQLite relies on file locks: the shared filesystem must implement them (local
+    disks and most NFSv4 setups do). The processor is stored pickled, as for the process
+    executor, so only workers trusted with the database should read it.
+
+    Attributes:
+        path (Path): Location of the database.
+        visibility_timeout (float): Seconds a lease lasts without a completion from its worker.
+        max_attempts (int): Leases of a task before it is reported as failed.
+        poll_interval (float): Seconds between polls of an idle worker or coordinator.
+        idle_timeout (Optional[float]): Seconds the coordinator waits without collecting any
+            result before giving up on the run (see ImageProcessor.run_distributed).
+    """
+
+    def __init__(self, path: str, visibility_timeout: float = 300.0, max_attempts: int = 3,
+                 poll_interval: float = 0.5, idle_timeout: Optional[float] = None):
+        """
+        Open (or create) the queue.
+
+        Args:
+            path (str): Database file.
+            visibility_timeout (float): Lease duration in seconds. The coordinator's value is
+                stored with the run and used by every worker. Defaults to 300.
+            max_attempts (int): Leases of a task before it fails. Defaults to 3.
+            poll_interval (float): Seconds between polls when there is nothing to do. Defaults to 0.5.
+            idle_timeout (float, optional): Coordinator only. Give up when no result comes in for
+                this many seconds, e.g. because no worker is running; keep it above the
+                visibility timeout so the tasks of a dead worker can be retried first.
+                Defaults to None (wait forever).
+        """
+        self.path = Path(path)
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+
+    def __getstate__(self):
+        # Connections cannot be pickled; each process opens its own
+        state = self.__dict__.copy()
+        state["_db"] = state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Autocommit mode: transactions are opened explicitly where several statements must be atomic
+            self._db = sqlite3.connect(str(self.path), timeout=60, isolation_level=None, check_same_thread=False)
+            self._pid = os.getpid()
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT, info TEXT, state TEXT, worker TEXT,"
+                " lease_until REAL, attempts INTEGER DEFAULT 0, result TEXT, collected INTEGER DEFAULT 0)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, lease_until)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value BLOB)")
+        return self._db
+
+    def _transaction(self, fn):
+        """
+        Run fn(connection) in an immediate (write-locked) transaction.
+        """
+        with self._lock:
+            db = self._conn()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn(db)
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+            return out
+
+    def _meta(self, key: str):
+        with self._lock:
+            row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def start(self, processor):
+        settings = {"visibility_timeout": self.visibility_timeout, "max_attempts": self.max_attempts}
+
+        def reset(db):
+            db.execute("DELETE FROM tasks")
+            db.execute("DELETE FROM meta")
+            db.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ("run", uuid.uuid4().hex),
+                ("processor", pickle.dumps(processor)),
+                ("settings", json.dumps(settings)),
+                ("closed", 0),
+            ])
+        self._transaction(reset)
+
+    def run_id(self):
+        return self._meta("run")
+
+    def put(self, tasks):
+        rows = [(str(p), json.dumps(info, default=str)) for p, info in tasks]
+        self._transaction(lambda db: db.executemany(
+            "INSERT INTO tasks (path, info, state) VALUES (?, ?, 'queued')", rows))
+
+    def processor(self):
+        blob = self._meta("processor")
+        if blob is None:
+            return None
+        settings = json.loads(self._meta("settings"))
+        self.visibility_timeout = settings["visibility_timeout"]
+        self.max_attempts = settings["max_attempts"]
+        return pickle.loads(blob)
+
+    def _expire(self, db, now):
+        """
+        Fail the tasks whose last lease expired after max_attempts leases.
+        """
+        lost = db.execute("SELECT id, path, attempts FROM tasks WHERE state = 'leased' AND lease_until < ?"
+                          " AND attempts >= ?", (now, self.max_attempts)).fetchall()
+        for task_id, path, attempts in lost:
+            result = {"source": path, "error": f"Task lost: no worker completed it in {attempts} attempts"}
+            db.execute("UPDATE tasks SET state = 'failed', result = ? WHERE id = ?",
+                       (json.dumps(result), task_id))
+
+    def lease(self, worker, limit, run=None):
+        def take(db):
+            if run is not None:
+                current = db.execute("SELECT value FROM meta WHERE key = 'run'").fetchone()
+                if current is None or current[0] != run:
+                    return []
+            now = time.time()
+            self._expire(db, now)
+            rows = db.execute(
+                "SELECT id, path, info FROM tasks WHERE state = 'queued'"
+                " OR (state = 'leased' AND lease_until < ?) ORDER BY id LIMIT ?", (now, limit)).fetchall()
+            db.executemany(
+                "UPDATE tasks SET state = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1"
+                " WHERE id = ?", [(worker, now + self.visibility_timeout, r[0]) for r in rows])
+            return [(task_id, path, json.loads(info)) for task_id, path, info in rows]
+        return self._transaction(take)
+
+    def complete(self, task_id, worker, result):
+        data = json.dumps(result, default=str)
+
+        def store(db):
+            # A task whose lease expired may be completed twice; the first result wins
+            db.execute("UPDATE tasks SET state = 'done', result = ? WHERE id = ? AND state = 'leased'",
+                       (data, task_id))
+            db.execute("UPDATE tasks SET lease_until = ? WHERE worker = ? AND state = 'leased'",
+                       (time.time() + self.visibility_timeout, worker))
+        self._transaction(store)
+
+    def collect(self):
+        def fetch(db):
+            self._expire(db, time.time())
+            rows = db.execute("SELECT id, result FROM tasks WHERE state IN ('done', 'failed')"
+                              " AND collected = 0").fetchall()
+            db.executemany("UPDATE tasks SET collected = 1 WHERE id = ?", [(r[0],) for r in rows])
+            return [json.loads(result) for _, result in rows]
+        return self._transaction(fetch)
+
+    def close(self):
+        self._transaction(lambda db: db.execute("UPDATE meta SET value = 1 WHERE key = 'closed'"))
+
+    def closed(self):
+        return bool(self._meta("closed"))
+
+
+def run_worker(work_queue: WorkQueue, worker_id: Optional[str] = None, max_workers=4,
+               executor: str = "threads", lease_size: Optional[int] = None) -> int:
+    """
+    Process tasks from a work queue until the coordinator closes the run.
+
+    Waits for the coordinator to publish its processor, then repeatedly leases a batch of
+    tasks and runs the configured steps on them with ImageProcessor.iter_parallel, storing
+    each result as soon as it completes (which also renews the leases of the rest of the batch).
+    The worker also exits if the coordinator starts a new run, whose processor may differ.
+
+    Args:
+        work_queue (WorkQueue): Queue shared with the coordinator.
+        worker_id (str, optional): Name of this worker in the leases. Defaults to host:pid.
+        max_workers (int or str): Parallel workers on this node, or AUTO to adapt them over the
+            whole run (see ConcurrencyController).
+        executor (str): Execution backend on this node: "threads", "processes" or "serial".
+        lease_size (int, optional): Tasks leased at once. Defaults to four per worker, or to a
+            batch per worker if the processor has batch steps (the CPU count stands for AUTO).
+
+    Returns:
+        int: Number of tasks this worker completed.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    autoscale = ConcurrencyController.for_executor(executor) if max_workers == AUTO else None
+    processor = None
+    run = None
+    completed = 0
+    while True:
+        if processor is None:
+            # Run id first: if a new run starts in between, the leases of the old one fail
+            run = work_queue.run_id()
+            processor = work_queue.processor()
+            if processor is not None and not lease_size:
+                lease_size = resolve_workers(max_workers) * (processor.batch_size if processor.batch_steps else 4)
+        leased = work_queue.lease(worker_id, lease_size, run) if processor is not None else []
+        if not leased:
+            if work_queue.closed() or (processor is not None and work_queue.run_id() != run):
+                if processor is not None:
+                    processor.close()
+                return completed
+            time.sleep(getattr(work_queue, "poll_interval", 0.5))
+            continue
+        ids = {str(Path(path)): task_id for task_id, path, _ in leased}
+        tasks = [(Path(path), info) for _, path, info in leased]
+        for result in processor.iter_parallel(tasks, max_workers=max_workers, executor=executor,
+                                              autoscale=autoscale):
+            work_queue.complete(ids[str(result["source"])], worker_id, result)
+            completed += 1
@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Tuple
+from .processor import write_atomic
+
+
+class PackArchive:
+    """
+    Single indexed archive holding many small outputs, instead of one file each.
+
+    The archive is an uncompressed ZIP file (outputs are already compressed images): members
+    are appended sequentially, and the central directory at the end indexes them, so any
+    zip tool or zipfile.ZipFile can list and read single members. The archive is built under
+    a temporary name and renamed by close(), so an interrupted run never leaves a truncated
+    archive under the final name; the archive of a previous run is removed when the first
+    member is added.
+
+    Attributes:
+        path (Path): Final location of the archive.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the archive; the file is created by the first add().
+
+        Args:
+            path (str): Location of the archive.
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._zip = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_lock"] = state["_zip"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def add(self, name: str, data):
+        """
+        Append a member.
+
+        Args:
+            name (str): Member name (a relative path).
+            data (bytes-like): Member contents.
+        """
+        with self._lock:
+            if self._zip is None:
+                # A new archive replaces the previous one, which must not outlive the outputs it indexed
+                self.path.unlink(missing_ok=True)
+                self._zip = zipfile.ZipFile(self.path.with_name(f".{self.path.name}.tmp"), "w", zipfile.ZIP_STORED)
+            self._zip.writestr(name, bytes(data))
+
+    def close(self):
+        """
+        Write the index and move the archive to its final name. Does nothing if it is empty.
+        """
+        with self._lock:
+            if self._zip is None:
+                return
+            tmp = Path(self._zip.filename)
+            self._zip.close()
+            self._zip = None
+            with open(tmp, "rb+") as f:
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+
+
+class OutputWriter:
+    """
+    Writer stage that takes encoded outputs off the CPU workers.
+
+    A step hands the encoded bytes to submit() and moves on to the next image while a small
+    pool of I/O threads writes them. The bytes waiting to be written are bounded by
+    `max_buffer`: when the buffer is full, submit() blocks, so slow storage throttles the
+    CPU workers instead of filling memory. Each submit() returns a Future that the
+    processor waits for before reporting the image (see ImageProcessor), so an image is
+    only reported, journaled or cached once its output is on disk, and write errors still
+    end up in its result.
+
+    With an archive, outputs (or only those smaller than `pack_below` bytes) are appended to
+    a PackArchive instead of being written as separate files: many tiny files become one
+    large sequential write. Only one process can append to an archive, so it cannot be
+    used with the process backend.
+
+    The pool is started on first use in each process, so the writer can be pickled with its step.
+
+    Attributes:
+        io_workers (int): Threads writing outputs.
+        max_buffer (int): Bytes of encoded outputs that may wait for the I/O threads.
+        archive (Optional[PackArchive]): Archive receiving packed outputs.
+        pack_below (Optional[int]): Only outputs smaller than this many bytes are packed.
+    """
+
+    def __init__(self, io_workers: int = 2, max_buffer: int = 64 * 1024 ** 2,
+                 archive: Optional[PackArchive] = None, pack_below: Optional[int] = None):
+        """
+        Initialize the writer.
+
+        Args:
+            io_workers (int): Threads writing outputs. Defaults to 2.
+            max_buffer (int): Bound in bytes of the outputs waiting to be written. An output
+                larger than the whole buffer is still accepted when the buffer is empty. Defaults to 64 MiB.
+            archive (PackArchive, optional): Pack outputs into this archive. Defaults to None (separate files).
+            pack_below (int, optional): With an archive, only pack outputs smaller than this;
+                larger ones are written as files. Defaults to None (pack everything).
+        """
+        self.io_workers = io_workers
+        self.max_buffer = max_buffer
+        self.archive = archive
+        self.pack_below = pack_below
+        self._init_state()
+
+    def _init_state(self):
+        self._cond = threading.Condition()
+        self._buffered = 0
+        self._pool = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for k in ("_cond", "_buffered", "_pool"):
+            del state[k]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_state()
+
+    def packs(self, size: int) -> bool:
+        """
+        Whether an output of this many bytes goes into the archive.
+        """
+        return self.archive is not None and (self.pack_below is None or size < self.pack_below)
+
+    def submit(self, out_path: Path, data, root: Optional[Path] = None) -> Tuple[Optional[str], Future]:
+        """
+        Queue an output for writing, blocking while the buffer is full.
+
+        Args:
+            out_path (Path): Destination file.
+            data (bytes-like): Encoded output; must not be modified afterwards.
+            root (Path, optional): Folder the archive member names are relative to (the output folder).
+
+        Returns:
+            Tuple[Optional[str], Future]: Archive member name (None if written as a file), and
+                a Future resolving to the seconds spent writing.
+        """
+        size = len(data)
+        member = None
+        if self.packs(size):
+            member = Path(os.path.relpath(out_path, root)).as_posix() if root is not None else out_path.name
+        with self._cond:
+            while self._buffered and self._buffered + size > self.max_buffer:
+                self._cond.wait()
+            self._buffered += size
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="writer")
+        return member, self._pool.submit(self._write, out_path, data, member)
+
+    def _write(self, out_path: Path, data, member: Optional[str]) -> float:
+        start = time.perf_counter()
+        try:
+            if member is not None:
+                self.archive.add(member, data)
+            else:
+                write_atomic(out_path, data)
+        finally:
+            with self._cond:
+                self._buffered -= len(data)
+                self._cond.notify_all()
+        return time.perf_counter() - start
+
+    def close(self):
+        """
+        Wait for the queued writes and finish the archive.
+        """
+        with self._cond:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+        if self.archive is not None:
+            self.archive.close()
@@ -0,0 +1,93 @@
+import time
+import unittest
+from pathlib import Path
+from src.autoscale import ConcurrencyController
+from src.processor import ImageProcessor
+
+# --- Run with: 'python -m unittest test.test_autoscale' ---
+
+
+def slow_io_step(path):
+    """
+    Step waiting like a read from slow storage, without using the CPU.
+    """
+    time.sleep(0.01)
+    return {"done": True}
+
+
+class ChunkRecordingProcessor(ImageProcessor):
+    """
+    Processor tagging each result with the size of the chunk it was sent in.
+    """
+
+    def _run_chunk(self, tasks, validate=None, settle=False):
+        results = super()._run_chunk(tasks, validate, settle)
+        for r in results:
+            r["chunk"] = len(tasks)
+        return results
+
+
+class TestAutoscale(unittest.TestCase):
+    """
+    Unit tests for the adaptive concurrency controller.
+    """
+
+    def test_grows_while_throughput_improves_then_steps_back(self):
+        """
+        Test that the limit grows while each step raises throughput, goes back to the previous
+        size when a step brings no gain, and that every decision is logged.
+        """
+        controller = ConcurrencyController(max_workers=16, initial=4, cpu_sampler=lambda: 0.3)
+        start = time.perf_counter()
+        with self.assertLogs("src.autoscale", "INFO") as logs:
+            for window, images in enumerate((8, 20, 20), start=1):
+                controller.record(0.1, images)
+                controller.update(start + window)
+        self.assertEqual([(old, new) for _, old, new, _ in controller.decisions], [(4, 5), (5, 6), (6, 5)])
+        self.assertEqual(len(logs.output), 3)
+        self.assertIn("no gain", logs.output[-1])
+        # Holding after the step back
+        controller.record(0.1, 40)
+        self.assertEqual(controller.update(start + 4), 5)
+
+    def test_shrinks_when_input_bound_and_holds_when_cpu_saturated(self):
+        """
+        Test that a saturated CPU stops growth and that waiting for input shrinks the limit,
+        never below min_workers.
+        """
+        controller = ConcurrencyController(min_workers=4, max_workers=16, initial=8, cpu_sampler=lambda: 0.95)
+        start = time.perf_counter()
+        controller.record(0.1, 10)
+        self.assertEqual(controller.update(start + 1), 8)
+        for window in range(2, 6):
+            controller.record(0.1, 10)
+            controller.idle(0.5)
+            controller.update(start + window)
+        self.assertEqual(controller.limit, 4)
+        self.assertTrue(all("input-bound" in reason for *_, reason in controller.decisions))
+
+    def test_run_parallel_grows_pool_for_io_bound_steps(self):
+        """
+        Test that an autoscaled run processes every image and adds workers for steps that wait on I/O.
+        """
+        processor = ImageProcessor(output_folder="output/autoscale")
+        processor.add_step(slow_io_step)
+        controller = ConcurrencyController(max_workers=8, initial=1, interval=0.05, cpu_sampler=lambda: 0.1)
+        paths = [Path(f"img_{i}.jpg") for i in range(80)]
+        results = processor.run_parallel(paths, max_workers="auto", autoscale=controller)
+        self.assertEqual(len(results), 80)
+        self.assertTrue(all(r["done"] for r in results))
+        self.assertGreater(controller.limit, 1)
+        self.assertLessEqual(controller.limit, 8)
+
+        # Autoscaled process runs still send the images in chunks
+        processor = ChunkRecordingProcessor(output_folder="output/autoscale")
+        processor.add_step(slow_io_step)
+        controller = ConcurrencyController(max_workers=2, interval=0.05)
+        results = processor.run_parallel(paths, max_workers="auto", executor="processes", autoscale=controller)
+        self.assertEqual(len(results), 80)
+        self.assertEqual({r["chunk"] for r in results}, {10})
+
+
+if __name__ == "__main__":
+    unittest.main()
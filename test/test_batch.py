@@ -0,0 +1,77 @@
+import unittest
+from pathlib import Path
+from PIL import Image, ImageEnhance
+from src.processor import ImageProcessor
+from src.batch import np, BatchStep, Reduce, ConvertMode, BrightnessContrast, Watermark, parse_op
+
+# --- Run with: 'python -m unittest test.test_batch' ---
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestBatch(unittest.TestCase):
+    """
+    Unit tests for batched, vectorized image operations.
+    """
+
+    def setUp(self):
+        """
+        Create a few small images of two sizes.
+        """
+        self.folder = Path("output/batch")
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.paths = []
+        for i, size in enumerate([(33, 20)] * 3 + [(16, 16)] * 2):
+            img = Image.merge("RGB", [Image.effect_noise(size, 40 + i).convert("L")] * 3)
+            path = self.folder / f"icon{i}.png"
+            img.save(path)
+            self.paths.append(path)
+
+    def test_ops_match_pillow(self):
+        """
+        Test that the vectorized operations match their Pillow counterparts within rounding.
+        """
+        img = Image.open(self.paths[0]).convert("RGB")
+        batch = np.asarray(img)[None]
+        cases = [
+            (Reduce(3), img.reduce(3)),
+            (ConvertMode("L"), img.convert("L")),
+            (BrightnessContrast(brightness=1.3), ImageEnhance.Brightness(img).enhance(1.3)),
+            (BrightnessContrast(contrast=0.6), ImageEnhance.Contrast(img).enhance(0.6)),
+        ]
+        for op, expected in cases:
+            out = op(batch)[0]
+            expected = np.asarray(expected).reshape(out.shape).astype(int)
+            self.assertLessEqual(np.abs(out.astype(int) - expected).max(), 1, type(op).__name__)
+
+    def test_batch_step_groups_sizes(self):
+        """
+        Test that a batch step processes images of different sizes and reports each of them.
+        """
+        mark = self.folder / "mark.png"
+        Image.new("RGBA", (6, 4), (255, 0, 0, 255)).save(mark)
+        processor = ImageProcessor(str(self.folder))
+        processor.add_batch_step(BatchStep(str(self.folder / "out"), [parse_op("reduce:2"),
+                                                                      Watermark(str(mark), 1.0, margin=0)]),
+                                 batch_size=4)
+        infos = [{"ok": True, "width": w, "height": h, "mode": "RGB"}
+                 for w, h in [(33, 20)] * 3 + [(16, 16)] * 2]
+        results = processor.run_parallel(self.paths + [Path("missing.png")], max_workers=2,
+                                         infos=infos + [{"ok": True}])
+        by_source = {Path(r["source"]).name: r for r in results}
+        self.assertEqual((by_source["icon0.png"]["processed_width"], by_source["icon0.png"]["processed_height"]),
+                         (17, 10))
+        self.assertEqual(by_source["icon4.png"]["processed_width"], 8)
+        self.assertIn("error", by_source["missing.png"])
+        with Image.open(by_source["icon1.png"]["processed_path"]) as out:
+            self.assertEqual(out.getpixel((16, 9)), (255, 0, 0))
+
+    def test_alpha_images_saved_as_jpeg(self):
+        """
+        Test that images with an alpha channel are flattened to RGB when the output format has none.
+        """
+        path = self.folder / "alpha.png"
+        Image.new("RGBA", (20, 12), (10, 200, 30, 128)).save(path)
+        step = BatchStep(str(self.folder / "out"), [parse_op("reduce:2")], format="JPEG")
+        result = step([(path, {"ok": True, "width": 20, "height": 12, "mode": "RGBA"})])[0]
+        self.assertNotIn("error", result)
+        with Image.open(result["processed_path"]) as out:
+            self.assertEqual((out.format, out.mode, out.size), ("JPEG", "RGB", (10, 6)))
@@ -0,0 +1,48 @@
+import shutil
+import unittest
+from pathlib import Path
+from bench.bench_merge import time_run
+from src.bench import generate_corpus, percentile, run_config
+
+# --- Run with: 'python -m unittest test.test_bench' ---
+
+class TestBench(unittest.TestCase):
+    """
+    Unit tests for the benchmark helpers.
+    """
+
+    def setUp(self):
+        """
+        Generate a tiny synthetic corpus.
+        """
+        self.corpus = Path("output/bench/corpus")
+        shutil.rmtree(self.corpus, ignore_errors=True)
+        self.bytes = generate_corpus(self.corpus, 3, [(64, 48), (32, 32)], "png")
+
+    def test_percentile(self):
+        """
+        Test nearest-rank percentiles.
+        """
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_run_config_reports_metrics(self):
+        """
+        Test that a benchmark run over the synthetic corpus processes every image and reports latencies.
+        """
+        self.assertEqual(len(list(self.corpus.iterdir())), 3)
+        r = run_config(str(self.corpus), "output/bench/out", "serial", 1, 0.5, self.bytes)
+        self.assertEqual(r["images"], 3)
+        self.assertGreater(r["images_per_s"], 0)
+        self.assertGreater(r["latency_ms_p99"], 0)
+
+    def test_merge_benchmark_runs(self):
+        """
+        Test that the merge benchmark still drives a full ImagePipeline.run on a small corpus.
+        """
+        self.assertGreater(time_run(300, "output/bench/merge"), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import shutil
+import unittest
+from pathlib import Path
+from src.cache import ProcessingCache
+
+# --- Run with: 'python -m unittest test.test_cache' ---
+
+class TestCache(unittest.TestCase):
+    """
+    Unit tests for ProcessingCache, the manifest behind incremental runs.
+    """
+
+    def setUp(self):
+        """
+        Copy a test image into a scratch folder and start from an empty manifest.
+        """
+        self.folder = Path("output/cache")
+        shutil.rmtree(self.folder, ignore_errors=True)
+        self.folder.mkdir(parents=True)
+        self.image = self.folder / "Lion.jpg"
+        shutil.copy("input/Lion.jpg", self.image)
+        self.row = {"path": str(self.image), "ok": True, "width": 1879}
+        self.config = {"scale": 0.5}
+
+    def test_hit_and_invalidation(self):
+        """
+        Test that a stored row is reused until the file or the configuration changes.
+        """
+        cache = ProcessingCache(str(self.folder), self.config)
+        self.assertIsNone(cache.lookup(self.image))
+        cache.store(self.image, [self.row])
+        cache.close()
+
+        cache = ProcessingCache(str(self.folder), self.config)
+        self.assertEqual(cache.lookup(self.image), [self.row])
+        cache.close()
+
+        cache = ProcessingCache(str(self.folder), {"scale": 0.25})
+        self.assertIsNone(cache.lookup(self.image))
+        cache.close()
+
+        st = os.stat(self.image)
+        os.utime(self.image, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        cache = ProcessingCache(str(self.folder), self.config)
+        self.assertIsNone(cache.lookup(self.image))
+        cache.close()
+
+    def test_content_hash_and_eviction(self):
+        """
+        Test that a touched but unchanged file is reused with hash_content, and missing sources are evicted.
+        """
+        cache = ProcessingCache(str(self.folder), self.config, hash_content=True)
+        cache.store(self.image, [self.row])
+        cache.close()
+
+        st = os.stat(self.image)
+        os.utime(self.image, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        cache = ProcessingCache(str(self.folder), self.config, hash_content=True)
+        self.assertEqual(cache.lookup(self.image), [self.row])
+        cache.close()
+
+        # A run that no longer sees the image evicts its entry
+        cache = ProcessingCache(str(self.folder), self.config, hash_content=True)
+        self.assertEqual(cache.evict_missing(), 1)
+        cache.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import csv
+import random
+import shutil
+import unittest
+from pathlib import Path
+from PIL import Image
+from src.dedup import BKTree, Deduplicator, hamming
+from src.pipeline import ImagePipeline
+
+# --- Run with: 'python -m unittest test.test_dedup' ---
+
+class TestDedup(unittest.TestCase):
+    """
+    Unit tests for the BK-tree index, Deduplicator and the dedup stage of the pipeline.
+    """
+
+    def setUp(self):
+        """
+        Build a folder with an exact copy and a re-encode of the lion picture next to the tiger.
+        """
+        self.input_folder = Path("output/dedup/input")
+        shutil.rmtree(self.input_folder, ignore_errors=True)
+        self.input_folder.mkdir(parents=True)
+        shutil.copy("input/Lion.jpg", self.input_folder / "a_lion.jpg")
+        shutil.copy("input/Lion.jpg", self.input_folder / "b_lion_copy.jpg")
+        with Image.open("input/Lion.jpg") as img:
+            img.save(self.input_folder / "c_lion_q30.jpg", quality=30)
+        shutil.copy("input/Tigre.JPG", self.input_folder / "d_tiger.jpg")
+
+    def test_bktree_matches_linear_scan(self):
+        """
+        Test that a BK-tree search finds exactly the hashes a linear scan finds.
+        """
+        rng = random.Random(0)
+        keys = [rng.getrandbits(64) for _ in range(500)]
+        keys += [k ^ (1 << rng.randrange(64)) for k in keys[:50]]  # near neighbours
+        tree = BKTree()
+        for i, k in enumerate(keys):
+            tree.add(k, i)
+        for query in keys[:20] + [rng.getrandbits(64)]:
+            expected = sorted((hamming(query, k), i) for i, k in enumerate(keys) if hamming(query, k) <= 6)
+            self.assertEqual(sorted(tree.find(query, 6)), expected)
+
+    def test_deduplicator_finds_copies_and_reencodes(self):
+        """
+        Test that an exact copy and a re-encode match the first image, and a different picture does not.
+        """
+        dedup = Deduplicator()
+        paths = sorted(self.input_folder.iterdir())
+        matches = [dedup.match(p, dedup.hashes(p)) for p in paths]
+        lion = str(paths[0])
+        self.assertEqual(matches, [None, lion, lion, None])
+
+    def test_pipeline_reuses_canonical_outputs(self):
+        """
+        Test that duplicates are not processed and reuse the output of their canonical image.
+        """
+        summary = ImagePipeline(str(self.input_folder), "output/dedup/out", scale=0.1, dedup=True).run()
+        self.assertEqual(summary["count_processed"], 2)
+        self.assertEqual(summary["count_duplicates"], 2)
+        with open(summary["csv"], encoding="utf-8") as f:
+            rows = {Path(r["path"]).name: r for r in csv.DictReader(f)}
+        self.assertEqual(rows["c_lion_q30.jpg"]["processed_path"], rows["a_lion.jpg"]["processed_path"])
+        self.assertEqual(Path(rows["b_lion_copy.jpg"]["duplicate_of"]).name, "a_lion.jpg")
+        self.assertEqual(rows["d_tiger.jpg"]["duplicate_of"], "")
+
+if __name__ == "__main__":
+    unittest.main()
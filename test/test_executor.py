@@ -0,0 +1,33 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from src.executor import make_executor, SerialExecutor
+
+# --- Run with: 'python -m unittest test.test_executor' ---
+
+class TestExecutor(unittest.TestCase):
+    """
+    Unit tests for the executor backends used by ImageProcessor.
+    """
+
+    def test_make_executor_kinds(self):
+        """
+        Test that each backend name maps to the expected executor and unknown names are rejected.
+        """
+        with make_executor("threads", 2) as ex:
+            self.assertIsInstance(ex, ThreadPoolExecutor)
+        with make_executor("serial", 2) as ex:
+            self.assertIsInstance(ex, SerialExecutor)
+        with self.assertRaises(ValueError):
+            make_executor("gpu", 2)
+
+    def test_serial_executor_captures_exceptions(self):
+        """
+        Test that the serial executor returns results and exceptions through its futures.
+        """
+        ex = SerialExecutor()
+        self.assertEqual(ex.submit(pow, 2, 3).result(), 8)
+        with self.assertRaises(ZeroDivisionError):
+            ex.submit(divmod, 1, 0).result()
+
+if __name__ == "__main__":
+    unittest.main()
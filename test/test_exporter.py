@@ -1,6 +1,7 @@
 import unittest
 from pathlib import Path
-from src.exporter import CSVExporter
+import json
+from src.exporter import CSVExporter, JSONLExporter, ParquetExporter, pa
 
 # --- Run with: 'python -m unittest test.test_exporter' ---
 
@@ -35,6 +36,42 @@ class TestExporter(unittest.TestCase):
         self.assertIn("name", content)
         self.assertIn("Lion", content)
 
+    def test_write_stream(self):
+        """
+        Test that rows from a generator are written with the fixed header, ignoring unknown keys.
+        """
+        rows = (dict(r, extra=True) for r in self.rows)
+        csv_path = self.exporter.write_stream(rows, ["name", "size"])
+        lines = Path(csv_path).read_text().splitlines()
+        self.assertEqual(lines[0], "name,size")
+        self.assertEqual(len(lines), 3)
+        self.assertNotIn("extra", lines[0])
+
+    def test_jsonl_keeps_types_and_schema(self):
+        """
+        Test that streamed JSON Lines rows keep their value types and follow the fixed schema.
+        """
+        exporter = JSONLExporter(output_folder=str(self.output_folder), filename="test_report.jsonl")
+        rows = (dict(r, path=Path(r["name"]), extra=True) for r in self.rows)
+        jsonl_path = exporter.write_stream(rows, ["name", "size", "path", "missing"])
+        records = [json.loads(line) for line in Path(jsonl_path).read_text().splitlines()]
+        self.assertEqual(records[1], {"name": "Tiger", "size": 2048, "path": "Tiger", "missing": None})
+
+    @unittest.skipIf(pa is None, "PyArrow is not installed")
+    def test_parquet_row_groups(self):
+        """
+        Test that the Parquet report is written in row groups with types from the first group.
+        """
+        import pyarrow.parquet as pq
+        exporter = ParquetExporter(output_folder=str(self.output_folder), filename="test_report.parquet")
+        rows = ({"name": f"img{i}", "size": i, "error": None if i < 2 else "bad"} for i in range(5))
+        parquet_path = exporter.write_stream(rows, ["name", "size", "error"], row_group_size=2)
+        report = pq.ParquetFile(parquet_path)
+        self.assertEqual(report.metadata.num_row_groups, 3)
+        table = report.read()
+        self.assertEqual(table.column("size").to_pylist(), [0, 1, 2, 3, 4])
+        self.assertEqual(table.schema.field("error").type, pa.string())
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -0,0 +1,82 @@
+import csv
+import unittest
+from pathlib import Path
+from PIL import Image, ImageChops
+from src.graph import Convert, Resize, Save, StepGraph, Watermark
+from src.metrics import ImageMetrics, collect
+from src.pipeline import ImagePipeline
+from src.renditions import RenditionSpec
+
+# --- Run with: 'python -m unittest test.test_graph' ---
+
+class TestGraph(unittest.TestCase):
+    """
+    Unit tests for the step graph (StepGraph) and its operations.
+    """
+
+    def setUp(self):
+        """
+        Set up the output folder and the test image.
+        """
+        self.output_folder = Path("output/graph")
+        self.image = Path("input/Lion.jpg")
+
+    def test_planner_fuses_chains_and_runs_branches(self):
+        """
+        Test that a leading conversion moves into the decoder, adjacent resizes fuse, and both
+        branches of a fork are saved from the same decode, with their metrics collected.
+        """
+        graph = StepGraph(str(self.output_folder), reducing_gap=2.0)
+        node = graph.add("grey", Convert("L"))
+        node = graph.add("half", Resize(0.5), node)
+        node = graph.add("fit", Resize(max_size=800), node)
+        graph.add("full", Save(), graph.add("mark", Watermark(text="© Author"), node))
+        graph.add("thumb", Save("png"), graph.add("small", Resize(max_size=200), node))
+        plan = graph.compile()
+        self.assertEqual(plan.decode_mode, "L")
+        self.assertEqual(plan.describe(), ["decode L", "  half+fit", "    mark > save:full",
+                                           "    small > save:thumb"])
+        metrics = ImageMetrics()
+        with collect(metrics):
+            result = graph(self.image)
+        rows = {r["rendition"]: r for r in result["renditions"]}
+        self.assertEqual((rows["full"]["processed_width"], rows["full"]["processed_height"]), (733, 800))
+        self.assertEqual(rows["thumb"]["processed_format"], "PNG")
+        with Image.open(rows["thumb"]["processed_path"]) as img:
+            self.assertEqual((img.mode, max(img.size)), ("L", 200))
+        self.assertTrue({"decode", "resize", "watermark", "encode", "write"} <= set(metrics.stages))
+        with self.assertRaises(ValueError):
+            graph.add("more", Resize(0.5), "full")
+
+    def test_watermark_leaves_input_and_outside_untouched(self):
+        """
+        Test that the watermark returns a new image that differs from the input only in its corner.
+        """
+        img = Image.new("RGB", (400, 200), (40, 80, 120))
+        out, size = Watermark(text="© Author", opacity=0.8, size=0.2)(img, img.size)
+        self.assertEqual(size, (400, 200))
+        self.assertEqual(img.getpixel((399, 199)), (40, 80, 120))
+        left, top, right, bottom = ImageChops.difference(img, out).getbbox()
+        self.assertTrue(left > 200 and top > 100 and right <= 400 and bottom <= 200)
+        with self.assertRaises(ValueError):
+            Watermark(text="x", logo="logo.png")
+
+    def test_pipeline_watermarked_renditions(self):
+        """
+        Test that a pipeline with a watermark reports one row per rendition, with the sizes of
+        the plain rendition step.
+        """
+        specs = [RenditionSpec("full", scale=0.5), RenditionSpec("thumb", max_size=128)]
+        reports = []
+        for name, watermark in (("plain", None), ("marked", Watermark(text="© Author"))):
+            pipeline = ImagePipeline("input", str(self.output_folder / name), max_workers=2,
+                                     renditions=specs, watermark=watermark, journal=False)
+            with open(pipeline.run()["report"], newline="") as f:
+                reports.append([(r["path"], r["rendition"], r["processed_width"], r["processed_height"])
+                                for r in csv.DictReader(f) if r["ok"] == "True"])
+        self.assertEqual(len(reports[1]), 4)
+        self.assertEqual(reports[0], reports[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,9 @@
+import shutil
+import threading
 import unittest
+from pathlib import Path
 from src.loader import ImageLoader
+from src.processor import make_resize_and_save_step
 
 # --- Run with: 'python -m unittest test.test_loader' ---
 
@@ -15,12 +19,62 @@ class TestLoader(unittest.TestCase):
         """
         Test that get_image_paths returns only files with valid image extensions.
 
-        Supported extensions: .png, .jpg, .jpeg, .bmp, .gif, .tiff
+        Supported extensions: .png, .jpg, .jpeg, .bmp, .gif, .tif, .tiff
         """
         loader = ImageLoader("input")
         images = loader.get_image_paths()
         for img in images:
-            self.assertTrue(img.suffix.lower() in (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tiff"))
+            self.assertTrue(img.suffix.lower() in (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff"))
+
+    def test_iter_image_paths_matches_sorted_list(self):
+        """
+        Test that the lazy scan yields the same files as get_image_paths, just unsorted.
+        """
+        loader = ImageLoader("input")
+        self.assertEqual(sorted(loader.iter_image_paths()), loader.get_image_paths())
+
+    def test_recursive_scan_with_filters(self):
+        """
+        Test that a recursive scan finds nested images, honours exclude patterns, and that
+        outputs of equal names in different folders don't collide.
+        """
+        tree = Path("output/tree")
+        shutil.rmtree(tree, ignore_errors=True)
+        for sub in ("a", "b", "a/deep", "skip"):
+            (tree / sub).mkdir(parents=True)
+            shutil.copy("input/Lion.jpg", tree / sub / "img.jpg")
+        (tree / "a" / "notes.txt").write_text("not an image")
+
+        loader = ImageLoader(str(tree), recursive=True, exclude=["skip"], scan_workers=3)
+        paths = loader.get_image_paths()
+        self.assertEqual([p.relative_to(tree).as_posix() for p in paths],
+                         ["a/deep/img.jpg", "a/img.jpg", "b/img.jpg"])
+        self.assertEqual(ImageLoader(str(tree)).get_image_paths(), [])
+
+        step = make_resize_and_save_step(output_folder="output/tree_out", scale=0.05, input_root=str(tree))
+        outputs = {step(p)["processed_path"] for p in paths}
+        self.assertEqual(len(outputs), 3)
+
+        # An unexpected error in a scan thread ends the scan with that error instead of hanging
+        class FailingLoader(ImageLoader):
+            def _iter_dir(self, directory, rel):
+                if rel == "a/deep":
+                    raise UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte")
+                return super()._iter_dir(directory, rel)
+
+        errors = []
+
+        def scan():
+            try:
+                FailingLoader(str(tree), recursive=True, scan_workers=2).get_image_paths()
+            except UnicodeDecodeError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=scan, daemon=True)
+        thread.start()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(errors), 1)
 
 if __name__ == "__main__":
     unittest.main()
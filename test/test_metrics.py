@@ -0,0 +1,61 @@
+import unittest
+from pathlib import Path
+from src.metrics import Metrics, ImageMetrics, MetricsHook, PrometheusTextfileHook, collect, timed, add_bytes, row_columns
+from src.processor import ImageProcessor, make_resize_and_save_step
+
+# --- Run with: 'python -m unittest test.test_metrics' ---
+
+class TestMetrics(unittest.TestCase):
+    """
+    Unit tests for metrics collection and export.
+    """
+
+    def test_processor_records_phases(self):
+        """
+        Test that processing with metrics enabled records each phase of the resize step and the bytes moved.
+        """
+        processor = ImageProcessor(output_folder="output", collect_metrics=True)
+        processor.add_step(make_resize_and_save_step(output_folder="output/metrics", scale=0.25))
+        result = processor.run_serial([Path("input/Lion.jpg")])[0]
+        stages = result["metrics"]["stages"]
+        for phase in ("decode", "resize", "encode", "write", "ResizeAndSaveStep"):
+            self.assertIn(phase, stages)
+        self.assertGreater(result["metrics"]["bytes_read"], 0)
+        self.assertEqual(result["metrics"]["bytes_written"], Path(result["processed_path"]).stat().st_size)
+        columns = row_columns(result["metrics"], ["ResizeAndSaveStep"])
+        self.assertGreater(columns["wall_ms"], columns["encode_ms"])
+
+    def test_disabled_collection_is_a_no_op(self):
+        """
+        Test that timed() and add_bytes() do nothing outside collect().
+        """
+        with timed("decode"):
+            add_bytes(read=10)
+        m = ImageMetrics()
+        with collect(m):
+            with timed("decode"):
+                add_bytes(read=10)
+        self.assertEqual(list(m.stages), ["decode"])
+        self.assertEqual(m.bytes_read, 10)
+
+    def test_prometheus_textfile(self):
+        """
+        Test that the Prometheus hook writes one sample per stage and counter.
+        """
+        metrics = Metrics()
+        metrics.record("validate", wall=0.5, cpu=0.25, count=3)
+        hook = PrometheusTextfileHook("output/metrics", labels={"job": "nightly"})
+        hook.emit(metrics.summary())
+        text = hook.path.read_text()
+        self.assertIn('images_pipeline_stage_items_total{job="nightly",stage="validate"} 3', text)
+        self.assertIn("# TYPE images_pipeline_stage_wall_seconds_total counter", text)
+
+        # A hook without emit fails when it is built, not at the end of the run
+        class SilentHook(MetricsHook):
+            pass
+
+        with self.assertRaises(TypeError):
+            SilentHook()
+
+if __name__ == "__main__":
+    unittest.main()
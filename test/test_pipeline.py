@@ -0,0 +1,156 @@
+import csv
+import shutil
+import unittest
+from pathlib import Path
+from src.journal import Journal
+from src.pipeline import ImagePipeline
+
+# --- Run with: 'python -m unittest test.test_pipeline' ---
+
+class TestPipeline(unittest.TestCase):
+    """
+    Unit tests for ImagePipeline, run against the images in the input folder.
+    """
+
+    def setUp(self):
+        """
+        Set up the input and output folders used by the pipeline.
+        """
+        self.input_folder = "input"
+        self.output_folder = Path("output/pipeline")
+
+    def read_report(self, csv_path):
+        """
+        Read the CSV report back as a list of dictionaries.
+        """
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+
+    def test_streaming_matches_staged_run(self):
+        """
+        Test that the streaming mode reports the same images and counts as the staged run.
+        """
+        staged = ImagePipeline(self.input_folder, str(self.output_folder / "staged"), scale=0.1).run()
+        streamed = ImagePipeline(self.input_folder, str(self.output_folder / "streamed"), scale=0.1,
+                                 streaming=True, queue_size=1).run()
+        self.assertEqual(staged["count_validated"], streamed["count_validated"])
+        self.assertEqual(staged["count_processed"], streamed["count_processed"])
+        staged_rows = sorted(r["path"] for r in self.read_report(staged["csv"]))
+        streamed_rows = sorted(r["path"] for r in self.read_report(streamed["csv"]))
+        self.assertEqual(staged_rows, streamed_rows)
+
+    def test_incremental_rerun_reuses_rows(self):
+        """
+        Test that an incremental re-run over an unchanged folder reuses every row without reprocessing.
+        """
+        out = self.output_folder / "incremental"
+        shutil.rmtree(out, ignore_errors=True)
+        first = ImagePipeline(self.input_folder, str(out), scale=0.1, incremental=True).run()
+        second = ImagePipeline(self.input_folder, str(out), scale=0.1, incremental=True).run()
+        self.assertEqual(second["count_processed"], 0)
+        self.assertEqual(second["count_cached"], first["count_validated"])
+        self.assertEqual(len(self.read_report(second["csv"])), first["count_validated"])
+
+    def test_merge_matches_results_by_source(self):
+        """
+        Test that each processing result is merged with the validation record of its own source.
+        """
+        validated = [{"path": "a.jpg", "width": 1}, {"path": "b.jpg", "width": 2}]
+        processed = [{"source": "b.jpg", "processed_width": 20}, {"source": "a.jpg", "processed_width": 10}]
+        merged = ImagePipeline._merge(validated, processed)
+        self.assertEqual([(m["path"], m["width"], m["processed_width"]) for m in merged],
+                         [("b.jpg", 2, 20), ("a.jpg", 1, 10)])
+
+    def test_resume_after_crash_matches_uninterrupted_run(self):
+        """
+        Test that resuming a run that died before writing its report skips the journaled
+        images and writes the same report as an uninterrupted run.
+        """
+        from unittest import mock
+        out = self.output_folder / "resume"
+        shutil.rmtree(out, ignore_errors=True)
+        crashed = ImagePipeline(self.input_folder, str(out), scale=0.1, journal=True)
+        with mock.patch.object(crashed.exporter, "write", side_effect=MemoryError):
+            with self.assertRaises(MemoryError):
+                crashed.run()
+        journal = out / "journal.jsonl"
+        with open(journal, "a", encoding="utf-8") as f:
+            f.write('{"path": "torn')  # a record cut off by the crash
+
+        resumed = ImagePipeline(self.input_folder, str(out), scale=0.1, resume=True).run()
+        self.assertEqual(resumed["count_processed"], 0)
+        self.assertGreater(resumed["count_resumed"], 0)
+        self.assertFalse(journal.exists())
+        resumed_report = Path(resumed["csv"]).read_text(encoding="utf-8")
+        fresh = ImagePipeline(self.input_folder, str(out), scale=0.1).run()
+        self.assertEqual(Path(fresh["csv"]).read_text(encoding="utf-8"), resumed_report)
+
+    def test_journal_groups_fsyncs(self):
+        """
+        Test that journal records reach the file as they are appended but are fsync'd in
+        groups, with a last fsync on close.
+        """
+        from unittest import mock
+        out = self.output_folder / "journal"
+        with mock.patch("src.journal.os.fsync") as fsync:
+            journal = Journal(str(out), {"scale": 0.1}, sync_every=3, sync_interval=60)
+            fsync.reset_mock()
+            for i in range(7):
+                journal.append({"path": f"img{i}.jpg"})
+            self.assertEqual(fsync.call_count, 2)
+            self.assertEqual(len(journal.path.read_text(encoding="utf-8").splitlines()), 8)
+            journal.close()
+            self.assertEqual(fsync.call_count, 3)
+        resumed = Journal(str(out), {"scale": 0.1}, resume=True)
+        self.assertIsNotNone(resumed.replay(Path("img6.jpg")))
+        resumed.close(completed=True)
+        self.assertFalse(resumed.path.exists())
+
+
+class TestPipelineAsync(unittest.IsolatedAsyncioTestCase):
+    """
+    Unit tests for the asyncio API of ImagePipeline and ImageProcessor.
+    """
+
+    async def test_arun_matches_staged_run(self):
+        """
+        Test that arun yields one row per image, with the same validation results as run().
+        """
+        staged = ImagePipeline("input", "output/pipeline/staged_async", scale=0.1).run()
+        pipeline = ImagePipeline("input", "output/pipeline/async", scale=0.1)
+        rows = [row async for row in pipeline.arun(concurrency=2)]
+        with open(staged["csv"], newline="", encoding="utf-8") as f:
+            expected = {r["path"]: r["ok"] for r in csv.DictReader(f)}
+        self.assertEqual({r["path"]: str(r["ok"]) for r in rows}, expected)
+        self.assertTrue(all(r.get("processed_path") for r in rows if r["ok"]))
+
+    async def test_run_async_caps_concurrency(self):
+        """
+        Test that run_async never has more images in flight than its concurrency limit.
+        """
+        import threading
+        import time
+        from src.processor import ImageProcessor
+
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def slow_step(path):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.01)
+            with lock:
+                state["running"] -= 1
+            return {}
+
+        processor = ImageProcessor("output/pipeline/async_cap")
+        processor.add_step(slow_step)
+        tasks = [(Path(f"img{i}.jpg"), None) for i in range(12)]
+        results = [r async for r in processor.run_async(tasks, concurrency=3)]
+        self.assertEqual(len(results), 12)
+        self.assertLessEqual(state["peak"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import io
+import unittest
+from pathlib import Path
+from PIL import Image
+from src.probe import probe
+from src.validator import ImageValidator
+
+# --- Run with: 'python -m unittest test.test_probe' ---
+
+class TestProbe(unittest.TestCase):
+    """
+    Unit tests for the header probe and the "probe" validation mode.
+    """
+
+    def setUp(self):
+        """
+        Set up the output folder and the validators compared.
+        """
+        self.folder = Path("output/probe")
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.probe = ImageValidator(verify_mode="probe")
+        self.header = ImageValidator(verify_mode="header")
+
+    def save(self, name: str, mode: str, fmt: str, **params) -> Path:
+        path = self.folder / name
+        Image.effect_noise((64, 48), 64).convert(mode).save(path, fmt, **params)
+        return path
+
+    def test_probe_matches_pillow(self):
+        """
+        Test that the probe reports the format, size, mode and orientation Pillow reports, for
+        the test images and each parsed format.
+        """
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        gif = self.folder / "anim.gif"
+        Image.effect_noise((64, 48), 64).convert("RGB").convert("P", palette=Image.Palette.ADAPTIVE).save(gif)
+        paths = [Path("input/Lion.jpg"), Path("input/Tigre.JPG"),
+                 self.save("rotated.jpg", "RGB", "JPEG", exif=exif.tobytes()),
+                 self.save("grey.jpg", "L", "JPEG"), self.save("cmyk.jpg", "CMYK", "JPEG"),
+                 self.save("alpha.png", "RGBA", "PNG"), self.save("deep.png", "I;16", "PNG"),
+                 gif, self.save("rgb.bmp", "RGB", "BMP"),
+                 self.save("rgba.tif", "RGBA", "TIFF"), self.save("rotated.tif", "RGB", "TIFF", exif=exif)]
+        for path in paths:
+            with open(path, "rb") as f:
+                self.assertIsNotNone(probe(f), path)
+            self.assertEqual(self.probe.validate(path), self.header.validate(path), path)
+        self.assertEqual(self.probe.validate(paths[2])["orientation"], 6)
+
+    def test_truncated_files_rejected(self):
+        """
+        Test that files cut short are rejected, while data after the end marker is accepted.
+        """
+        for name, mode, fmt in (("cut.jpg", "RGB", "JPEG"), ("cut.png", "RGB", "PNG"), ("cut.tif", "RGB", "TIFF")):
+            path = self.save(name, mode, fmt)
+            data = path.read_bytes()
+            path.write_bytes(data[:len(data) - 60])
+            result = self.probe.validate(path)
+            self.assertFalse(result["ok"], name)
+            self.assertIn("runcated", result["error"])
+        path = self.save("padded.jpg", "RGB", "JPEG")
+        path.write_bytes(path.read_bytes() + b"\x00" * 10000)
+        self.assertTrue(self.probe.validate(path)["ok"])
+
+    def test_fallback_to_pillow(self):
+        """
+        Test that variants the probe does not parse, and files that are not images, go through Pillow.
+        """
+        # Pillow reports greyscale GIFs (palette 0, 1, 2...) as "L"
+        Image.linear_gradient("L").save(self.folder / "grey.gif")
+        for path in (self.save("grey.bmp", "L", "BMP"), self.folder / "grey.gif"):
+            self.assertIsNone(probe(io.BytesIO(path.read_bytes())), path)
+            self.assertEqual(self.probe.validate(path)["mode"], "L", path)
+        result = self.probe.validate(Path("input/bad_photo.jpg"))
+        self.assertEqual(result["error"], "Unidentified image / not an image")
+
+
+if __name__ == "__main__":
+    unittest.main()
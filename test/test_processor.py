@@ -2,6 +2,7 @@ import unittest
 from pathlib import Path
 from PIL import Image
 from src.processor import ImageProcessor, make_resize_and_save_step
+from src.validator import ImageValidator
 
 class TestProcessor(unittest.TestCase):
     """
@@ -38,5 +39,35 @@ class TestProcessor(unittest.TestCase):
         processed_path = Path(results[0]["processed_path"])
         self.assertTrue(processed_path.exists())
 
+    def test_run_parallel_processes(self):
+        """
+        Test processing in worker processes, which requires the steps to be picklable.
+        """
+        results = self.processor.run_parallel([self.img_path, self.img_path], max_workers=2,
+                                              executor="processes", recycle_after=1)
+        self.assertEqual(len(results), 2)
+        self.assertTrue(Path(results[0]["processed_path"]).exists())
+
+    def test_reducing_gap_keeps_target_size(self):
+        """
+        Test that draft decoding for a large downscale still produces the exact target size.
+        """
+        step = make_resize_and_save_step(output_folder=str(self.out_folder / "draft"), scale=0.1, reducing_gap=2.0)
+        result = step(self.img_path)
+        with Image.open(self.img_path) as img:
+            expected = (int(img.size[0] * 0.1), int(img.size[1] * 0.1))
+        self.assertEqual((result["processed_width"], result["processed_height"]), expected)
+
+    def test_run_parallel_with_deep_validation(self):
+        """
+        Test that a deep validation run inside the workers feeds its decoded frame to the steps.
+        """
+        validator = ImageValidator(verify_mode="deep")
+        results = self.processor.run_parallel([self.img_path], max_workers=2, validate=validator.validate)
+        self.assertTrue(results[0]["ok"])
+        self.assertNotIn("image", results[0])
+        with Image.open(self.img_path) as img:
+            self.assertEqual(results[0]["processed_width"], int(img.size[0] * 0.5))
+
 if __name__ == "__main__":
     unittest.main()
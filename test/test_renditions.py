@@ -0,0 +1,48 @@
+import unittest
+from pathlib import Path
+from PIL import Image
+from src.renditions import RenditionSpec, RenditionStep
+
+# --- Run with: 'python -m unittest test.test_renditions' ---
+
+class TestRenditions(unittest.TestCase):
+    """
+    Unit tests for RenditionSpec parsing and the multi-output RenditionStep.
+    """
+
+    def setUp(self):
+        """
+        Prepare a test image and output folder.
+        """
+        self.img_path = Path("input/Lion.jpg")
+        self.out_folder = Path("output/renditions")
+
+    def test_parse(self):
+        """
+        Test parsing of relative and absolute sizes, formats and qualities.
+        """
+        spec = RenditionSpec.parse("thumb:256px:webp:70")
+        self.assertEqual((spec.name, spec.max_size, spec.format, spec.quality), ("thumb", 256, "WEBP", 70))
+        spec = RenditionSpec.parse("half:0.5")
+        self.assertEqual((spec.scale, spec.format), (0.5, "JPEG"))
+        with self.assertRaises(ValueError):
+            RenditionSpec.parse("bad")
+        with self.assertRaises(ValueError):
+            RenditionSpec.parse("x:0.5:gif")
+
+    def test_step_produces_every_rendition(self):
+        """
+        Test that one call writes each rendition with the requested size and format.
+        """
+        step = RenditionStep(str(self.out_folder), [RenditionSpec.parse("thumb:128px:png"),
+                                                    RenditionSpec.parse("half:0.5:webp")])
+        renditions = step(self.img_path)["renditions"]
+        self.assertEqual([r["rendition"] for r in renditions], ["thumb", "half"])
+        with Image.open(renditions[0]["processed_path"]) as img:
+            self.assertEqual(max(img.size), 128)
+            self.assertEqual(img.format, "PNG")
+        with Image.open(renditions[1]["processed_path"]) as img:
+            self.assertEqual(img.format, "WEBP")
+
+if __name__ == "__main__":
+    unittest.main()
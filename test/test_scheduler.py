@@ -0,0 +1,113 @@
+import threading
+import time
+import unittest
+from pathlib import Path
+from src.processor import ImageProcessor
+from src.scheduler import BucketQueue, MemoryBudget, estimate_footprint, interleave_chunks, parse_memory, task_cost
+
+# --- Run with: 'python -m unittest test.test_scheduler' ---
+
+class TestScheduler(unittest.TestCase):
+    """
+    Unit tests for memory-aware scheduling and task ordering.
+    """
+
+    def test_parse_memory_and_estimate(self):
+        """
+        Test parsing of memory sizes and the footprint estimate of an RGB image.
+        """
+        self.assertEqual(parse_memory("512M"), 512 * 1024 ** 2)
+        self.assertEqual(parse_memory("1.5GB"), int(1.5 * 1024 ** 3))
+        self.assertEqual(parse_memory("4096"), 4096)
+        with self.assertRaises(ValueError):
+            parse_memory("lots")
+        info = {"width": 100, "height": 50, "mode": "RGB"}
+        self.assertEqual(estimate_footprint(info), 100 * 50 * 4 * 2)
+        self.assertEqual(estimate_footprint(info, (10, 5)), 100 * 50 * 4 + 10 * 5 * 4)
+
+    def test_budget_limits_images_in_flight(self):
+        """
+        Test that only as many images run at once as fit in the memory budget, and that an
+        image larger than the whole budget still runs on its own.
+        """
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def slow_step(path):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.01)
+            with lock:
+                state["running"] -= 1
+            return {}
+
+        processor = ImageProcessor("output/scheduler")
+        processor.add_step(slow_step)
+        info = {"width": 1000, "height": 1000, "mode": "RGB"}
+        cost = estimate_footprint(info)
+        paths = [Path(f"img{i}.jpg") for i in range(10)]
+        results = processor.run_parallel(paths, max_workers=4, infos=[info] * 10, max_memory=2 * cost)
+        self.assertEqual(len(results), 10)
+        self.assertLessEqual(state["peak"], 2)
+
+        budget = MemoryBudget(cost // 2)
+        self.assertTrue(budget.fits(cost))
+        budget.admit(cost)
+        self.assertFalse(budget.fits(1))
+
+    def test_bucket_queue_quotas_and_stealing(self):
+        """
+        Test that tasks are split into size classes served largest first, that extra workers
+        go to the costliest class, and that idle workers steal only when allowed.
+        """
+        infos = [{"width": 100, "height": 100}] * 6 + [{"width": 4000, "height": 3000}] * 2
+        costs = [task_cost(Path(f"img{i}.jpg"), info) for i, info in enumerate(infos)]
+        self.assertEqual(costs[0], 10000)
+        self.assertEqual(task_cost(Path("missing.jpg")), 0)
+        tasks = [(f"img{i}", cost) for i, cost in enumerate(costs)]
+
+        for steal in (False, True):
+            queue = BucketQueue(tasks, costs, workers=3, steal=steal)
+            self.assertEqual(len(queue.queues), 2)
+            large = queue.quotas.index(2)
+            first = [queue.take() for _ in range(3)]
+            self.assertIsNone(queue.take())
+            self.assertEqual(sorted(task[1] for _, task in first), [10000, 12000000, 12000000])
+            # The large class is now empty: its freed workers steal small images or idle
+            queue.release(large)
+            item = queue.take()
+            if steal:
+                self.assertEqual((item[0], item[1][1], queue.steals), (large, 10000, 1))
+            else:
+                self.assertIsNone(item)
+                self.assertEqual(queue.steals, 0)
+
+    def test_schedules_process_every_image(self):
+        """
+        Test that "lpt" runs the largest images first, that every schedule returns each
+        result once, and that invalid schedules are rejected.
+        """
+        order = []
+
+        def record_step(path):
+            order.append(path.name)
+            return {"name": path.name}
+
+        processor = ImageProcessor("output/scheduler")
+        processor.add_step(record_step)
+        sizes = [10, 40, 20, 30, 1000, 5]
+        infos = [{"width": s, "height": s, "mode": "RGB"} for s in sizes]
+        paths = [Path(f"img{i}.jpg") for i in range(len(sizes))]
+        processor.run_parallel(paths, max_workers=1, infos=infos, executor="serial", schedule="lpt")
+        self.assertEqual(order, ["img4.jpg", "img1.jpg", "img3.jpg", "img2.jpg", "img0.jpg", "img5.jpg"])
+        for schedule in ("fifo", "buckets", "steal"):
+            results = processor.run_parallel(paths, max_workers=3, infos=infos, schedule=schedule)
+            self.assertEqual(sorted(r["name"] for r in results), sorted(p.name for p in paths), schedule)
+        # Chunks of a sorted list share the large images instead of the first chunk taking them all
+        dealt = interleave_chunks(list(range(10)), 4)
+        self.assertEqual([dealt[i:i + 4] for i in range(0, 10, 4)], [[0, 3, 6, 8], [1, 4, 7, 9], [2, 5]])
+        with self.assertRaises(ValueError):
+            processor.run_parallel(paths, infos=infos, schedule="random")
+        with self.assertRaises(ValueError):
+            processor.run_parallel(paths, infos=infos, schedule="steal", max_memory=1 << 20)
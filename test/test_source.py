@@ -0,0 +1,75 @@
+import csv
+import io
+import unittest
+from pathlib import Path
+from src.cache import ProcessingCache
+from src.pipeline import ImagePipeline
+from src.source import MappedReader, SourcePool, open_image
+
+# --- Run with: 'python -m unittest test.test_source' ---
+
+class TestSource(unittest.TestCase):
+    """
+    Unit tests for the memory-mapped input layer (SourcePool).
+    """
+
+    def setUp(self):
+        """
+        Set up a pool and the test image.
+        """
+        self.pool = SourcePool(max_open=1)
+        self.image = Path("input/Lion.jpg")
+        self.data = self.image.read_bytes()
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_reader_and_view_share_file_contents(self):
+        """
+        Test that readers and views expose the file bytes, readers seek independently, and
+        images and digests computed from the mapping match those from the file.
+        """
+        with self.pool.open(self.image) as a, self.pool.open(self.image) as b:
+            self.assertIsInstance(a, MappedReader)
+            self.assertEqual(a.read(), self.data)
+            b.seek(-10, io.SEEK_END)
+            self.assertEqual(b.read(), self.data[-10:])
+            self.assertEqual(a.read(5), b"")
+        with self.pool.view(self.image) as view:
+            self.assertEqual(view.tobytes(), self.data)
+        self.assertEqual(ProcessingCache.file_digest(self.image, self.pool), ProcessingCache.file_digest(self.image))
+        with open_image(self.image, self.pool) as img:
+            self.assertEqual(img.size, (1879, 2048))
+
+    def test_limit_falls_back_to_regular_reads(self):
+        """
+        Test that at most max_open files are mapped: a second file is read normally while the
+        first is in use, and replaces it in the pool once the first is released.
+        """
+        other = Path("input/Tigre.JPG")
+        with self.pool.open(self.image) as mapped:
+            with self.pool.open(other) as f:
+                self.assertIsInstance(mapped, MappedReader)
+                self.assertNotIsInstance(f, MappedReader)
+                self.assertEqual(f.read(), other.read_bytes())
+        with self.pool.open(other) as f:
+            self.assertIsInstance(f, MappedReader)
+        self.assertEqual(list(self.pool._maps), [str(other)])
+
+    def test_pipeline_report_unchanged(self):
+        """
+        Test that a run reading its inputs through mappings reports the same results as a plain run.
+        """
+        reports = []
+        for name, map_inputs in (("plain", False), ("mapped", True)):
+            pipeline = ImagePipeline("input", f"output/source/{name}", max_workers=2, scale=0.1,
+                                     map_inputs=map_inputs, max_open_maps=2, journal=False)
+            with open(pipeline.run()["report"], newline="") as f:
+                reports.append([{k: v for k, v in row.items() if k != "processed_path"}
+                                for row in csv.DictReader(f)])
+        self.assertEqual(reports[0], reports[1])
+        self.assertTrue(any(row["processed_width"] for row in reports[1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
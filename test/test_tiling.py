@@ -0,0 +1,122 @@
+import struct
+import unittest
+from pathlib import Path
+from PIL import Image, ImageChops, TiffImagePlugin, TiffTags
+from src.pipeline import ImagePipeline
+from src.processor import ResizeAndSaveStep, target_size
+from src.tiling import TiffReader, TiledResizeStep
+from src.validator import ImageValidator
+
+# --- Run with: 'python -m unittest test.test_tiling' ---
+
+class TestTiling(unittest.TestCase):
+    """
+    Unit tests for band-by-band processing of large TIFFs.
+    """
+
+    def setUp(self):
+        """
+        Create a synthetic image with detail in every direction.
+        """
+        self.folder = Path("output/tiling")
+        self.folder.mkdir(parents=True, exist_ok=True)
+        noise = Image.effect_noise((701, 503), 60)
+        gradient = Image.linear_gradient("L").resize(noise.size)
+        self.image = Image.merge("RGB", [noise, gradient, noise.transpose(Image.Transpose.FLIP_LEFT_RIGHT)])
+
+    def max_difference(self, a, b):
+        """
+        Largest per-channel difference between two images.
+        """
+        return max(high for _, high in ImageChops.difference(a, b).getextrema())
+
+    def test_tiled_resize_matches_in_memory_resize(self):
+        """
+        Test that resizing a strip TIFF band by band matches a whole-image LANCZOS resize.
+        """
+        path = self.folder / "strips.tif"
+        self.image.save(path, compression="tiff_lzw", tiffinfo={278: 16})
+        fallback = ResizeAndSaveStep(str(self.folder), 0.3)
+        step = TiledResizeStep(str(self.folder), 0.3, 1, fallback, band_rows=40, band_workers=2)
+        info = {"width": 701, "height": 503, "format": "TIFF"}
+        result = step(path, info)
+        self.assertTrue(result["processed_path"].endswith(".png"))
+        expected = self.image.resize(target_size(self.image.size, 0.3), Image.LANCZOS)
+        with Image.open(result["processed_path"]) as out:
+            self.assertEqual(out.size, expected.size)
+            self.assertLessEqual(self.max_difference(out.convert("RGB"), expected), 1)
+
+        # Small images and other formats go through the fallback step
+        result = step(Path("input/Lion.jpg"), {"width": 10, "height": 10, "format": "JPEG"})
+        self.assertTrue(result["processed_path"].endswith(".jpg"))
+
+    def test_reader_reads_rows_of_tiles(self):
+        """
+        Test that a band read from a tiled TIFF equals the same rows of the whole image.
+        """
+        width, height = self.image.size
+        tiles = []
+        for y in range(0, height, 64):
+            for x in range(0, width, 64):
+                tile = Image.new("RGB", (64, 64))
+                tile.paste(self.image.crop((x, y, min(width, x + 64), min(height, y + 64))))
+                tiles.append(tile.tobytes())
+        ifd = TiffImagePlugin.ImageFileDirectory_v2()
+        for tag, value in {256: width, 257: height, 258: (8, 8, 8), 259: 1, 262: 2, 277: 3,
+                           284: 1, 322: 64, 323: 64}.items():
+            ifd[tag] = value
+        ifd[325] = tuple(len(t) for t in tiles)
+        ifd[324] = (0,) * len(tiles)
+        ifd.tagtype[324] = ifd.tagtype[325] = TiffTags.LONG
+        position, offsets = 8 + len(ifd.tobytes(8)), []
+        for t in tiles:
+            offsets.append(position)
+            position += len(t)
+        ifd[324] = tuple(offsets)
+        path = self.folder / "tiles.tif"
+        path.write_bytes(b"II*\x00" + struct.pack("<L", 8) + ifd.tobytes(8) + b"".join(tiles))
+
+        reader = TiffReader(path)
+        self.assertTrue(reader.tiled and reader.supported)
+        band = reader.read_rows(100, 250)
+        self.assertEqual(band.size, (width, 150))
+        self.assertEqual(self.max_difference(band, self.image.crop((0, 100, width, 250))), 0)
+
+    def test_rotated_tiff_uses_fallback(self):
+        """
+        Test that a TIFF with a non-default orientation is read with its stored size and goes
+        through the fallback step, which applies the rotation.
+        """
+        path = self.folder / "rotated.tif"
+        self.image.save(path, tiffinfo={278: 16, 274: 6})
+        reader = TiffReader(path)
+        self.assertEqual(reader.size, self.image.size)
+        self.assertFalse(reader.supported)
+        fallback = ResizeAndSaveStep(str(self.folder), 0.3)
+        step = TiledResizeStep(str(self.folder), 0.3, 1, fallback)
+        result = step(path, {"width": 503, "height": 701, "format": "TIFF", "orientation": 6})
+        self.assertNotIn("error", result)
+        self.assertEqual(result, fallback(path, {"width": 503, "height": 701, "format": "TIFF", "orientation": 6}))
+
+    def test_bomb_limit_lifted_for_tiffs_only(self):
+        """
+        Test that the tiled path accepts TIFFs above Pillow's decompression bomb limit while
+        other formats, and pipelines without tiling, stay limited, without changing the limit.
+        """
+        tiff, png = self.folder / "strips.tif", self.folder / "large.png"
+        self.image.save(tiff, tiffinfo={278: 16})
+        self.image.save(png)
+        limit = Image.MAX_IMAGE_PIXELS
+        pipeline = ImagePipeline(str(self.folder), str(self.folder), tile_above=1, journal=False)
+        self.assertEqual(Image.MAX_IMAGE_PIXELS, limit)
+        Image.MAX_IMAGE_PIXELS = 1000
+        try:
+            for mode in ("header", "probe"):
+                validator = ImageValidator(verify_mode=mode, huge_tiffs=True)
+                self.assertTrue(validator.validate(tiff)["ok"], mode)
+                self.assertIn("decompression bomb", validator.validate(png)["error"], mode)
+                self.assertIn("decompression bomb", ImageValidator(verify_mode=mode).validate(tiff)["error"], mode)
+            self.assertTrue(pipeline.validator.validate(tiff)["ok"])
+        finally:
+            Image.MAX_IMAGE_PIXELS = limit
+
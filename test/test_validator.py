@@ -48,5 +48,25 @@ class TestValidator(unittest.TestCase):
         result = self.validator.validate(self.invalid_image)
         self.assertFalse(result['ok'])
 
+    def test_header_mode_reads_metadata(self):
+        """
+        Ensure that header-only validation reports size, format and mode without decoding.
+        """
+        result = ImageValidator(verify_mode="header").validate(self.valid_image)
+        self.assertTrue(result['ok'])
+        self.assertEqual(result['format'], "JPEG")
+        self.assertIsNotNone(result['mode'])
+        self.assertNotIn('image', result)
+
+    def test_deep_mode_returns_decoded_frame(self):
+        """
+        Ensure that deep validation hands back the decoded frame and rejects corrupted files.
+        """
+        validator = ImageValidator(verify_mode="deep")
+        result = validator.validate(self.valid_image)
+        self.assertTrue(result['ok'])
+        self.assertEqual(result['image'].size, (result['width'], result['height']))
+        self.assertFalse(validator.validate(self.invalid_image)['ok'])
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,131 @@
+import csv
+import shutil
+import threading
+import time
+import unittest
+from pathlib import Path
+from src.pipeline import ImagePipeline
+from src.watch import PollingWatcher, Watcher, iter_batches, make_watcher
+
+# --- Run with: 'python -m unittest test.test_watch' ---
+
+
+class ScriptedWatcher(Watcher):
+    """
+    Watcher replaying a list of (delay, paths) changes.
+    """
+
+    def __init__(self, script):
+        super().__init__("input")
+        self.script = list(script)
+
+    def changes(self, timeout):
+        if not self.script or self.script[0][0] > timeout:
+            time.sleep(timeout)
+            if self.script:
+                self.script[0] = (self.script[0][0] - timeout, self.script[0][1])
+            return []
+        delay, paths = self.script.pop(0)
+        time.sleep(delay)
+        return [Path(p) for p in paths]
+
+
+class TestWatch(unittest.TestCase):
+    """
+    Unit tests for the watch mode: watchers, debouncing and ImagePipeline.watch.
+    """
+
+    def setUp(self):
+        """
+        Set up an empty input folder and the output folder.
+        """
+        self.input_folder = Path("output/watch/in")
+        self.output_folder = Path("output/watch/out")
+        shutil.rmtree("output/watch", ignore_errors=True)
+        self.input_folder.mkdir(parents=True)
+
+    def test_batches_are_debounced_and_filtered(self):
+        """
+        Test that a burst of changes comes out as one sorted batch once quiet, that a file
+        reported again waits for the debounce, and that unwanted files and batch limits apply.
+        """
+        watcher = ScriptedWatcher([(0.0, ["b.jpg", "a.jpg", "notes.txt"]), (0.05, ["b.jpg"]),
+                                   (0.3, ["c.jpg", "d.jpg", "e.jpg"])])
+        stop = threading.Event()
+        batches = []
+        for batch, since in iter_batches(watcher, lambda p: p.suffix == ".jpg", debounce=0.1, max_batch=2, stop=stop):
+            batches.append([p.name for p in batch])
+            self.assertLessEqual(since, time.perf_counter())
+            if len(batches) == 3:
+                stop.set()
+        self.assertEqual(batches, [["a.jpg", "b.jpg"], ["c.jpg", "d.jpg"], ["e.jpg"]])
+
+        # A watcher without changes fails when it is built
+        class BlindWatcher(Watcher):
+            pass
+
+        with self.assertRaises(TypeError):
+            BlindWatcher(".")
+
+    def test_watchers_report_new_and_changed_files(self):
+        """
+        Test that the default watcher and the polling fallback report files written after they
+        started, and not those already there.
+        """
+        (self.input_folder / "old.jpg").write_bytes(b"old")
+        for watcher in (make_watcher(self.input_folder), PollingWatcher(self.input_folder, interval=0.05)):
+            name = f"new_{type(watcher).__name__}.jpg"
+            (self.input_folder / name).write_bytes(b"new")
+            found = set()
+            deadline = time.monotonic() + 2
+            while name not in found and time.monotonic() < deadline:
+                found |= {p.name for p in watcher.changes(0.1)}
+            watcher.close()
+            self.assertIn(name, found)
+            self.assertNotIn("old.jpg", found)
+
+        # A subdirectory gone before its watch could be added is skipped
+        watcher = make_watcher(self.input_folder, recursive=True)
+        (self.input_folder / "gone").mkdir()
+        (self.input_folder / "gone").rmdir()
+        (self.input_folder / "after.jpg").write_bytes(b"new")
+        found = set()
+        deadline = time.monotonic() + 2
+        while "after.jpg" not in found and time.monotonic() < deadline:
+            found |= {p.name for p in watcher.changes(0.1)}
+        watcher.close()
+        self.assertIn("after.jpg", found)
+
+    def test_pipeline_processes_arrivals_into_rolling_report(self):
+        """
+        Test that a watching pipeline processes the images present, then those copied in
+        later, appending their rows to the report on a pool kept across batches.
+        """
+        shutil.copy("input/Tigre.JPG", self.input_folder / "first.jpg")
+        pipeline = ImagePipeline(str(self.input_folder), str(self.output_folder), max_workers=2, scale=0.1,
+                                 journal=False)
+        stop = threading.Event()
+        batches, pools = [], set()
+
+        def on_batch(batch):
+            batches.append(batch)
+            pools.add(id(pipeline._pool))
+            if len(batches) == 1:
+                shutil.copy("input/Lion.jpg", self.input_folder / "second.jpg")
+            else:
+                stop.set()
+
+        watcher = PollingWatcher(self.input_folder, interval=0.05)
+        summary = pipeline.watch(watcher, debounce=0.05, stop=stop, on_batch=on_batch)
+        self.assertEqual((summary["count_processed"], summary["count_batches"]), (2, 2))
+        self.assertEqual(len(pools), 1)
+        self.assertLess(batches[1]["latency"], 2.0)
+        with open(summary["report"], newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([Path(r["path"]).name for r in rows], ["first.jpg", "second.jpg"])
+        self.assertTrue(Path(rows[1]["processed_path"]).exists())
+        self.assertIsNone(pipeline._pool)
+
+
+if __name__ == "__main__":
+    unittest.main()
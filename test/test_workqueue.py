@@ -0,0 +1,100 @@
+import csv
+import multiprocessing
+import shutil
+import threading
+import time
+import unittest
+from pathlib import Path
+from src.pipeline import ImagePipeline
+from src.processor import ImageProcessor
+from src.workqueue import SQLiteWorkQueue, WorkQueue, run_worker
+
+# --- Run with: 'python -m unittest test.test_workqueue' ---
+
+class TestWorkQueue(unittest.TestCase):
+    """
+    Unit tests for the SQLite work queue and the coordinator/worker mode of the pipeline.
+    """
+
+    def setUp(self):
+        """
+        Start every test from an empty queue folder.
+        """
+        self.folder = Path("output/workqueue")
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_expired_lease_is_retried_then_failed(self):
+        """
+        Test that a task whose worker never completes it is leased again after the visibility
+        timeout, and reported as failed once its attempts are used up.
+        """
+        queue = SQLiteWorkQueue(str(self.folder / "lease.sqlite"), visibility_timeout=0.2, max_attempts=2)
+        queue.start(ImageProcessor(str(self.folder)))
+        queue.put([("input/Lion.jpg", {"path": "input/Lion.jpg"})])
+        self.assertEqual(len(queue.lease("dead-worker", 10)), 1)
+        self.assertEqual(queue.lease("other-worker", 10), [])
+        time.sleep(0.3)
+        self.assertEqual([t[1] for t in queue.lease("other-worker", 10)], ["input/Lion.jpg"])
+        time.sleep(0.3)
+        [result] = queue.collect()
+        self.assertIn("2 attempts", result["error"])
+        self.assertEqual(queue.lease("other-worker", 10), [])
+
+        # A backend missing part of the interface fails when it is created, not mid-run
+        class PartialQueue(WorkQueue):
+            def start(self, processor):
+                pass
+
+        with self.assertRaises(TypeError):
+            PartialQueue()
+
+    def test_stale_worker_and_idle_coordinator(self):
+        """
+        Test that a worker holding the processor of a previous run leases nothing from the
+        next one and exits, and that a coordinator without workers gives up after its idle timeout.
+        """
+        queue = SQLiteWorkQueue(str(self.folder / "runs.sqlite"), poll_interval=0.05, idle_timeout=0.3)
+        queue.start(ImageProcessor(str(self.folder)))
+        first = queue.run_id()
+        done = []
+        worker = threading.Thread(target=lambda: done.append(run_worker(queue, "stale", 1)), daemon=True)
+        worker.start()
+        time.sleep(0.2)
+        queue.start(ImageProcessor(str(self.folder / "second")))
+        queue.put([("input/Lion.jpg", {"path": "input/Lion.jpg"})])
+        worker.join(5)
+        self.assertEqual(done, [0])
+        self.assertNotEqual(queue.run_id(), first)
+        self.assertEqual(queue.lease("other", 10, first), [])
+        self.assertEqual(len(queue.lease("other", 10, queue.run_id())), 1)
+
+        pipeline = ImagePipeline("input", str(self.folder / "idle"), scale=0.1, work_queue=queue)
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            pipeline.run()
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertTrue(queue.closed())
+
+    def test_local_workers_match_local_run(self):
+        """
+        Test that a coordinator with two local worker processes reports the same results as a local run.
+        """
+        queue = SQLiteWorkQueue(str(self.folder / "queue.sqlite"), poll_interval=0.05)
+        workers = [multiprocessing.Process(target=run_worker, args=(queue, f"w{i}", 1)) for i in range(2)]
+        for w in workers:
+            w.start()
+        distributed = ImagePipeline("input", str(self.folder / "distributed"), scale=0.1, work_queue=queue).run()
+        for w in workers:
+            w.join(timeout=30)
+            self.assertEqual(w.exitcode, 0)
+        local = ImagePipeline("input", str(self.folder / "local"), scale=0.1).run()
+
+        def rows(summary):
+            with open(summary["csv"], newline="", encoding="utf-8") as f:
+                return [(r["path"], r["ok"], r["processed_width"], Path(r["processed_path"]).name)
+                        for r in csv.DictReader(f)]
+        self.assertEqual(distributed["count_processed"], local["count_processed"])
+        self.assertEqual(rows(distributed), rows(local))
+
+if __name__ == "__main__":
+    unittest.main()
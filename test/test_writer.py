@@ -0,0 +1,87 @@
+import csv
+import threading
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import mock
+from src.pipeline import ImagePipeline
+from src.processor import ImageProcessor, ResizeAndSaveStep, write_atomic
+from src.writer import OutputWriter
+
+# --- Run with: 'python -m unittest test.test_writer' ---
+
+class TestWriter(unittest.TestCase):
+    """
+    Unit tests for the writer stage (OutputWriter) and the pack archive.
+    """
+
+    def setUp(self):
+        """
+        Set up the output folder and an event holding back the writes of the I/O threads.
+        """
+        self.output_folder = Path("output/writer")
+        self.output_folder.mkdir(parents=True, exist_ok=True)
+        self.release = threading.Event()
+
+    def held_write(self, path, data):
+        """
+        Stand-in for write_atomic that waits until the test releases the writes.
+        """
+        self.release.wait(5)
+        write_atomic(path, data)
+
+    def test_step_returns_before_write_and_errors_reach_result(self):
+        """
+        Test that the resize step hands its output to the writer and returns at once, that
+        settling waits for the file, and that a failed write becomes the image's error.
+        """
+        step = ResizeAndSaveStep(str(self.output_folder), scale=0.1, writer=OutputWriter(io_workers=1))
+        with mock.patch("src.writer.write_atomic", self.held_write):
+            result = step(Path("input/Lion.jpg"))
+            self.assertFalse(result["write"].done())
+            self.release.set()
+            ImageProcessor._settle([result])
+        self.assertNotIn("write", result)
+        self.assertTrue(Path(result["processed_path"]).exists())
+
+        processor = ImageProcessor(str(self.output_folder))
+        processor.add_step(step)
+        with mock.patch("src.writer.write_atomic", side_effect=OSError("disk full")):
+            [failed] = processor.run_parallel([Path("input/Tigre.JPG")], max_workers=1)
+        self.assertEqual(failed["error"], "disk full")
+
+    def test_buffer_blocks_when_full(self):
+        """
+        Test that submit() blocks while the encoded bytes waiting to be written exceed the buffer.
+        """
+        writer = OutputWriter(io_workers=1, max_buffer=10)
+        second = threading.Event()
+        with mock.patch("src.writer.write_atomic", self.held_write):
+            _, first = writer.submit(self.output_folder / "a.bin", b"12345678")
+            t = threading.Thread(target=lambda: (writer.submit(self.output_folder / "b.bin", b"12345678"),
+                                                 second.set()))
+            t.start()
+            self.assertFalse(second.wait(0.2))
+            self.release.set()
+            self.assertTrue(second.wait(5))
+            t.join()
+            writer.close()
+        self.assertTrue(first.done())
+        self.assertEqual((self.output_folder / "b.bin").read_bytes(), b"12345678")
+
+    def test_pack_archive_indexes_outputs(self):
+        """
+        Test that packed runs report the archive and member of each image, and the archive holds them.
+        """
+        out = self.output_folder / "pack"
+        summary = ImagePipeline("input", str(out), scale=0.1, pack=True).run()
+        with open(summary["csv"], newline="", encoding="utf-8") as f:
+            rows = [r for r in csv.DictReader(f) if r["ok"] == "True"]
+        with zipfile.ZipFile(out / "outputs.zip") as archive:
+            members = sorted(archive.namelist())
+            self.assertEqual(sorted(r["archive_member"] for r in rows), members)
+            self.assertGreater(len(archive.read(members[0])), 0)
+        self.assertTrue(all(r["processed_path"].endswith("outputs.zip") for r in rows))
+
+if __name__ == "__main__":
+    unittest.main()